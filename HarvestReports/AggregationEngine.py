@@ -0,0 +1,173 @@
+#!/usr/bin/python
+
+# Harvest Reports v0.1.5
+# Copyright (c) 2014-2015 Iain McManus. All rights reserved.
+#
+# Harvest Reports is a wrapper around Apple's AutoIngestion Java Class.
+# Harvest Reports can download all of the recent daily data and will produce
+# a summary of the sales, updates and a breakdown of region where sales have occurred.
+#
+# Information is also generated per version, including a calculation of the number of users
+# on the latest version.
+#
+# Harvest Reports can be run on a regular schedule and be configured to send an email
+# with the daily summary when the daily report is out. If no sales/updates have occurred
+# it can indicate that as well.
+
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in
+# all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN
+# THE SOFTWARE.
+
+import datetime
+
+import numpy as np
+
+from DailySeries import DailySeries
+from ReportCube import PaidFlag, PositiveProceedsFlag, PromoCodeFlag, RefundFlag, UpdateFlag
+
+def sumByKey(keys, keyCodes, values, cellMask, asUnits):
+    selectedCodes = keyCodes[cellMask]
+    
+    valueSums = np.bincount(selectedCodes, weights=values[cellMask], minlength=len(keys))
+    
+    # the totals are listed in order of their first cell so they are added to the summary in the same order as line by line
+    [presentCodes, firstCells] = np.unique(selectedCodes, return_index=True)
+    
+    keyedTotals = []
+    for keyCode in presentCodes[np.argsort(firstCells, kind="mergesort")].tolist():
+        if asUnits:
+            keyedTotals.append([keys[keyCode], int(valueSums[keyCode])])
+        else:
+            keyedTotals.append([keys[keyCode], float(valueSums[keyCode])])
+    
+    return keyedTotals
+
+def sumByKeyAndCurrency(keys, keyCodes, currencies, currencyCodes, proceeds, cellMask):
+    combinedCodes = keyCodes * len(currencies) + currencyCodes
+    
+    combinedTotals = sumByKey(range(0, len(keys) * len(currencies)), combinedCodes, proceeds, cellMask, False)
+    
+    # key -> currency -> proceeds
+    keyedTotals = dict()
+    for [combinedCode, proceedsTotal] in combinedTotals:
+        [keyCode, currencyCode] = divmod(combinedCode, len(currencies))
+        
+        keyedTotals.setdefault(keys[keyCode], dict())[currencies[currencyCode]] = proceedsTotal
+    
+    return keyedTotals
+
+def sumByDay(firstDate, dayOffsets, numDays, values, cellMask, asUnits):
+    dailyTotals = np.bincount(dayOffsets[cellMask], weights=values[cellMask], minlength=numDays)
+    
+    if asUnits:
+        dailyTotals = dailyTotals.astype(np.int64)
+    
+    return DailySeries(firstDate, dailyTotals)
+
+def firstNonBlank(categories, categoryCodes):
+    isNonBlank = np.array([fieldValue != None and len(fieldValue.strip()) > 0 for fieldValue in categories], dtype=bool)
+    
+    nonBlankCells = np.flatnonzero(isNonBlank[categoryCodes])
+    if len(nonBlankCells) == 0:
+        return None
+    
+    return categories[categoryCodes[nonBlankCells[0]]].strip()
+
+def aggregateCubeCells(cubeCells):
+    if len(cubeCells) == 0:
+        return None
+    
+    columns = cubeCells.columns
+    
+    # the cells are taken in date order, and within a date in the order of their first line in the reports
+    cellOrder = np.lexsort((columns["line"], columns["file"], columns["date"]))
+    
+    isNewData = cubeCells.isNewCell[cellOrder]
+    units = columns["units"][cellOrder]
+    proceeds = columns["proceeds"][cellOrder]
+    flags = columns["flags"][cellOrder]
+    
+    [dateOrdinalKeys, dateCodes] = np.unique(columns["date"][cellOrder], return_inverse=True)
+    dates = [datetime.date.fromordinal(dateOrdinal) for dateOrdinal in dateOrdinalKeys.tolist()]
+    
+    # the daily series run from the first to the last date with a cell
+    dayOffsets = columns["date"][cellOrder] - dateOrdinalKeys[0]
+    numDays = int(dateOrdinalKeys[-1] - dateOrdinalKeys[0]) + 1
+    
+    categoryColumns = dict([[fieldName, [cubeCells.categories[fieldName], columns[fieldName][cellOrder]]] for fieldName in cubeCells.categories])
+    
+    [versions, versionCodes] = categoryColumns["Version"]
+    [countries, countryCodes] = categoryColumns["Country Code"]
+    [currencies, currencyCodes] = categoryColumns["Currency Code of Proceeds"]
+    [titles, titleCodes] = categoryColumns["Title"]
+    
+    # the class of each cell was worked out from its lines when the cube was built
+    isUpdate = (flags & UpdateFlag) != 0
+    isSale = ~isUpdate
+    isRefund = isSale & ((flags & RefundFlag) != 0)
+    isPromo = isSale & ((flags & PromoCodeFlag) != 0)
+    isPaid = isSale & ((flags & PaidFlag) != 0)
+    isFree = isSale & ((flags & PaidFlag) == 0)
+    hasProceeds = (flags & PositiveProceedsFlag) != 0
+    
+    aggregates = dict()
+    
+    # the aggregates are named after the SKUData attributes they fill in
+    aggregates.update({"SKU" : firstNonBlank(*categoryColumns["SKU"]) or "Unknown"})
+    aggregates.update({"AppId" : firstNonBlank(*categoryColumns["Apple Identifier"]) or "Unknown"})
+    aggregates.update({"Name" : titles[titleCodes[-1]].strip()})
+    
+    [firstVersionCodes, firstVersionCells] = np.unique(versionCodes, return_index=True)
+    aggregates.update({"versions" : [versions[versionCode] for versionCode in firstVersionCodes[np.argsort(firstVersionCells)].tolist()]})
+    
+    aggregates.update({"hasNewData" : bool(isNewData.any())})
+    aggregates.update({"newDataDates" : [dates[dateCode] for dateCode in dateCodes[isNewData].tolist()]})
+    
+    aggregates.update({"allInstallsTotal" : int(units[isSale].sum())})
+    aggregates.update({"paidInstallsTotal" : int(units[isPaid].sum())})
+    aggregates.update({"freeInstallsTotal" : int(units[isFree].sum())})
+    aggregates.update({"refundsTotal" : int(-units[isRefund].sum())})
+    aggregates.update({"promoCodesTotal" : int(units[isPromo].sum())})
+    aggregates.update({"newAllInstallsTotal" : int(units[isSale & isNewData].sum())})
+    aggregates.update({"newPaidInstallsTotal" : int(units[isPaid & isNewData].sum())})
+    aggregates.update({"newFreeInstallsTotal" : int(units[isFree & isNewData].sum())})
+    aggregates.update({"newRefundsTotal" : int(-units[isRefund & isNewData].sum())})
+    aggregates.update({"newUpdatesTotal" : int(units[isUpdate & isNewData].sum())})
+    aggregates.update({"newPromoCodesTotal" : int(units[isPromo & isNewData].sum())})
+    
+    aggregates.update({"unitsByVersion" : dict(sumByKey(versions, versionCodes, units, isSale, True))})
+    aggregates.update({"updatesByVersion" : dict(sumByKey(versions, versionCodes, units, isUpdate, True))})
+    aggregates.update({"refundsByVersion" : dict(sumByKey(versions, versionCodes, -units, isRefund, True))})
+    aggregates.update({"promoCodesByVersion" : dict(sumByKey(versions, versionCodes, units, isPromo, True))})
+    
+    for [fieldName, cellMask] in [["paidInstallsByDate", isPaid], ["freeInstallsByDate", isFree], ["allInstallsByDate", isSale], ["updatesByDate", isUpdate]]:
+        aggregates.update({fieldName : sumByDay(dates[0], dayOffsets, numDays, units, cellMask, True)})
+    
+    aggregates.update({"paidInstallsByCountry" : dict(sumByKey(countries, countryCodes, units, isPaid, True))})
+    aggregates.update({"freeInstallsByCountry" : dict(sumByKey(countries, countryCodes, units, isFree, True))})
+    aggregates.update({"allInstallsByCountry" : dict(sumByKey(countries, countryCodes, units, isSale, True))})
+    aggregates.update({"newPaidInstallsByCountry" : dict(sumByKey(countries, countryCodes, units, isPaid & isNewData, True))})
+    aggregates.update({"newFreeInstallsByCountry" : dict(sumByKey(countries, countryCodes, units, isFree & isNewData, True))})
+    aggregates.update({"newAllInstallsByCountry" : dict(sumByKey(countries, countryCodes, units, isSale & isNewData, True))})
+    
+    aggregates.update({"proceedsTotal" : dict(sumByKey(currencies, currencyCodes, proceeds, hasProceeds, False))})
+    aggregates.update({"newProceedsTotal" : dict(sumByKey(currencies, currencyCodes, proceeds, hasProceeds & isNewData, False))})
+    
+    aggregates.update({"proceedsByDate" : dict([[currencies[currencyCode], sumByDay(dates[0], dayOffsets, numDays, proceeds, isPaid & (currencyCodes == currencyCode), False)] for currencyCode in np.unique(currencyCodes[isPaid]).tolist()])})
+    aggregates.update({"proceedsByVersion" : sumByKeyAndCurrency(versions, versionCodes, currencies, currencyCodes, proceeds, isPaid)})
+    
+    return aggregates
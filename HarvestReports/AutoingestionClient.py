@@ -0,0 +1,62 @@
+#!/usr/bin/python
+
+# Harvest Reports v0.1.5
+# Copyright (c) 2014-2015 Iain McManus. All rights reserved.
+#
+# Harvest Reports is a wrapper around Apple's AutoIngestion Java Class.
+# Harvest Reports can download all of the recent daily data and will produce
+# a summary of the sales, updates and a breakdown of region where sales have occurred.
+#
+# Information is also generated per version, including a calculation of the number of users
+# on the latest version.
+#
+# Harvest Reports can be run on a regular schedule and be configured to send an email
+# with the daily summary when the daily report is out. If no sales/updates have occurred
+# it can indicate that as well.
+
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in
+# all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN
+# THE SOFTWARE.
+
+import subprocess
+import threading
+import time
+
+class AutoingestionClient:
+    # minimum gap between starting requests so that several workers stay within Apple's request limits
+    MinSecondsBetweenRequests = 1.0
+    
+    def __init__(self):
+        # the requests name their own vendor so one client can serve several vendors
+        self.requestLock = threading.Lock()
+        self.nextRequestTime = 0.0
+        
+    def waitForRequestSlot(self):
+        # the lock is held while waiting so that queued requests are released one at a time
+        with self.requestLock:
+            currentTime = time.time()
+            
+            if currentTime < self.nextRequestTime:
+                time.sleep(self.nextRequestTime - currentTime)
+                currentTime = self.nextRequestTime
+            
+            self.nextRequestTime = currentTime + self.MinSecondsBetweenRequests
+    
+    def requestSummary(self, propertiesFile, vendorId, dateType, requestedDateString):
+        self.waitForRequestSlot()
+        
+        return subprocess.check_output(["java", "-cp", ".", "Autoingestion", propertiesFile, vendorId, "sales", dateType, "summary", requestedDateString])
@@ -33,10 +33,23 @@
 # THE SOFTWARE.
 
 import csv
+import hashlib
 
 class ReportTypes:
     BasicSummary, DetailedSummary = range(2)
     
+class DownloadResults:
+    Skipped, Downloaded, NoReportsAvailable, InvalidDate, Failed, Covered = range(6)
+    
+class ReportPeriods:
+    Daily, Weekly, Monthly, Yearly = range(4)
+    
+class FeedResults:
+    Downloaded, NotModified, Failed = range(3)
+    
+class GraphTypes:
+    Units, Proceeds, CountryInstalls = range(3)
+    
 class RSSFields:
     Version, Title, Rating, Summary, UniqueId = range(5)
     
@@ -48,6 +61,7 @@ class FieldRemapper:
     CurrencyFromCode = dict()
     ProductTypeFromCode = dict()
     PromoTypeFromCode = dict()
+    Signature = ""
     
     def __init__(self):
         with open('fields_countries.csv', mode='r') as countriesFile:
@@ -74,3 +88,32 @@ class FieldRemapper:
             print "Input file fields_productTypes.csv could not be found. Product types will be listed as their code"
         if len(self.PromoTypeFromCode) == 0:
             print "Input file fields_promoCodes.csv could not be found. Promo codes will be listed as their code"
+
+        # fingerprint of the mappings so that anything storing remapped values can detect when they change
+        mappingsHash = hashlib.md5()
+        for mapping in [self.CountryFromCode, self.CurrencyFromCode, self.ProductTypeFromCode, self.PromoTypeFromCode]:
+            mappingsHash.update(repr(sorted(mapping.items())))
+        self.Signature = mappingsHash.hexdigest()
+
+class GraphConfig:
+    # the chart families that can be turned off, all of the per currency proceeds charts are one family
+    Families = ["AllInstallsAndUpdates", "Proceeds",
+                "PaidInstallsByCountry", "FreeInstallsByCountry", "AllInstallsByCountry",
+                "NewPaidInstallsByCountry", "NewFreeInstallsByCountry", "NewAllInstallsByCountry"]
+    
+    # the number of days leading up to today that the units and proceeds charts cover
+    DefaultWindowDays = 30
+    
+    def __init__(self, windowDays=DefaultWindowDays):
+        self.DisabledFamilies = set()
+        self.WindowDays = windowDays
+        
+        try:
+            with open('graphConfig.csv', mode='r') as graphConfigFile:
+                reader = csv.reader(graphConfigFile)
+                self.DisabledFamilies = set([rows[0] for rows in reader if len(rows) > 1 and rows[1] == "0"])
+        except IOError:
+            print "Input file graphConfig.csv could not be found. All charts will be generated"
+    
+    def isEnabled(self, graphName):
+        return graphName.split("_")[0] not in self.DisabledFamilies
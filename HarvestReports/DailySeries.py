@@ -0,0 +1,87 @@
+#!/usr/bin/python
+
+# Harvest Reports v0.1.5
+# Copyright (c) 2014-2015 Iain McManus. All rights reserved.
+#
+# Harvest Reports is a wrapper around Apple's AutoIngestion Java Class.
+# Harvest Reports can download all of the recent daily data and will produce
+# a summary of the sales, updates and a breakdown of region where sales have occurred.
+#
+# Information is also generated per version, including a calculation of the number of users
+# on the latest version.
+#
+# Harvest Reports can be run on a regular schedule and be configured to send an email
+# with the daily summary when the daily report is out. If no sales/updates have occurred
+# it can indicate that as well.
+
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in
+# all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN
+# THE SOFTWARE.
+
+import datetime
+
+import numpy as np
+
+class DailySeries:
+    def __init__(self, firstDate, dailyTotals):
+        # dailyTotals[dayOffset] is the total for firstDate + dayOffset days
+        self.firstDate = firstDate
+        self.dailyTotals = np.asarray(dailyTotals)
+        
+        # runningTotals[dayOffset] is the total of every day before firstDate + dayOffset days
+        self.runningTotals = np.concatenate([np.zeros(1, dtype=self.dailyTotals.dtype), np.cumsum(self.dailyTotals)])
+    
+    def __len__(self):
+        return len(self.dailyTotals)
+    
+    def getDayOffset(self, date):
+        return date.toordinal() - self.firstDate.toordinal()
+    
+    def getDates(self):
+        return [self.firstDate + datetime.timedelta(dayOffset) for dayOffset in range(0, len(self.dailyTotals))]
+    
+    def getDailyTotals(self, startDate, numDays):
+        dailyTotals = np.zeros(numDays, dtype=self.dailyTotals.dtype)
+        if len(self.dailyTotals) == 0:
+            return dailyTotals
+        
+        # the days outside of the series have nothing on them
+        startOffset = self.getDayOffset(startDate)
+        firstDay = min(max(-startOffset, 0), numDays)
+        lastDay = min(max(len(self.dailyTotals) - startOffset, 0), numDays)
+        
+        dailyTotals[firstDay:lastDay] = self.dailyTotals[startOffset + firstDay:startOffset + lastDay]
+        return dailyTotals
+    
+    def getTotal(self, startDate, endDate):
+        if len(self.dailyTotals) == 0:
+            return self.runningTotals[0].item()
+        
+        # both dates are included in the total
+        startOffset = min(max(self.getDayOffset(startDate), 0), len(self.dailyTotals))
+        endOffset = min(max(self.getDayOffset(endDate) + 1, startOffset), len(self.dailyTotals))
+        
+        return (self.runningTotals[endOffset] - self.runningTotals[startOffset]).item()
+    
+    def getWindowTotal(self, endDate, numDays):
+        return self.getTotal(endDate - datetime.timedelta(numDays - 1), endDate)
+    
+    def getMonthToDate(self, date):
+        return self.getTotal(date.replace(day=1), date)
+    
+    def getYearToDate(self, date):
+        return self.getTotal(date.replace(month=1, day=1), date)
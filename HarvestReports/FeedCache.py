@@ -0,0 +1,93 @@
+#!/usr/bin/python
+
+# Harvest Reports v0.1.5
+# Copyright (c) 2014-2015 Iain McManus. All rights reserved.
+#
+# Harvest Reports is a wrapper around Apple's AutoIngestion Java Class.
+# Harvest Reports can download all of the recent daily data and will produce
+# a summary of the sales, updates and a breakdown of region where sales have occurred.
+#
+# Information is also generated per version, including a calculation of the number of users
+# on the latest version.
+#
+# Harvest Reports can be run on a regular schedule and be configured to send an email
+# with the daily summary when the daily report is out. If no sales/updates have occurred
+# it can indicate that as well.
+
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in
+# all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN
+# THE SOFTWARE.
+
+import cPickle
+import os
+
+class FeedCache:
+    FormatVersion = 2
+    FileName = "RatingsAndReviewsFeeds.cache"
+    
+    def __init__(self, basePath):
+        self.filePath = os.path.join(basePath, self.FileName)
+        
+        # feed URL -> [ETag, Last-Modified]
+        self.feeds = dict()
+        
+        self.load()
+    
+    def load(self):
+        if not os.path.exists(self.filePath):
+            return
+        
+        try:
+            with open(self.filePath, 'rb') as cacheFile:
+                [formatVersion, feeds] = cPickle.load(cacheFile)
+        except (IOError, EOFError, ValueError, TypeError, cPickle.UnpicklingError):
+            # a damaged cache just means the feeds are downloaded in full
+            return
+        
+        if formatVersion == self.FormatVersion:
+            self.feeds = feeds
+    
+    def getValidators(self, feedURL):
+        if feedURL not in self.feeds:
+            return [None, None]
+        
+        return self.feeds[feedURL]
+    
+    def update(self, feedURL, etag, modified):
+        # without a validator there is nothing to send on the next request
+        if etag == None and modified == None:
+            self.feeds.pop(feedURL, None)
+            return
+        
+        self.feeds.update({feedURL : [etag, modified]})
+    
+    def remove(self, feedURL):
+        self.feeds.pop(feedURL, None)
+    
+    def save(self):
+        workingPath = self.filePath + ".tmp"
+        
+        try:
+            with open(workingPath, 'wb') as cacheFile:
+                cPickle.dump([self.FormatVersion, self.feeds], cacheFile, cPickle.HIGHEST_PROTOCOL)
+            
+            # swap the new cache in so a partially written one is never read
+            os.rename(workingPath, self.filePath)
+        except (IOError, OSError):
+            # the cache is only an optimisation so a failure to write is not fatal
+            if os.path.exists(workingPath):
+                os.remove(workingPath)
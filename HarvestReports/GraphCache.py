@@ -0,0 +1,101 @@
+#!/usr/bin/python
+
+# Harvest Reports v0.1.5
+# Copyright (c) 2014-2015 Iain McManus. All rights reserved.
+#
+# Harvest Reports is a wrapper around Apple's AutoIngestion Java Class.
+# Harvest Reports can download all of the recent daily data and will produce
+# a summary of the sales, updates and a breakdown of region where sales have occurred.
+#
+# Information is also generated per version, including a calculation of the number of users
+# on the latest version.
+#
+# Harvest Reports can be run on a regular schedule and be configured to send an email
+# with the daily summary when the daily report is out. If no sales/updates have occurred
+# it can indicate that as well.
+
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in
+# all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN
+# THE SOFTWARE.
+
+import cPickle
+import os
+
+class GraphCache:
+    FormatVersion = 1
+    FileName = "Graphs.cache"
+    
+    def __init__(self, basePath):
+        self.filePath = os.path.join(basePath, self.FileName)
+        
+        # chart file name -> [hash of the chart job, size, mtime of the chart as it was written]
+        self.graphs = dict()
+        
+        self.load()
+    
+    def load(self):
+        if not os.path.exists(self.filePath):
+            return
+        
+        try:
+            with open(self.filePath, 'rb') as cacheFile:
+                [formatVersion, graphs] = cPickle.load(cacheFile)
+        except (IOError, EOFError, ValueError, TypeError, cPickle.UnpicklingError):
+            # a damaged cache just means every chart is drawn again
+            return
+        
+        if formatVersion == self.FormatVersion:
+            self.graphs = graphs
+    
+    def getFileSignature(self, fileName):
+        try:
+            fileStats = os.stat(fileName)
+        except OSError:
+            return None
+        
+        return [fileStats.st_size, fileStats.st_mtime]
+    
+    def isCurrent(self, fileName, graphHash):
+        graphName = os.path.basename(fileName)
+        if graphName not in self.graphs:
+            return False
+        
+        # the chart must still be the one that was drawn for this job
+        [cachedHash, fileSize, fileModified] = self.graphs[graphName]
+        return cachedHash == graphHash and self.getFileSignature(fileName) == [fileSize, fileModified]
+    
+    def update(self, fileName, graphHash):
+        fileSignature = self.getFileSignature(fileName)
+        if fileSignature == None:
+            self.graphs.pop(os.path.basename(fileName), None)
+            return
+        
+        self.graphs.update({os.path.basename(fileName) : [graphHash] + fileSignature})
+    
+    def save(self):
+        workingPath = self.filePath + ".tmp"
+        
+        try:
+            with open(workingPath, 'wb') as cacheFile:
+                cPickle.dump([self.FormatVersion, self.graphs], cacheFile, cPickle.HIGHEST_PROTOCOL)
+            
+            # swap the new cache in so a partially written one is never read
+            os.rename(workingPath, self.filePath)
+        except (IOError, OSError):
+            # the cache is only an optimisation so a failure to write is not fatal
+            if os.path.exists(workingPath):
+                os.remove(workingPath)
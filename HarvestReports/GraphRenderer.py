@@ -0,0 +1,242 @@
+#!/usr/bin/python
+
+# Harvest Reports v0.1.5
+# Copyright (c) 2014-2015 Iain McManus. All rights reserved.
+#
+# Harvest Reports is a wrapper around Apple's AutoIngestion Java Class.
+# Harvest Reports can download all of the recent daily data and will produce
+# a summary of the sales, updates and a breakdown of region where sales have occurred.
+#
+# Information is also generated per version, including a calculation of the number of users
+# on the latest version.
+#
+# Harvest Reports can be run on a regular schedule and be configured to send an email
+# with the daily summary when the daily report is out. If no sales/updates have occurred
+# it can indicate that as well.
+
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in
+# all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN
+# THE SOFTWARE.
+
+import hashlib
+import math
+import multiprocessing
+
+import numpy as np
+
+from Common import GraphTypes
+from GraphCache import GraphCache
+
+# increase whenever the way the charts are drawn changes so that cached charts are drawn again
+GraphStyleVersion = 1
+
+def loadPyplot():
+    # pyplot is slow to load so it is only loaded once a chart is drawn, the charts are only ever saved to file so no display is needed
+    import matplotlib
+    matplotlib.use("Agg")
+    
+    import matplotlib.pyplot as plt
+    return plt
+
+def saveUnitsGraph(fileName, name, installs, updates, entryDates):
+    plt = loadPyplot()
+    
+    barWidth = 0.35
+    barIndices = np.arange(len(entryDates))
+
+    maxY = max(max(installs), max(updates)) + 1
+
+    figure, unitsGraph = plt.subplots()
+    installsRects = unitsGraph.bar(barIndices, installs, barWidth, color='g')
+    updatesRects = unitsGraph.bar(barIndices+barWidth, updates, barWidth, color='b')
+    plt.ylim(ymax=maxY, ymin=0)
+
+    unitsGraph.set_ylabel("Units")
+    unitsGraph.set_title("Sales Data for {name}".format(name=name))
+    unitsGraph.set_xticks(barIndices+barWidth)
+    unitsGraph.set_xticklabels(entryDates, rotation=-90)
+
+    unitsGraph.legend((installsRects[0], updatesRects[0]), ('Installs', 'Updates'), bbox_to_anchor=(1.05, 1), loc=2, borderaxespad=0.)
+
+    def autolabel(rects):
+        for rect in rects:
+            height = rect.get_height()
+            if height > 0:
+                unitsGraph.text(rect.get_x()+rect.get_width()/2., 1.05*height, '%d'%int(height), ha='center', va='bottom')
+
+    autolabel(installsRects)
+    autolabel(updatesRects)
+
+    plt.savefig(fileName,bbox_inches='tight',dpi=100)
+    
+    plt.close('all')
+
+def saveProceedsGraph(fileName, name, proceeds, currencyCode, entryDates):
+    plt = loadPyplot()
+    
+    barWidth = 0.7
+    barIndices = np.arange(len(entryDates))
+
+    maxY = math.ceil(max(proceeds)) + 1
+
+    figure, unitsGraph = plt.subplots()
+    proceedsRects = unitsGraph.bar(barIndices, proceeds, barWidth, color='g')
+    plt.ylim(ymax=maxY, ymin=0)
+
+    unitsGraph.set_ylabel("Amount Earned {code}".format(code=currencyCode))
+    unitsGraph.set_title("Proceeds for {name} in {code}".format(name=name, code=currencyCode))
+    unitsGraph.set_xticks(barIndices+barWidth)
+    unitsGraph.set_xticklabels(entryDates, rotation=-90)
+
+    def autolabel(rects):
+        for rect in rects:
+            height = rect.get_height()
+            if height > 0:
+                unitsGraph.text(rect.get_x()+rect.get_width()/2., 1.05*height, '%1.2f'%float(height), ha='center', va='bottom', rotation=-90)
+
+    autolabel(proceedsRects)
+
+    plt.savefig(fileName,bbox_inches='tight',dpi=100)
+    
+    plt.close('all')
+
+def saveCountryInstallsChart(fileName, title, countries, installs):
+    plt = loadPyplot()
+    
+    countryLabels = []
+    for countryIdx in range(0, len(countries)):
+        countryLabels.append(countries[countryIdx] + " ({installs})".format(installs=installs[countryIdx]))
+    
+    plt.figure(1, figsize=(6,6))
+
+    pieWedges = plt.pie(installs, labels=countryLabels, shadow=False)
+    
+    # make the edges white (From http://nxn.se/post/46440196846/making-nicer-looking-pie-charts-with-matplotlib)
+    for wedge in pieWedges[0]:
+        wedge.set_edgecolor('white')
+        
+    plt.title(title)
+
+    plt.savefig(fileName, bbox_inches='tight', dpi=100)
+    
+    plt.close('all')
+
+def renderGraph(graphJob):
+    [graphType, fileName, graphArguments] = graphJob
+    
+    if graphType == GraphTypes.Units:
+        saveUnitsGraph(fileName, *graphArguments)
+    elif graphType == GraphTypes.Proceeds:
+        saveProceedsGraph(fileName, *graphArguments)
+    elif graphType == GraphTypes.CountryInstalls:
+        saveCountryInstallsChart(fileName, *graphArguments)
+    
+    return fileName
+
+def getGraphHash(graphJob):
+    import matplotlib
+    
+    # the job holds everything that is drawn so identical jobs produce identical charts
+    return hashlib.md5(repr([GraphStyleVersion, matplotlib.__version__, graphJob])).hexdigest()
+
+def renderGraphs(perSKUData, numWorkers, graphNames=None):
+    graphs = dict()
+    graphCaches = dict()
+    
+    # collect the requested charts for every SKU so the workers can be kept busy across SKUs
+    graphJobs = []
+    for [skuName, skuSummary] in perSKUData.items():
+        graphs.update({skuName : skuSummary.Graphs})
+        
+        if skuSummary.basePath not in graphCaches:
+            graphCaches.update({skuSummary.basePath : GraphCache(skuSummary.basePath)})
+        graphCache = graphCaches[skuSummary.basePath]
+        
+        for [graphName, graphJob] in skuSummary.Graphs.getGraphJobs():
+            if (graphNames != None and graphName not in graphNames) or skuSummary.Graphs.isRendered(graphName):
+                continue
+            
+            [graphType, fileName, graphArguments] = graphJob
+            graphHash = getGraphHash(graphJob)
+            
+            # charts whose data has not changed since they were last drawn are reused
+            if graphCache.isCurrent(fileName, graphHash):
+                skuSummary.Graphs.setRendered(graphName, fileName)
+            else:
+                graphJobs.append([skuName, graphName, graphJob, graphHash])
+    
+    if numWorkers > 1 and len(graphJobs) > 1:
+        workerPool = multiprocessing.Pool(min(numWorkers, len(graphJobs)))
+        
+        try:
+            fileNames = workerPool.map(renderGraph, [graphJob for [skuName, graphName, graphJob, graphHash] in graphJobs], 1)
+        finally:
+            workerPool.close()
+            workerPool.join()
+    else:
+        fileNames = [renderGraph(graphJob) for [skuName, graphName, graphJob, graphHash] in graphJobs]
+    
+    for [[skuName, graphName, graphJob, graphHash], fileName] in zip(graphJobs, fileNames):
+        graphs[skuName].setRendered(graphName, fileName)
+        graphCaches[perSKUData[skuName].basePath].update(fileName, graphHash)
+    
+    if len(graphJobs) > 0:
+        for graphCache in graphCaches.values():
+            graphCache.save()
+    
+    return graphs
+
+class LazyGraphs:
+    def __init__(self, skuSummary, graphConfig):
+        self.skuSummary = skuSummary
+        self.graphConfig = graphConfig
+        
+        # chart name -> file name for the charts that have been drawn
+        self.renderedGraphs = dict()
+    
+    def getGraphJobs(self):
+        graphJobs = self.skuSummary.getGraphJobs()
+        
+        if self.graphConfig == None:
+            return graphJobs
+        
+        return [[graphName, graphJob] for [graphName, graphJob] in graphJobs if self.graphConfig.isEnabled(graphName)]
+    
+    def isRendered(self, graphName):
+        return graphName in self.renderedGraphs
+    
+    def setRendered(self, graphName, fileName):
+        self.renderedGraphs.update({graphName : fileName})
+    
+    def keys(self):
+        return [graphName for [graphName, graphJob] in self.getGraphJobs()]
+    
+    def __contains__(self, graphName):
+        return graphName in self.keys()
+    
+    def __iter__(self):
+        return iter(self.keys())
+    
+    def __len__(self):
+        return len(self.keys())
+    
+    def __getitem__(self, graphName):
+        # charts are only drawn the first time they are asked for
+        if graphName not in self.renderedGraphs:
+            renderGraphs({self.skuSummary.SKU : self.skuSummary}, 1, [graphName])
+        
+        return self.renderedGraphs[graphName]
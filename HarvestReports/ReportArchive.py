@@ -0,0 +1,203 @@
+#!/usr/bin/python
+
+# Harvest Reports v0.1.5
+# Copyright (c) 2014-2015 Iain McManus. All rights reserved.
+#
+# Harvest Reports is a wrapper around Apple's AutoIngestion Java Class.
+# Harvest Reports can download all of the recent daily data and will produce
+# a summary of the sales, updates and a breakdown of region where sales have occurred.
+#
+# Information is also generated per version, including a calculation of the number of users
+# on the latest version.
+#
+# Harvest Reports can be run on a regular schedule and be configured to send an email
+# with the daily summary when the daily report is out. If no sales/updates have occurred
+# it can indicate that as well.
+
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in
+# all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN
+# THE SOFTWARE.
+
+import os
+import re
+import StringIO
+import time
+import zipfile
+
+# archived reports are addressed as <archive path>/<report file name>
+ArchiveExtension = ".zip"
+ArchivedPathMarker = ArchiveExtension + os.sep
+
+# the archives open in this process, archive path -> [size, modified time, open archive]
+openArchives = dict()
+
+def splitArchivedPath(reportFile):
+    if ArchivedPathMarker not in reportFile:
+        return None
+    
+    [archivePath, memberName] = reportFile.rsplit(ArchivedPathMarker, 1)
+    return [archivePath + ArchiveExtension, memberName]
+
+def isArchivedPath(reportFile):
+    return splitArchivedPath(reportFile) != None
+
+def openArchive(archivePath):
+    archiveStat = os.stat(archivePath)
+    
+    # reuse the archive if it has not been rewritten since it was opened
+    if archivePath in openArchives:
+        [archiveSize, archiveModifiedTime, archive] = openArchives[archivePath]
+        if archiveSize == archiveStat.st_size and archiveModifiedTime == archiveStat.st_mtime:
+            return archive
+        
+        archive.close()
+    
+    archive = zipfile.ZipFile(archivePath, 'r')
+    openArchives.update({archivePath : [archiveStat.st_size, archiveStat.st_mtime, archive]})
+    
+    return archive
+
+def getMemberSignature(memberInfo):
+    # the size and modified time of the report before it was archived are kept in the member comment
+    [fileSize, fileModifiedTime] = memberInfo.comment.split(":")
+    return [int(fileSize), float(fileModifiedTime)]
+
+def getReportSignature(reportFile):
+    archivedPath = splitArchivedPath(reportFile)
+    if archivedPath == None:
+        reportFileStat = os.stat(reportFile)
+        return [reportFileStat.st_size, reportFileStat.st_mtime]
+    
+    [archivePath, memberName] = archivedPath
+    return getMemberSignature(openArchive(archivePath).getinfo(memberName))
+
+def readReportLines(reportFile):
+    archivedPath = splitArchivedPath(reportFile)
+    if archivedPath == None:
+        reportFileHandle = open(reportFile, 'r')
+        reportFileContents = reportFileHandle.readlines()
+        reportFileHandle.close()
+        
+        return reportFileContents
+    
+    [archivePath, memberName] = archivedPath
+    return StringIO.StringIO(openArchive(archivePath).read(memberName)).readlines()
+
+class ReportArchive:
+    # each archive holds one month of dailies, eg. S_D_<vendor>_201409.zip
+    ArchivePattern = re.compile(r"^S_D_(\d+)_(\d{6})\.zip$")
+    DailyPattern = re.compile(r"^S_D_(\d+)_(\d{6})\d{2}\.txt$")
+    
+    def __init__(self, basePath):
+        self.basePath = basePath
+        
+        # report file name -> [archived path, [size, modified time] of the report when it was archived]
+        self.members = dict()
+        
+        self.load()
+    
+    def load(self):
+        self.members = dict()
+        
+        for archiveName in sorted(os.listdir(self.basePath)):
+            if not self.ArchivePattern.match(archiveName):
+                continue
+            
+            archivePath = os.path.join(self.basePath, archiveName)
+            
+            try:
+                for memberInfo in openArchive(archivePath).infolist():
+                    self.members.update({memberInfo.filename : [os.path.join(archivePath, memberInfo.filename), getMemberSignature(memberInfo)]})
+            except (IOError, OSError, ValueError, zipfile.BadZipfile):
+                print "Unable to read the report archive {archiveName}".format(archiveName=archiveName)
+    
+    def isArchived(self, fileName):
+        return fileName in self.members
+    
+    def getArchivedPath(self, fileName):
+        return self.members[fileName][0]
+    
+    def getReportSignatures(self):
+        return dict([[fileName, self.members[fileName][1]] for fileName in self.members])
+    
+    def compact(self, today):
+        # only months that have finished are archived, the current month is still being downloaded
+        currentMonth = "{year:04}{month:02}".format(year=today.year, month=today.month)
+        
+        dailiesByArchive = dict()
+        for fileName in os.listdir(self.basePath):
+            dailyMatch = self.DailyPattern.match(fileName)
+            
+            if dailyMatch and dailyMatch.group(2) < currentMonth:
+                archiveName = "S_D_{vendorId}_{month}{extension}".format(vendorId=dailyMatch.group(1), month=dailyMatch.group(2), extension=ArchiveExtension)
+                dailiesByArchive.setdefault(archiveName, []).append(fileName)
+        
+        numArchivedFiles = 0
+        for archiveName in sorted(dailiesByArchive.keys()):
+            fileNames = dailiesByArchive[archiveName]
+            
+            if not self.writeArchive(os.path.join(self.basePath, archiveName), fileNames):
+                print "Unable to write the report archive {archiveName}".format(archiveName=archiveName)
+                continue
+            
+            # the loose reports (and their caches) are only removed once they are safely in the archive
+            for fileName in fileNames:
+                filePath = os.path.join(self.basePath, fileName)
+                
+                os.remove(filePath)
+                if os.path.exists(filePath + ".cache"):
+                    os.remove(filePath + ".cache")
+            
+            numArchivedFiles += len(fileNames)
+        
+        self.load()
+        
+        return [numArchivedFiles, len(dailiesByArchive)]
+    
+    def writeArchive(self, archivePath, fileNames):
+        workingPath = archivePath + ".tmp"
+        
+        try:
+            with zipfile.ZipFile(workingPath, 'w', zipfile.ZIP_DEFLATED) as archive:
+                # carry over the reports already archived for the month, unless they have been downloaded again
+                if os.path.exists(archivePath):
+                    existingArchive = openArchive(archivePath)
+                    
+                    for memberInfo in existingArchive.infolist():
+                        if memberInfo.filename not in fileNames:
+                            archive.writestr(memberInfo, existingArchive.read(memberInfo.filename))
+                
+                for fileName in sorted(fileNames):
+                    filePath = os.path.join(self.basePath, fileName)
+                    fileStat = os.stat(filePath)
+                    
+                    memberInfo = zipfile.ZipInfo(fileName, time.localtime(fileStat.st_mtime)[:6])
+                    memberInfo.compress_type = zipfile.ZIP_DEFLATED
+                    memberInfo.comment = "{size}:{modified!r}".format(size=fileStat.st_size, modified=fileStat.st_mtime)
+                    
+                    with open(filePath, 'rb') as reportFile:
+                        archive.writestr(memberInfo, reportFile.read())
+            
+            # swap the new archive in so a partially written one is never read
+            os.rename(workingPath, archivePath)
+        except (IOError, OSError, zipfile.BadZipfile):
+            if os.path.exists(workingPath):
+                os.remove(workingPath)
+            
+            return False
+        
+        return True
@@ -0,0 +1,216 @@
+#!/usr/bin/python
+
+# Harvest Reports v0.1.5
+# Copyright (c) 2014-2015 Iain McManus. All rights reserved.
+#
+# Harvest Reports is a wrapper around Apple's AutoIngestion Java Class.
+# Harvest Reports can download all of the recent daily data and will produce
+# a summary of the sales, updates and a breakdown of region where sales have occurred.
+#
+# Information is also generated per version, including a calculation of the number of users
+# on the latest version.
+#
+# Harvest Reports can be run on a regular schedule and be configured to send an email
+# with the daily summary when the daily report is out. If no sales/updates have occurred
+# it can indicate that as well.
+
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in
+# all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN
+# THE SOFTWARE.
+
+import marshal
+import mmap
+import multiprocessing
+import os
+import struct
+
+import numpy as np
+
+from ReportArchive import getReportSignature, isArchivedPath
+from SalesReportFile import SalesReportFile
+
+# the field mappings for a parse worker process, set up once when the worker starts
+workerFieldRemapper = None
+
+def initialiseParseWorker(fieldRemapper):
+    global workerFieldRemapper
+    workerFieldRemapper = fieldRemapper
+
+def parseReportFileInWorker(reportFile):
+    # only the typed columns and category tables are sent back to the main process
+    return SalesReportFile(reportFile, False, workerFieldRemapper).getParsedColumns()
+
+class ReportCache:
+    FormatVersion = 2
+    FileExtension = ".cache"
+    FileMagic = "HRPC"
+    
+    # arrays are padded to this many bytes so they can be used in place from the mapped file
+    ArrayAlignment = 8
+    
+    def __init__(self, fieldRemapper):
+        self.fieldRemapper = fieldRemapper
+        
+    def getCachePath(self, reportFile):
+        return reportFile + self.FileExtension
+        
+    def loadReportFile(self, reportFile, isNewFile):
+        # use the cached columns if the report file has not changed since they were stored
+        cachedFile = self.loadCachedReportFile(reportFile, isNewFile)
+        if cachedFile != None:
+            return cachedFile
+        
+        # otherwise parse the report and cache the result for next time
+        parsedFile = SalesReportFile(reportFile, isNewFile, self.fieldRemapper)
+        self.storeReportFile(parsedFile)
+        
+        return parsedFile
+    
+    def loadReportFiles(self, reportFiles, numWorkers):
+        salesReportObjects = dict()
+        
+        # take everything possible from the cache, placeholders for eventless days are quick enough to parse in place
+        filesToParse = []
+        for [reportFile, isNewFile] in reportFiles:
+            cachedFile = self.loadCachedReportFile(reportFile, isNewFile)
+            
+            if cachedFile != None:
+                salesReportObjects.update({reportFile : cachedFile})
+            elif numWorkers > 1 and getReportSignature(reportFile)[0] > 0:
+                filesToParse.append([reportFile, isNewFile])
+            else:
+                parsedFile = SalesReportFile(reportFile, isNewFile, self.fieldRemapper)
+                self.storeReportFile(parsedFile)
+                
+                salesReportObjects.update({reportFile : parsedFile})
+        
+        # parse the remaining files across a pool of worker processes
+        if len(filesToParse) > 0:
+            workerPool = multiprocessing.Pool(min(numWorkers, len(filesToParse)), initialiseParseWorker, (self.fieldRemapper,))
+            
+            try:
+                parsedColumnsList = workerPool.imap(parseReportFileInWorker, [reportFile for [reportFile, isNewFile] in filesToParse])
+                
+                for [reportFile, isNewFile] in filesToParse:
+                    parsedFile = SalesReportFile(reportFile, isNewFile, self.fieldRemapper, parsedColumnsList.next())
+                    self.storeReportFile(parsedFile)
+                    
+                    salesReportObjects.update({reportFile : parsedFile})
+            finally:
+                workerPool.close()
+                workerPool.join()
+        
+        # hand back the files in the order they were requested
+        return [salesReportObjects[reportFile] for [reportFile, isNewFile] in reportFiles]
+    
+    def loadCachedReportFile(self, reportFile, isNewFile):
+        reportFileSignature = getReportSignature(reportFile)
+        
+        # placeholder files for eventless days are empty so there is nothing worth caching
+        if reportFileSignature[0] == 0:
+            return SalesReportFile(reportFile, isNewFile, self.fieldRemapper)
+        
+        # archived reports are not cached, they are only read again when the totals are rebuilt
+        if isArchivedPath(reportFile):
+            return None
+        
+        cachedColumns = self.readCache(reportFile, reportFileSignature)
+        if cachedColumns != None:
+            return SalesReportFile(reportFile, isNewFile, self.fieldRemapper, cachedColumns)
+        
+        return None
+    
+    def storeReportFile(self, parsedFile):
+        if isArchivedPath(parsedFile.fileName):
+            return
+        
+        reportFileSignature = getReportSignature(parsedFile.fileName)
+        
+        if reportFileSignature[0] > 0:
+            self.writeCache(parsedFile.fileName, reportFileSignature, parsedFile)
+        
+    def readCache(self, reportFile, reportFileSignature):
+        cachePath = self.getCachePath(reportFile)
+        
+        if not os.path.exists(cachePath):
+            return None
+        
+        try:
+            with open(cachePath, 'rb') as cacheHandle:
+                cacheMap = mmap.mmap(cacheHandle.fileno(), 0, access=mmap.ACCESS_READ)
+            
+            [magic, headerLength] = struct.unpack_from("<4sI", cacheMap, 0)
+            if magic != self.FileMagic:
+                return None
+            
+            [formatVersion, signature, fileName, fileSize, fileModifiedTime, numLines, fieldNames, categories, irregularValues, columnLayout] = marshal.loads(cacheMap[8:8 + headerLength])
+            
+            # the cache is only valid for exactly the same report file and field mappings
+            if formatVersion != self.FormatVersion or signature != self.fieldRemapper.Signature:
+                return None
+            if fileName != os.path.basename(reportFile) or [fileSize, fileModifiedTime] != reportFileSignature:
+                return None
+            
+            # the columns are used directly from the mapped file, which stays open for as long as they are in use
+            blobStart = self.getAlignedOffset(8 + headerLength)
+            columns = dict()
+            for [fieldName, arrayType, blobOffset, arrayLength] in columnLayout:
+                columns.update({fieldName : np.frombuffer(cacheMap, dtype=np.dtype(arrayType), count=arrayLength, offset=blobStart + blobOffset)})
+            
+            return [numLines, fieldNames, columns, categories, irregularValues]
+        except (IOError, OSError, EOFError, ValueError, TypeError, IndexError, struct.error):
+            # a damaged cache is treated the same as a missing one
+            return None
+        
+    def writeCache(self, reportFile, reportFileSignature, parsedFile):
+        [numLines, fieldNames, columns, categories, irregularValues] = parsedFile.getParsedColumns()
+        
+        # lay out each column one after the other
+        columnLayout = []
+        blobs = []
+        blobOffset = 0
+        for fieldName in fieldNames:
+            blob = columns[fieldName].tostring()
+            blob += "\0" * (self.getAlignedOffset(len(blob)) - len(blob))
+            
+            columnLayout.append([fieldName, columns[fieldName].dtype.str, blobOffset, len(columns[fieldName])])
+            blobs.append(blob)
+            blobOffset += len(blob)
+        
+        header = marshal.dumps([self.FormatVersion, self.fieldRemapper.Signature, os.path.basename(reportFile), reportFileSignature[0], reportFileSignature[1], numLines, fieldNames, categories, irregularValues, columnLayout])
+        
+        cachePath = self.getCachePath(reportFile)
+        workingPath = cachePath + ".tmp"
+        
+        try:
+            cacheHandle = open(workingPath, 'wb')
+            cacheHandle.write(struct.pack("<4sI", self.FileMagic, len(header)))
+            cacheHandle.write(header)
+            cacheHandle.write("\0" * (self.getAlignedOffset(8 + len(header)) - (8 + len(header))))
+            for blob in blobs:
+                cacheHandle.write(blob)
+            cacheHandle.close()
+            
+            # swap the new cache in so a partially written cache is never read
+            os.rename(workingPath, cachePath)
+        except (IOError, OSError):
+            # caching is only an optimisation so a failure to write is not fatal
+            if os.path.exists(workingPath):
+                os.remove(workingPath)
+    
+    def getAlignedOffset(self, offset):
+        return ((offset + self.ArrayAlignment - 1) // self.ArrayAlignment) * self.ArrayAlignment
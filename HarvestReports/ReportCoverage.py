@@ -0,0 +1,154 @@
+#!/usr/bin/python
+
+# Harvest Reports v0.1.5
+# Copyright (c) 2014-2015 Iain McManus. All rights reserved.
+#
+# Harvest Reports is a wrapper around Apple's AutoIngestion Java Class.
+# Harvest Reports can download all of the recent daily data and will produce
+# a summary of the sales, updates and a breakdown of region where sales have occurred.
+#
+# Information is also generated per version, including a calculation of the number of users
+# on the latest version.
+#
+# Harvest Reports can be run on a regular schedule and be configured to send an email
+# with the daily summary when the daily report is out. If no sales/updates have occurred
+# it can indicate that as well.
+
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in
+# all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN
+# THE SOFTWARE.
+
+import datetime
+import re
+
+# strptime imports this on its first call, which fails if several threads make that first call at once
+import _strptime
+
+from Common import ReportPeriods
+
+# the letter in the report file name and the date type requested from Autoingestion for each report period
+PeriodCodes = ["D", "W", "M", "Y"]
+PeriodNames = ["daily", "weekly", "monthly", "yearly"]
+
+# eg. S_D_<vendor>_20150131.txt, S_W_<vendor>_20150201.txt (the Sunday ending the week), S_M_<vendor>_201501.txt, S_Y_<vendor>_2015.txt
+ReportFilePattern = re.compile(r"^S_([DWMY])_(\d+)_(\d{4}|\d{6}|\d{8})\.txt$")
+
+def getNextMonth(date):
+    return (date.replace(day=28) + datetime.timedelta(days=4)).replace(day=1)
+
+def getPeriodDateString(reportPeriod, periodEndDate):
+    if reportPeriod == ReportPeriods.Monthly:
+        return "{year:04}{month:02}".format(year=periodEndDate.year, month=periodEndDate.month)
+    if reportPeriod == ReportPeriods.Yearly:
+        return "{year:04}".format(year=periodEndDate.year)
+    
+    return "{year:04}{month:02}{day:02}".format(year=periodEndDate.year, month=periodEndDate.month, day=periodEndDate.day)
+
+def getReportFileName(vendorId, reportPeriod, periodEndDate):
+    return "S_{periodCode}_{vendorId}_{dateString}.txt".format(periodCode=PeriodCodes[reportPeriod], vendorId=vendorId, dateString=getPeriodDateString(reportPeriod, periodEndDate))
+
+def getPeriodDescription(reportPeriod, periodEndDate):
+    if reportPeriod == ReportPeriods.Weekly:
+        return "the week ending {day:02}/{month:02}/{year:04}".format(day=periodEndDate.day, month=periodEndDate.month, year=periodEndDate.year)
+    if reportPeriod == ReportPeriods.Monthly:
+        return "{month:02}/{year:04}".format(month=periodEndDate.month, year=periodEndDate.year)
+    if reportPeriod == ReportPeriods.Yearly:
+        return "{year:04}".format(year=periodEndDate.year)
+    
+    return "{day:02}/{month:02}/{year:04}".format(day=periodEndDate.day, month=periodEndDate.month, year=periodEndDate.year)
+
+def getReportPeriod(fileName):
+    # returns [report period, first day, last day] for the report, or None if the name is not recognised
+    fileNameMatch = ReportFilePattern.match(fileName)
+    if not fileNameMatch:
+        return None
+    
+    reportPeriod = PeriodCodes.index(fileNameMatch.group(1))
+    dateString = fileNameMatch.group(3)
+    
+    try:
+        if reportPeriod == ReportPeriods.Daily and len(dateString) == 8:
+            lastDay = datetime.datetime.strptime(dateString, "%Y%m%d").date()
+            return [reportPeriod, lastDay, lastDay]
+        if reportPeriod == ReportPeriods.Weekly and len(dateString) == 8:
+            lastDay = datetime.datetime.strptime(dateString, "%Y%m%d").date()
+            return [reportPeriod, lastDay - datetime.timedelta(days=6), lastDay]
+        if reportPeriod == ReportPeriods.Monthly and len(dateString) == 6:
+            firstDay = datetime.datetime.strptime(dateString, "%Y%m").date()
+            return [reportPeriod, firstDay, getNextMonth(firstDay) - datetime.timedelta(days=1)]
+        if reportPeriod == ReportPeriods.Yearly and len(dateString) == 4:
+            firstDay = datetime.date(int(dateString), 1, 1)
+            return [reportPeriod, firstDay, firstDay.replace(month=12, day=31)]
+    except ValueError:
+        pass
+    
+    return None
+
+def getRequestedPeriods(reportPeriod, today, numPeriodsBack):
+    # the last day of each period to request, most recent first
+    if reportPeriod == ReportPeriods.Daily:
+        return [today - datetime.timedelta(dayOffset) for dayOffset in range(0, numPeriodsBack)]
+    
+    # the coarser reports only exist once the period has finished
+    periodEndDates = []
+    if reportPeriod == ReportPeriods.Weekly:
+        lastSunday = today - datetime.timedelta(days=today.weekday() + 1)
+        periodEndDates = [lastSunday - datetime.timedelta(weeks=weekOffset) for weekOffset in range(0, numPeriodsBack)]
+    elif reportPeriod == ReportPeriods.Monthly:
+        periodEndDate = today.replace(day=1) - datetime.timedelta(days=1)
+        for monthOffset in range(0, numPeriodsBack):
+            periodEndDates.append(periodEndDate)
+            periodEndDate = periodEndDate.replace(day=1) - datetime.timedelta(days=1)
+    elif reportPeriod == ReportPeriods.Yearly:
+        periodEndDates = [datetime.date(today.year - 1 - yearOffset, 12, 31) for yearOffset in range(0, numPeriodsBack)]
+    
+    return periodEndDates
+
+def selectReportCoverage(fileNames):
+    # picks the reports to read so that every day is counted exactly once, with the coarsest report for a day taking
+    # the place of any finer ones. returns [file names to read, ordinals of the days covered by the coarser reports]
+    reportPeriods = dict()
+    selectedFileNames = []
+    
+    for fileName in fileNames:
+        reportPeriod = getReportPeriod(fileName)
+        
+        # anything that does not follow the naming is read as before
+        if reportPeriod == None:
+            selectedFileNames.append(fileName)
+        else:
+            reportPeriods.update({fileName : reportPeriod})
+    
+    coveredDays = set()
+    coarseDays = set()
+    
+    # a report is only used if none of its days have been covered already. days that a coarser report only
+    # partly overlaps (eg. a week spanning two months) are left for the finer reports
+    for fileName in sorted(reportPeriods.keys(), key=lambda fileName: [-reportPeriods[fileName][0], reportPeriods[fileName][1], fileName]):
+        [reportPeriod, firstDay, lastDay] = reportPeriods[fileName]
+        reportDays = range(firstDay.toordinal(), lastDay.toordinal() + 1)
+        
+        if any(reportDay in coveredDays for reportDay in reportDays):
+            continue
+        
+        selectedFileNames.append(fileName)
+        coveredDays.update(reportDays)
+        
+        if reportPeriod != ReportPeriods.Daily:
+            coarseDays.update(reportDays)
+    
+    return [selectedFileNames, coarseDays]
@@ -0,0 +1,228 @@
+#!/usr/bin/python
+
+# Harvest Reports v0.1.5
+# Copyright (c) 2014-2015 Iain McManus. All rights reserved.
+#
+# Harvest Reports is a wrapper around Apple's AutoIngestion Java Class.
+# Harvest Reports can download all of the recent daily data and will produce
+# a summary of the sales, updates and a breakdown of region where sales have occurred.
+#
+# Information is also generated per version, including a calculation of the number of users
+# on the latest version.
+#
+# Harvest Reports can be run on a regular schedule and be configured to send an email
+# with the daily summary when the daily report is out. If no sales/updates have occurred
+# it can indicate that as well.
+
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in
+# all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN
+# THE SOFTWARE.
+
+import cPickle
+import os
+
+import numpy as np
+
+# the classes a report line can fall into, stored together as bit flags on each cell
+UpdateFlag, PaidFlag, PositiveProceedsFlag, RefundFlag, PromoCodeFlag = [1, 2, 4, 8, 16]
+
+class CubeCells:
+    def __init__(self, reportCube, cellIndices, isNewCell):
+        # the columns of the selected cells, with the categories shared with the cube
+        self.columns = dict([[columnName, reportCube.columns[columnName][cellIndices]] for columnName in reportCube.columns])
+        self.categories = reportCube.categories
+        self.isNewCell = isNewCell[cellIndices]
+    
+    def __len__(self):
+        return len(self.columns["units"])
+
+class ReportCube:
+    FormatVersion = 1
+    FileName = "SKUAggregates.cube"
+    
+    # each cell totals the units and proceeds of the lines of one report that share all of these
+    CategoryFields = ["SKU", "Title", "Apple Identifier", "Country Code", "Version", "Currency Code of Proceeds"]
+    KeyColumns = ["date", "flags"] + CategoryFields
+    
+    # the first line of each cell within its report is kept so the cells can be summed in report line order
+    ColumnTypes = [["file", np.int32], ["line", np.int32], ["date", np.int32], ["flags", np.int8]] + [[fieldName, np.int32] for fieldName in CategoryFields] + [["units", np.int64], ["proceeds", np.float64]]
+    
+    def __init__(self, basePath, fieldRemapper):
+        self.filePath = os.path.join(basePath, self.FileName)
+        self.signature = fieldRemapper.Signature
+        
+        self.reset()
+        self.load()
+    
+    def reset(self):
+        # report file name -> [size, modified time] for every report in the cube
+        self.appliedFiles = dict()
+        
+        # the report file names and category values that the codes in the columns refer to
+        self.fileNames = []
+        self.categories = dict([[fieldName, []] for fieldName in self.CategoryFields])
+        self.categoryCodes = dict([[fieldName, dict()] for fieldName in self.CategoryFields])
+        
+        self.columns = dict([[columnName, np.zeros(0, dtype=columnType)] for [columnName, columnType] in self.ColumnTypes])
+        
+        # the cells of reports added since the columns were last put together
+        self.pendingCells = []
+    
+    def load(self):
+        if not os.path.exists(self.filePath):
+            return
+        
+        try:
+            with open(self.filePath, 'rb') as cubeFile:
+                [formatVersion, signature, appliedFiles, fileNames, categories, columns] = cPickle.load(cubeFile)
+        except (IOError, EOFError, ValueError, TypeError, cPickle.UnpicklingError):
+            # a damaged cube just means everything is rebuilt
+            return
+        
+        # the cells are only usable if they were built with the same format and field mappings
+        if formatVersion == self.FormatVersion and signature == self.signature:
+            self.appliedFiles = appliedFiles
+            self.fileNames = fileNames
+            self.categories = categories
+            self.categoryCodes = dict([[fieldName, dict(zip(categories[fieldName], range(0, len(categories[fieldName]))))] for fieldName in self.CategoryFields])
+            self.columns = columns
+    
+    def isApplied(self, fileName):
+        return fileName in self.appliedFiles
+    
+    def packCells(self):
+        if len(self.pendingCells) == 0:
+            return
+        
+        for [columnName, columnType] in self.ColumnTypes:
+            self.columns[columnName] = np.concatenate([self.columns[columnName]] + [fileCells[columnName].astype(columnType) for fileCells in self.pendingCells])
+        
+        self.pendingCells = []
+    
+    def removeStaleFiles(self, reportFiles, rewrittenFileNames):
+        # reports that have changed or gone have their cells taken back out, the rest of the cube is kept
+        staleFileNames = [fileName for fileName in self.appliedFiles if fileName not in reportFiles or fileName in rewrittenFileNames or reportFiles[fileName] != self.appliedFiles[fileName]]
+        if len(staleFileNames) == 0:
+            return
+        
+        self.packCells()
+        
+        staleFileCodes = [fileCode for fileCode in range(0, len(self.fileNames)) if self.fileNames[fileCode] in staleFileNames]
+        keptCells = ~np.in1d(self.columns["file"], staleFileCodes)
+        
+        for columnName in self.columns:
+            self.columns[columnName] = self.columns[columnName][keptCells]
+        
+        for fileName in staleFileNames:
+            del self.appliedFiles[fileName]
+    
+    def getCategoryMapping(self, salesReportFile, fieldName):
+        fileCategories = salesReportFile.categories[fieldName]
+        cubeCategories = self.categories[fieldName]
+        cubeCategoryCodes = self.categoryCodes[fieldName]
+        
+        # the extra entry at the end means a code of -1 (the field is absent from the line) maps onto None
+        codeMapping = np.zeros(len(fileCategories) + 1, dtype=np.int32)
+        for fileCode in range(0, len(fileCategories) + 1):
+            fieldValue = fileCategories[fileCode] if fileCode < len(fileCategories) else None
+            
+            if fieldValue not in cubeCategoryCodes:
+                cubeCategoryCodes.update({fieldValue : len(cubeCategories)})
+                cubeCategories.append(fieldValue)
+            
+            codeMapping[fileCode] = cubeCategoryCodes[fieldValue]
+        
+        return codeMapping
+    
+    def addReportFile(self, fileName, reportFileSignature, salesReportFile):
+        self.appliedFiles.update({fileName : reportFileSignature})
+        
+        fileCode = len(self.fileNames)
+        self.fileNames.append(fileName)
+        
+        # every report line must have a SKU
+        if salesReportFile.numLines > 0 and (salesReportFile.columns["SKU"] < 0).any():
+            raise KeyError("SKU")
+        
+        # lines without a date cannot be placed in the cube
+        lineIndices = np.flatnonzero(salesReportFile.columns["Begin Date"] > 0)
+        if len(lineIndices) == 0:
+            return
+        
+        # blank units and proceeds count as nothing
+        units = salesReportFile.columns["Units"][lineIndices].astype(np.int64)
+        proceedsPerItem = salesReportFile.columns["Developer Proceeds (per item)"][lineIndices]
+        proceeds = units * np.where(np.isnan(proceedsPerItem), 0.0, proceedsPerItem)
+        
+        productTypes = salesReportFile.categories["Product Type Identifier"]
+        promoCodes = salesReportFile.categories["Promo Code"]
+        isUpdate = np.array(["Update" in productType for productType in productTypes], dtype=bool)[salesReportFile.columns["Product Type Identifier"][lineIndices]]
+        hasPromoCode = np.array([promoCode != None and len(promoCode) > 0 for promoCode in promoCodes], dtype=bool)[salesReportFile.columns["Promo Code"][lineIndices]]
+        
+        flags = np.where(isUpdate, UpdateFlag, 0) | np.where(proceeds != 0, PaidFlag, 0) | np.where(proceeds > 0, PositiveProceedsFlag, 0) | np.where(units < 0, RefundFlag, 0) | np.where(hasPromoCode, PromoCodeFlag, 0)
+        
+        keyColumns = [salesReportFile.columns["Begin Date"][lineIndices], flags]
+        for fieldName in self.CategoryFields:
+            keyColumns.append(self.getCategoryMapping(salesReportFile, fieldName)[salesReportFile.columns[fieldName][lineIndices]])
+        
+        # lines that share every key are totalled into one cell, bincount adds them in line order
+        [cellKeys, firstLines, lineCells] = np.unique(np.column_stack(keyColumns).astype(np.int64), axis=0, return_index=True, return_inverse=True)
+        
+        fileCells = {"file"     : np.repeat(fileCode, len(cellKeys)),
+                     "line"     : lineIndices[firstLines],
+                     "units"    : np.bincount(lineCells, weights=units, minlength=len(cellKeys)),
+                     "proceeds" : np.bincount(lineCells, weights=proceeds, minlength=len(cellKeys))}
+        for keyIndex in range(0, len(self.KeyColumns)):
+            fileCells.update({self.KeyColumns[keyIndex] : cellKeys[:, keyIndex]})
+        
+        self.pendingCells.append(fileCells)
+    
+    def getSKUCells(self, newFileNames):
+        self.packCells()
+        
+        isNewCell = np.in1d(self.columns["file"], [fileCode for fileCode in range(0, len(self.fileNames)) if self.fileNames[fileCode] in newFileNames])
+        
+        # SKU -> the cells for that SKU
+        skuCells = dict()
+        
+        skuCodes = self.columns["SKU"]
+        for skuCode in np.unique(skuCodes).tolist():
+            skuCells.update({self.categories["SKU"][skuCode] : CubeCells(self, np.flatnonzero(skuCodes == skuCode), isNewCell)})
+        
+        return skuCells
+    
+    def save(self):
+        self.packCells()
+        
+        # file names that no longer have any cells are dropped and the codes of the rest are packed down
+        [usedFileCodes, fileCodes] = np.unique(self.columns["file"], return_inverse=True)
+        
+        self.fileNames = [self.fileNames[fileCode] for fileCode in usedFileCodes.tolist()]
+        self.columns["file"] = fileCodes.astype(np.int32)
+        
+        workingPath = self.filePath + ".tmp"
+        
+        try:
+            with open(workingPath, 'wb') as cubeFile:
+                cPickle.dump([self.FormatVersion, self.signature, self.appliedFiles, self.fileNames, self.categories, self.columns], cubeFile, cPickle.HIGHEST_PROTOCOL)
+            
+            # swap the new cube in so a partially written one is never read
+            os.rename(workingPath, self.filePath)
+        except (IOError, OSError):
+            # the cube is only an optimisation so a failure to write is not fatal
+            if os.path.exists(workingPath):
+                os.remove(workingPath)
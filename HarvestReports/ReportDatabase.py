@@ -0,0 +1,292 @@
+#!/usr/bin/python
+
+# Harvest Reports v0.1.5
+# Copyright (c) 2014-2015 Iain McManus. All rights reserved.
+#
+# Harvest Reports is a wrapper around Apple's AutoIngestion Java Class.
+# Harvest Reports can download all of the recent daily data and will produce
+# a summary of the sales, updates and a breakdown of region where sales have occurred.
+#
+# Information is also generated per version, including a calculation of the number of users
+# on the latest version.
+#
+# Harvest Reports can be run on a regular schedule and be configured to send an email
+# with the daily summary when the daily report is out. If no sales/updates have occurred
+# it can indicate that as well.
+
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in
+# all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN
+# THE SOFTWARE.
+
+import datetime
+import os
+import re
+import sqlite3
+
+from ReportCoverage import getNextMonth
+from SalesReportFile import AbsentField, SalesReportFile
+
+def getColumnName(fieldName):
+    # eg. Developer Proceeds (per item) -> developer_proceeds_per_item
+    return re.sub("[^a-z0-9]+", "_", fieldName.lower()).strip("_")
+
+class ReportDatabase:
+    FormatVersion = 3
+    FileName = "Reports.sqlite"
+    
+    # every report field has a column, along with the currency code worked out from the currency of proceeds
+    FieldNames = [field[0] for field in SalesReportFile.fields] + ["Currency Code of Proceeds"]
+    IndexedFields = ["SKU", "Begin Date", "Country Code", "Version", "Product Type Identifier"]
+    
+    # the names used by the query command for what can be filtered and grouped on
+    QueryFilters = [["sku", "SKU"], ["country", "Country Code"], ["version", "Version"], ["productType", "Product Type Identifier"], ["promoCode", "Promo Code"]]
+    QueryGroups = [["sku", "sku"], ["title", "title"], ["date", "begin_date"], ["month", "substr(begin_date, 1, 7)"], ["year", "substr(begin_date, 1, 4)"],
+                   ["country", "country_code"], ["version", "version"], ["productType", "product_type_identifier"], ["promoCode", "promo_code"]]
+    
+    # the lines of each file are also kept totalled by these fields so that queries never need to scan every line,
+    # and those totals are rolled up again per month (with the begin date being the first of the month)
+    TotalsFields = ["SKU", "Title", "Begin Date", "Country Code", "Version", "Product Type Identifier", "Promo Code", "Currency Code of Proceeds"]
+    
+    # the totals worked out for each group, with the lines classed by the same flags as the cells of the ReportCube
+    # (blank proceeds count as nothing, so those lines are free, and only lines with positive proceeds add to the proceeds)
+    QueryTotals = [["Installs",    "CASE WHEN {isUpdate} THEN 0 ELSE units END"],
+                   ["Sales",       "CASE WHEN NOT {isUpdate} AND {proceeds} != 0 THEN units ELSE 0 END"],
+                   ["Free",        "CASE WHEN NOT {isUpdate} AND {proceeds} = 0 THEN units ELSE 0 END"],
+                   ["Updates",     "CASE WHEN {isUpdate} THEN units ELSE 0 END"],
+                   ["Refunds",     "CASE WHEN NOT {isUpdate} AND units < 0 THEN -units ELSE 0 END"],
+                   ["Promo Codes", "CASE WHEN NOT {isUpdate} AND length(promo_code) > 0 THEN units ELSE 0 END"]]
+    QueryProceeds = "CASE WHEN {proceeds} > 0 THEN {proceeds} ELSE 0 END"
+    QueryIsUpdate = "coalesce(instr(product_type_identifier, 'Update'), 0) > 0"
+    QueryLineProceeds = "units * coalesce(developer_proceeds_per_item, 0)"
+    
+    def __init__(self, basePath, fieldRemapper):
+        self.filePath = os.path.join(basePath, self.FileName)
+        self.signature = fieldRemapper.Signature
+        
+        self.connection = sqlite3.connect(self.filePath)
+        
+        self.createTables()
+    
+    def getColumnType(self, fieldName):
+        if fieldName in SalesReportFile.IntegerFields:
+            return "INTEGER"
+        if fieldName in SalesReportFile.FloatFields:
+            return "REAL"
+        
+        # dates are stored as YYYY-MM-DD so that they sort and compare as text
+        return "TEXT"
+    
+    def createTables(self):
+        with self.connection:
+            # tables from an older layout are dropped and the reports ingested again
+            [formatVersion] = self.connection.execute("PRAGMA user_version").fetchone()
+            if formatVersion != self.FormatVersion:
+                self.connection.execute("DROP TABLE IF EXISTS report_lines")
+                self.connection.execute("DROP TABLE IF EXISTS report_files")
+                self.connection.execute("DROP TABLE IF EXISTS report_totals")
+                self.connection.execute("DROP TABLE IF EXISTS monthly_totals")
+                self.connection.execute("DROP TABLE IF EXISTS stale_months")
+                self.connection.execute("PRAGMA user_version = {version:d}".format(version=self.FormatVersion))
+            
+            self.connection.execute("CREATE TABLE IF NOT EXISTS report_files (file_name TEXT PRIMARY KEY, file_size INTEGER, file_modified REAL, field_signature TEXT, num_lines INTEGER)")
+            
+            lineColumns = ["{columnName} {columnType}".format(columnName=getColumnName(fieldName), columnType=self.getColumnType(fieldName)) for fieldName in self.FieldNames]
+            self.connection.execute("CREATE TABLE IF NOT EXISTS report_lines (file_name TEXT NOT NULL, line_index INTEGER NOT NULL, {columns}, PRIMARY KEY (file_name, line_index))".format(columns=", ".join(lineColumns)))
+            
+            for fieldName in self.IndexedFields:
+                self.connection.execute("CREATE INDEX IF NOT EXISTS report_lines_{columnName} ON report_lines ({columnName})".format(columnName=getColumnName(fieldName)))
+            
+            totalsColumns = ["{columnName} {columnType}".format(columnName=getColumnName(fieldName), columnType=self.getColumnType(fieldName)) for fieldName in self.TotalsFields]
+            totalsColumns += ["{columnName} INTEGER".format(columnName=getColumnName(totalName)) for [totalName, totalExpression] in self.QueryTotals]
+            self.connection.execute("CREATE TABLE IF NOT EXISTS report_totals (file_name TEXT NOT NULL, {columns}, proceeds REAL)".format(columns=", ".join(totalsColumns)))
+            self.connection.execute("CREATE TABLE IF NOT EXISTS monthly_totals ({columns}, proceeds REAL)".format(columns=", ".join(totalsColumns)))
+            
+            # months (YYYY-MM) whose monthly totals need to be worked out again
+            self.connection.execute("CREATE TABLE IF NOT EXISTS stale_months (month TEXT PRIMARY KEY)")
+            
+            for fieldName in ["File Name"] + self.IndexedFields:
+                self.connection.execute("CREATE INDEX IF NOT EXISTS report_totals_{columnName} ON report_totals ({columnName})".format(columnName=getColumnName(fieldName)))
+            for fieldName in self.IndexedFields:
+                self.connection.execute("CREATE INDEX IF NOT EXISTS monthly_totals_{columnName} ON monthly_totals ({columnName})".format(columnName=getColumnName(fieldName)))
+    
+    def getIngestedFiles(self):
+        # report file name -> [size, modified time, field mapping signature] of the copy that was ingested
+        ingestedFiles = dict()
+        
+        for [fileName, fileSize, fileModifiedTime, fieldSignature] in self.connection.execute("SELECT file_name, file_size, file_modified, field_signature FROM report_files"):
+            ingestedFiles.update({fileName : [fileSize, fileModifiedTime, fieldSignature]})
+        
+        return ingestedFiles
+    
+    def getFilesToIngest(self, reportFiles):
+        ingestedFiles = self.getIngestedFiles()
+        
+        return [fileName for fileName in reportFiles if ingestedFiles.get(fileName) != reportFiles[fileName] + [self.signature]]
+    
+    def getDatabaseValues(self, salesReportFile, fieldName):
+        if fieldName not in salesReportFile.fieldNames:
+            return [None] * salesReportFile.numLines
+        
+        fieldValues = salesReportFile.getColumnValues(fieldName)
+        
+        # cells that are blank (or missing) in a typed column are stored as NULL
+        if fieldName in SalesReportFile.DateFields:
+            return [fieldValue.isoformat() if isinstance(fieldValue, datetime.date) else None for fieldValue in fieldValues]
+        if fieldName in SalesReportFile.IntegerFields:
+            return [fieldValue if type(fieldValue) == int else None for fieldValue in fieldValues]
+        if fieldName in SalesReportFile.FloatFields:
+            return [fieldValue if type(fieldValue) == float else None for fieldValue in fieldValues]
+        
+        return [None if fieldValue is AbsentField else fieldValue for fieldValue in fieldValues]
+    
+    def ingestReportFile(self, fileName, reportFileSignature, salesReportFile):
+        lineValues = zip([fileName] * salesReportFile.numLines, range(0, salesReportFile.numLines), *[self.getDatabaseValues(salesReportFile, fieldName) for fieldName in self.FieldNames])
+        
+        columnNames = ["file_name", "line_index"] + [getColumnName(fieldName) for fieldName in self.FieldNames]
+        insertStatement = "INSERT INTO report_lines ({columns}) VALUES ({values})".format(columns=", ".join(columnNames), values=", ".join(["?"] * len(columnNames)))
+        
+        # the file is replaced as a whole in a single transaction so ingesting it again never duplicates lines
+        with self.connection:
+            self.connection.execute("DELETE FROM report_lines WHERE file_name = ?", (fileName,))
+            self.connection.executemany(insertStatement, lineValues)
+            self.totalReportFile(fileName)
+            self.connection.execute("INSERT OR REPLACE INTO report_files (file_name, file_size, file_modified, field_signature, num_lines) VALUES (?, ?, ?, ?, ?)",
+                                    (fileName, reportFileSignature[0], reportFileSignature[1], self.signature, salesReportFile.numLines))
+    
+    def totalReportFile(self, fileName):
+        totalsColumnNames = [getColumnName(fieldName) for fieldName in self.TotalsFields]
+        
+        selectExpressions = ["file_name"] + totalsColumnNames
+        selectExpressions += ["SUM({total})".format(total=totalExpression.format(isUpdate=self.QueryIsUpdate, proceeds=self.QueryLineProceeds)) for [totalName, totalExpression] in self.QueryTotals]
+        selectExpressions += ["SUM({proceeds})".format(proceeds=self.QueryProceeds.format(proceeds=self.QueryLineProceeds))]
+        
+        # the months covered by both the old and the new copy of the file are stale
+        self.markStaleMonths(fileName)
+        self.connection.execute("DELETE FROM report_totals WHERE file_name = ?", (fileName,))
+        
+        # lines without a date are left out, as they are from the ReportCube
+        self.connection.execute("INSERT INTO report_totals SELECT {select} FROM report_lines WHERE file_name = ? AND begin_date IS NOT NULL GROUP BY {groupBy}".format(select=", ".join(selectExpressions), groupBy=", ".join(totalsColumnNames)), (fileName,))
+        self.markStaleMonths(fileName)
+    
+    def markStaleMonths(self, fileName):
+        self.connection.execute("INSERT OR IGNORE INTO stale_months SELECT DISTINCT substr(begin_date, 1, 7) FROM report_totals WHERE file_name = ? AND begin_date IS NOT NULL", (fileName,))
+    
+    def updateMonthlyTotals(self):
+        totalsColumnNames = [getColumnName(fieldName) for fieldName in self.TotalsFields]
+        
+        groupExpressions = [columnName if columnName != "begin_date" else "substr(begin_date, 1, 7) || '-01'" for columnName in totalsColumnNames]
+        
+        selectExpressions = groupExpressions + ["SUM({columnName})".format(columnName=getColumnName(totalName)) for [totalName, totalExpression] in self.QueryTotals]
+        selectExpressions += ["SUM(proceeds)"]
+        
+        insertStatement = "INSERT INTO monthly_totals SELECT {select} FROM report_totals WHERE begin_date BETWEEN ? AND ? GROUP BY {groupBy}".format(select=", ".join(selectExpressions), groupBy=", ".join(groupExpressions))
+        
+        with self.connection:
+            for [month] in self.connection.execute("SELECT month FROM stale_months").fetchall():
+                self.connection.execute("DELETE FROM monthly_totals WHERE begin_date = ?", (month + "-01",))
+                self.connection.execute(insertStatement, (month + "-01", month + "-31"))
+            
+            self.connection.execute("DELETE FROM stale_months")
+    
+    def removeMissingFiles(self, reportFiles):
+        missingFileNames = [fileName for fileName in self.getIngestedFiles() if fileName not in reportFiles]
+        
+        with self.connection:
+            for fileName in missingFileNames:
+                self.connection.execute("DELETE FROM report_lines WHERE file_name = ?", (fileName,))
+                self.markStaleMonths(fileName)
+                self.connection.execute("DELETE FROM report_totals WHERE file_name = ?", (fileName,))
+                self.connection.execute("DELETE FROM report_files WHERE file_name = ?", (fileName,))
+    
+    def getQueryRanges(self, startDate, endDate, groupNames):
+        # totals by date can only come from the daily totals
+        if "date" in groupNames:
+            return [["report_totals", startDate, endDate]]
+        
+        # otherwise whole months come from the monthly totals and only the days either side from the daily totals
+        firstMonth = startDate if startDate == None or startDate.day == 1 else getNextMonth(startDate)
+        lastMonth = None
+        if endDate != None:
+            lastMonth = endDate.replace(day=1) if getNextMonth(endDate) == endDate + datetime.timedelta(days=1) else (endDate.replace(day=1) - datetime.timedelta(days=1)).replace(day=1)
+        
+        if firstMonth != None and lastMonth != None and firstMonth > lastMonth:
+            return [["report_totals", startDate, endDate]]
+        
+        queryRanges = [["monthly_totals", firstMonth, lastMonth]]
+        if startDate != None and startDate < firstMonth:
+            queryRanges.append(["report_totals", startDate, firstMonth - datetime.timedelta(days=1)])
+        if endDate != None and getNextMonth(lastMonth) <= endDate:
+            queryRanges.append(["report_totals", getNextMonth(lastMonth), endDate])
+        
+        return queryRanges
+    
+    def queryTotals(self, tableName, filters, startDate, endDate, groupExpressions):
+        conditions = []
+        parameters = []
+        
+        # filters are query name -> list of values, any of which can match
+        for [queryName, fieldName] in self.QueryFilters:
+            if queryName in filters:
+                conditions.append("{columnName} IN ({values})".format(columnName=getColumnName(fieldName), values=", ".join(["?"] * len(filters[queryName]))))
+                parameters.extend(filters[queryName])
+        
+        if startDate != None:
+            conditions.append("begin_date >= ?")
+            parameters.append(startDate.isoformat())
+        if endDate != None:
+            conditions.append("begin_date <= ?")
+            parameters.append(endDate.isoformat())
+        
+        # the proceeds are totalled per currency within each group
+        selectExpressions = groupExpressions + ["currency_code_of_proceeds"]
+        selectExpressions += ["SUM({columnName})".format(columnName=getColumnName(totalName)) for [totalName, totalExpression] in self.QueryTotals]
+        selectExpressions += ["SUM(proceeds)"]
+        
+        queryStatement = "SELECT {select} FROM {table}".format(select=", ".join(selectExpressions), table=tableName)
+        if len(conditions) > 0:
+            queryStatement += " WHERE " + " AND ".join(conditions)
+        queryStatement += " GROUP BY " + ", ".join(groupExpressions + ["currency_code_of_proceeds"])
+        
+        return self.connection.execute(queryStatement, parameters)
+    
+    def querySummary(self, filters, startDate, endDate, groupNames):
+        # catch up on any months left stale by an earlier run that did not finish
+        self.updateMonthlyTotals()
+        
+        groupExpressions = [dict(self.QueryGroups)[groupName] for groupName in groupNames]
+        
+        # group values -> [group values, totals, proceeds by currency]
+        summaryRows = dict()
+        for [tableName, rangeStartDate, rangeEndDate] in self.getQueryRanges(startDate, endDate, groupNames):
+            for queryRow in self.queryTotals(tableName, filters, rangeStartDate, rangeEndDate, groupExpressions):
+                groupValues = tuple(queryRow[0:len(groupExpressions)])
+                currencyCode = queryRow[len(groupExpressions)]
+                groupTotals = queryRow[len(groupExpressions) + 1:-1]
+                proceeds = queryRow[-1]
+                
+                if groupValues not in summaryRows:
+                    summaryRows.update({groupValues : [list(groupValues), [0] * len(self.QueryTotals), dict()]})
+                
+                summaryRow = summaryRows[groupValues]
+                summaryRow[1] = [runningTotal + (groupTotal or 0) for [runningTotal, groupTotal] in zip(summaryRow[1], groupTotals)]
+                if proceeds != None and proceeds != 0:
+                    summaryRow[2][currencyCode] = summaryRow[2].get(currencyCode, 0) + proceeds
+        
+        return [summaryRows[groupValues] for groupValues in sorted(summaryRows.keys())]
+    
+    def close(self):
+        self.connection.close()
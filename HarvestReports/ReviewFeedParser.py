@@ -0,0 +1,96 @@
+#!/usr/bin/python
+
+# Harvest Reports v0.1.5
+# Copyright (c) 2014-2015 Iain McManus. All rights reserved.
+#
+# Harvest Reports is a wrapper around Apple's AutoIngestion Java Class.
+# Harvest Reports can download all of the recent daily data and will produce
+# a summary of the sales, updates and a breakdown of region where sales have occurred.
+#
+# Information is also generated per version, including a calculation of the number of users
+# on the latest version.
+#
+# Harvest Reports can be run on a regular schedule and be configured to send an email
+# with the daily summary when the daily report is out. If no sales/updates have occurred
+# it can indicate that as well.
+
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in
+# all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN
+# THE SOFTWARE.
+
+import re
+import urlparse
+
+from Common import RSSFields
+
+AtomNamespace = "{http://www.w3.org/2005/Atom}"
+ITunesNamespace = "{http://itunes.apple.com/rss}"
+
+def getElementText(element):
+    if element == None or element.text == None:
+        return u""
+    
+    # plain ASCII text is read as a byte string, everything is kept as unicode until it is written
+    return unicode(element.text.strip())
+
+def parseReviewFeed(feedFile, feedURL, knownUniqueIds):
+    # the XML module is only loaded when a feed is parsed
+    import xml.etree.cElementTree as ElementTree
+    
+    feedEntries = dict()
+    numEntries = 0
+    lastPage = None
+    
+    for [event, element] in ElementTree.iterparse(feedFile):
+        # the link to the last page says how many pages there are
+        if element.tag == AtomNamespace + "link" and element.get("rel") == "last":
+            lastPageMatch = re.search(r"/page=(\d+)/", element.get("href", ""))
+            if lastPageMatch != None:
+                lastPage = int(lastPageMatch.group(1))
+        
+        if element.tag != AtomNamespace + "entry":
+            continue
+        
+        numEntries += 1
+        
+        # the first entry describes the app rather than being a review
+        versionElement = element.find(ITunesNamespace + "version")
+        if versionElement != None:
+            # the ids are relative to the first page so a review has the same id whichever page it is on
+            uniqueId = urlparse.urljoin(feedURL, getElementText(element.find(AtomNamespace + "id")))
+            
+            # nothing more is taken from the reviews that are already stored
+            if uniqueId not in knownUniqueIds:
+                summaryElement = element.find(AtomNamespace + "summary")
+                if summaryElement == None:
+                    for contentElement in element.findall(AtomNamespace + "content"):
+                        if summaryElement == None or contentElement.get("type") == "text":
+                            summaryElement = contentElement
+                        if contentElement.get("type") == "text":
+                            break
+                
+                feedEntry = {RSSFields.Version:    getElementText(versionElement), 
+                             RSSFields.Title:      getElementText(element.find(AtomNamespace + "title")), 
+                             RSSFields.Rating:     int(getElementText(element.find(ITunesNamespace + "rating"))),
+                             RSSFields.Summary:    getElementText(summaryElement),
+                             RSSFields.UniqueId:   uniqueId}
+                feedEntries.update({uniqueId : feedEntry})
+        
+        # each entry is emptied once it has been read so only one is ever held in memory
+        element.clear()
+    
+    return [feedEntries, numEntries, lastPage]
@@ -0,0 +1,182 @@
+#!/usr/bin/python
+
+# Harvest Reports v0.1.5
+# Copyright (c) 2014-2015 Iain McManus. All rights reserved.
+#
+# Harvest Reports is a wrapper around Apple's AutoIngestion Java Class.
+# Harvest Reports can download all of the recent daily data and will produce
+# a summary of the sales, updates and a breakdown of region where sales have occurred.
+#
+# Information is also generated per version, including a calculation of the number of users
+# on the latest version.
+#
+# Harvest Reports can be run on a regular schedule and be configured to send an email
+# with the daily summary when the daily report is out. If no sales/updates have occurred
+# it can indicate that as well.
+
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in
+# all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN
+# THE SOFTWARE.
+
+import cPickle
+import csv
+import os
+
+from Common import RatingsSummaryFields, RSSFields
+
+class ReviewLog:
+    FormatVersion = 1
+    FileName = "RatingsAndReviews.index"
+    
+    def __init__(self, basePath):
+        self.basePath = basePath
+        self.filePath = os.path.join(basePath, self.FileName)
+        
+        # log file name -> [log size, unique ids, version -> [rating sum, number of ratings]]
+        self.logIndices = dict()
+        
+        self.load()
+    
+    def load(self):
+        if not os.path.exists(self.filePath):
+            return
+        
+        try:
+            with open(self.filePath, 'rb') as indexFile:
+                [formatVersion, logIndices] = cPickle.load(indexFile)
+        except (IOError, EOFError, ValueError, TypeError, cPickle.UnpicklingError):
+            # a damaged index just means the logs are read again
+            return
+        
+        if formatVersion == self.FormatVersion:
+            self.logIndices = logIndices
+    
+    def getLogPath(self, appId, countryCode):
+        return os.path.join(self.basePath, "RatingsAndReviews_{appId}_{countryCode}.csv".format(appId=appId, countryCode=countryCode))
+    
+    def exists(self, appId, countryCode):
+        return os.path.exists(self.getLogPath(appId, countryCode))
+    
+    def getLogIndex(self, appId, countryCode):
+        logPath = self.getLogPath(appId, countryCode)
+        logName = os.path.basename(logPath)
+        
+        logSize = 0
+        if os.path.exists(logPath):
+            logSize = os.path.getsize(logPath)
+        
+        # the log is only read in full when it has been changed by something other than an append
+        if logName not in self.logIndices or self.logIndices[logName][0] != logSize:
+            self.logIndices.update({logName : self.indexLog(logPath, logSize)})
+        
+        return self.logIndices[logName]
+    
+    def indexLog(self, logPath, logSize):
+        uniqueIds = set()
+        versionRatings = dict()
+        
+        if logSize > 0:
+            with open(logPath, mode="rb") as logFile:
+                for row in csv.reader(logFile, delimiter='\t'):
+                    if row[RSSFields.UniqueId] in uniqueIds:
+                        continue
+                    
+                    uniqueIds.add(row[RSSFields.UniqueId])
+                    self.addRating(versionRatings, row[RSSFields.Version], int(row[RSSFields.Rating]))
+        
+        return [logSize, uniqueIds, versionRatings]
+    
+    def addRating(self, versionRatings, appVersion, appRating):
+        versionRating = versionRatings.setdefault(appVersion, [0, 0])
+        versionRating[0] += appRating
+        versionRating[1] += 1
+    
+    def getUniqueIds(self, appId, countryCode):
+        [logSize, uniqueIds, versionRatings] = self.getLogIndex(appId, countryCode)
+        return uniqueIds
+    
+    def append(self, appId, countryCode, newFeedEntries):
+        logIndex = self.getLogIndex(appId, countryCode)
+        [logSize, uniqueIds, versionRatings] = logIndex
+        
+        if len(newFeedEntries) == 0:
+            return
+        
+        # the transliteration module is only loaded when there are reviews to write
+        from unidecode import unidecode
+        
+        logPath = self.getLogPath(appId, countryCode)
+        
+        # only the new reviews are written, the reviews already in the log are left as they are
+        with open(logPath, "ab") as logFile:
+            logWriter = csv.writer(logFile, delimiter="\t", quotechar="\"", quoting=csv.QUOTE_ALL)
+            
+            for entry in newFeedEntries:
+                # the reviews are stored as plain ASCII, the text is only transliterated as it is written
+                appVersion = unidecode(entry[RSSFields.Version])
+                uniqueId = unidecode(entry[RSSFields.UniqueId])
+                
+                logWriter.writerow([appVersion, 
+                                    unidecode(entry[RSSFields.Title]),
+                                    entry[RSSFields.Rating],
+                                    unidecode(entry[RSSFields.Summary]),
+                                    uniqueId])
+                
+                uniqueIds.add(uniqueId)
+                self.addRating(versionRatings, appVersion, int(entry[RSSFields.Rating]))
+        
+        logIndex[0] = os.path.getsize(logPath)
+    
+    def getAnalysis(self, appId, countryCode, numberOfNewRatings):
+        [logSize, uniqueIds, versionRatings] = self.getLogIndex(appId, countryCode)
+        
+        lifetimeAverageRating = 0
+        lifetimeRatingSum = sum([ratingSum for [ratingSum, ratingCount] in versionRatings.values()])
+        
+        # calculate the average rating if possible
+        if len(uniqueIds) > 0:
+            lifetimeAverageRating = float(lifetimeRatingSum) / len(uniqueIds)
+        
+        # calculate the per version averages
+        perVersionAverageRatings = dict()
+        perVersionRatingsCount = dict()
+        for [appVersion, [ratingSum, ratingCount]] in versionRatings.items():
+            perVersionAverageRatings.update({appVersion : float(ratingSum) / ratingCount})
+            perVersionRatingsCount.update({appVersion : ratingCount})
+        
+        entrySummary = dict()
+        entrySummary.update({RatingsSummaryFields.LifetimeAverageRating     : lifetimeAverageRating})
+        entrySummary.update({RatingsSummaryFields.LifetimeRatingSamples     : len(uniqueIds)})
+        entrySummary.update({RatingsSummaryFields.AverageRatingPerVersion   : perVersionAverageRatings})
+        entrySummary.update({RatingsSummaryFields.NumberOfRatingsPerVersion : perVersionRatingsCount})
+        entrySummary.update({RatingsSummaryFields.NumberOfNewRatings        : numberOfNewRatings})
+        
+        return entrySummary
+    
+    def save(self):
+        workingPath = self.filePath + ".tmp"
+        
+        try:
+            with open(workingPath, 'wb') as indexFile:
+                cPickle.dump([self.FormatVersion, self.logIndices], indexFile, cPickle.HIGHEST_PROTOCOL)
+            
+            # swap the new index in so a partially written one is never read
+            os.rename(workingPath, self.filePath)
+        except (IOError, OSError):
+            # the logs can always be read again so a failure to write is not fatal
+            if os.path.exists(workingPath):
+                os.remove(workingPath)
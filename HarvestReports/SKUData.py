@@ -33,17 +33,18 @@
 # THE SOFTWARE.
 
 import datetime
-import math
 import os
 
 import numpy as np
-import matplotlib.pyplot as plt
 
-from Common import ReportTypes
+from AggregationEngine import aggregateCubeCells
+from Common import GraphConfig, GraphTypes, ReportTypes
+from DailySeries import DailySeries
+from GraphRenderer import LazyGraphs
                 
 class SKUData:
-    def __init__(self, basePath, reportLines, fieldRemapper):
-        self.rawData = reportLines
+    def __init__(self, basePath, cubeCells, fieldRemapper, graphConfig=None):
+        self.basePath = basePath
         
         self.SKU = "Unknown"
         self.Name = "Unknown"
@@ -61,10 +62,10 @@ class SKUData:
         self.promoCodesByVersion = dict()
         self.promoCodesTotal = 0
         self.versions = []
-        self.paidInstallsByDate = dict()
-        self.freeInstallsByDate = dict()
-        self.allInstallsByDate = dict()
-        self.updatesByDate = dict()
+        self.paidInstallsByDate = DailySeries(None, np.zeros(0, dtype=np.int64))
+        self.freeInstallsByDate = DailySeries(None, np.zeros(0, dtype=np.int64))
+        self.allInstallsByDate = DailySeries(None, np.zeros(0, dtype=np.int64))
+        self.updatesByDate = DailySeries(None, np.zeros(0, dtype=np.int64))
         self.proceedsByDate = dict()
         self.paidInstallsByCountry = dict()
         self.freeInstallsByCountry = dict()
@@ -90,125 +91,20 @@ class SKUData:
         self.averageRatingPerVersion = dict()
         self.numberOfRatingsPerVersion = dict()
         
-        self.rawData.sort(key = lambda x: x[1]["Begin Date"])
+        # the charts are drawn when they are first needed
+        self.Graphs = LazyGraphs(self, graphConfig)
+        self.graphWindow = GraphConfig.DefaultWindowDays
+        if graphConfig != None:
+            self.graphWindow = graphConfig.WindowDays
         
-        self.Graphs = dict()
+        # the summary is compiled from the cells of the report cube rather than from the report lines
+        aggregates = aggregateCubeCells(cubeCells)
+        if aggregates != None:
+            self.__dict__.update(aggregates)
         
-        # process each report line in order of date and compile the summary
-        for [isNewData, reportLine] in self.rawData:
-            if self.SKU == "Unknown" and len(reportLine["SKU"].strip()) > 0:
-                self.SKU = reportLine["SKU"].strip()
-            if self.AppId == "Unknown" and len(reportLine["Apple Identifier"].strip()) > 0:
-                self.AppId = reportLine["Apple Identifier"].strip()
-            
-            self.Name = reportLine["Title"].strip()
-            
-            startDate = reportLine["Begin Date"]
-            
-            version = reportLine["Version"]
-            units = reportLine["Units"]
-            proceedsPerItem = reportLine["Developer Proceeds (per item)"]
-            proceedsCurrency = reportLine["Currency Code of Proceeds"]
-            country = reportLine["Country Code"]
-            proceeds = units * proceedsPerItem
-            
-            # as the proceeds are a dictionary we only want entries for non zero proceeds
-            if proceeds > 0:
-                self.proceedsTotal[proceedsCurrency] = self.proceedsTotal.setdefault(proceedsCurrency, 0) + proceeds
-            
-            # check if new data is present and setup some basic details
-            if isNewData:
-                # as the proceeds are a dictionary we only want entries for non zero proceeds
-                if proceeds > 0:
-                    self.newProceedsTotal[proceedsCurrency] = self.newProceedsTotal.setdefault(proceedsCurrency, 0) + proceeds
-                    
-                self.hasNewData = True
-                self.newDataDates.append(startDate)
-            
-            # record all versions
-            if not version in self.versions:
-                self.versions.append(version)
-            
-            # ensure the date is recorded for all arrays
-            if not startDate in self.updatesByDate:
-                self.updatesByDate.update({startDate : 0})
-            if not startDate in self.allInstallsByDate:
-                self.allInstallsByDate.update({startDate : 0})
-            if not startDate in self.paidInstallsByDate:
-                self.paidInstallsByDate.update({startDate : 0})
-            if not startDate in self.freeInstallsByDate:
-                self.freeInstallsByDate.update({startDate : 0})
-            if not startDate in self.proceedsByDate:
-                self.proceedsByDate.update({startDate : dict()})
-            
-            # the report line is for updates
-            if "Update" in reportLine["Product Type Identifier"]:
-                self.updatesByVersion[version] = self.updatesByVersion.setdefault(version, 0) + units
-                self.updatesByDate[startDate] = self.updatesByDate.setdefault(startDate, 0) + units
-            
-                if isNewData:
-                    self.newUpdatesTotal += units
-            else: # the report line is for sales or refunds
-                # check if it was a refund
-                if units < 0:
-                    self.refundsByVersion[version] = self.refundsByVersion.setdefault(version, 0) + (-units)
-                    self.refundsTotal += -units
-                    
-                    if isNewData:
-                        self.newRefundsTotal += -units
-                    
-                self.allInstallsTotal += units
-                
-                self.unitsByVersion[version] = self.unitsByVersion.setdefault(version, 0) + units
-                self.allInstallsByDate[startDate] = self.allInstallsByDate.setdefault(startDate, 0) + units
-                self.allInstallsByCountry[country] = self.allInstallsByCountry.setdefault(country, 0) + units
-                
-                # as the proceeds are a dictionary we only want entries for non zero proceeds
-                if proceeds != 0:
-                    if startDate not in self.proceedsByDate:
-                        self.proceedsByDate.update({startDate: dict()})
-                    self.proceedsByDate[startDate][proceedsCurrency] = self.proceedsByDate[startDate].setdefault(proceedsCurrency, 0) + proceeds
-                
-                    if version not in self.proceedsByVersion:
-                        self.proceedsByVersion.update({version: dict()})
-                    self.proceedsByVersion[version][proceedsCurrency] = self.proceedsByVersion[version].setdefault(proceedsCurrency, 0) + proceeds
-            
-                if isNewData:
-                    self.newAllInstallsTotal += units
-                
-                    self.newAllInstallsByCountry[country] = self.newAllInstallsByCountry.setdefault(country, 0) + units
-                
-                # record the count of promo codes used
-                if reportLine["Promo Code"] != None and len(reportLine["Promo Code"]) > 0:
-                    self.promoCodesTotal += units
-                    
-                    self.promoCodesByVersion[version] = self.promoCodesByVersion.setdefault(version, 0) + units
-                        
-                    if isNewData:
-                        self.newPromoCodesTotal += units
-                
-                # was this a sale?
-                if proceeds != 0:
-                    self.paidInstallsTotal += units
-                    
-                    self.paidInstallsByDate[startDate] = self.paidInstallsByDate.setdefault(startDate, 0) + units
-                    self.paidInstallsByCountry[country] = self.paidInstallsByCountry.setdefault(country, 0) + units
-            
-                    if isNewData:
-                        self.newPaidInstallsTotal += units
-                
-                        self.newPaidInstallsByCountry[country] = self.newPaidInstallsByCountry.setdefault(country, 0) + units
-                else: # otherwise it was a free installs
-                    self.freeInstallsTotal += units
-                    
-                    self.freeInstallsByDate[startDate] = self.freeInstallsByDate.setdefault(startDate, 0) + units
-                    self.freeInstallsByCountry[country] = self.freeInstallsByCountry.setdefault(country, 0) + units
-            
-                    if isNewData:
-                        self.newFreeInstallsTotal += units
-                
-                        self.newFreeInstallsByCountry[country] = self.newFreeInstallsByCountry.setdefault(country, 0) + units
-                
+        self.finaliseSummary()
+    
+    def finaliseSummary(self):
         self.versions.sort()
         
         # fill in any missing version data
@@ -253,13 +149,15 @@ class SKUData:
 
         # format the proceeds by date string
         self.proceedsByDateString = dict()
-        for date in self.proceedsByDate.keys():
-            self.proceedsByDateString.update({date: ""})
+        for currency in self.proceedsByDate.keys():
+            proceedsSeries = self.proceedsByDate[currency]
             
-            for currency in self.proceedsByDate[date].keys():
-                if len(self.proceedsByDateString[date]) > 0:
+            for dayOffset in np.flatnonzero(proceedsSeries.dailyTotals).tolist():
+                date = proceedsSeries.firstDate + datetime.timedelta(dayOffset)
+                
+                if len(self.proceedsByDateString.setdefault(date, "")) > 0:
                     self.proceedsByDateString[date] += ", "
-                self.proceedsByDateString[date] += "{amount} {code}".format(amount=self.proceedsByDate[date][currency], code=currency)
+                self.proceedsByDateString[date] += "{amount} {code}".format(amount=proceedsSeries.dailyTotals[dayOffset], code=currency)
 
         # format the proceeds by version string
         self.proceedsByVersionString = dict()
@@ -276,8 +174,6 @@ class SKUData:
         self.numOnOldVersions -= self.updatesByVersion[self.versions[len(self.versions) - 1]]
         self.numOnOldVersions -= self.unitsByVersion[self.versions[len(self.versions) - 1]]
         self.legacyUserPercentage = 100.0 * self.numOnOldVersions / self.allInstallsTotal
-        
-        self.generateGraphs(basePath)
     
     def printNewData(self):
         startDateString = self.newDataDates[0].strftime("%d %b %Y")
@@ -459,97 +355,21 @@ class SKUData:
                     print "    Average Rating       : {avgRating:6.01f}".format(avgRating=self.averageRatingPerVersion[version])
                     print "    Number of Ratings    : {ratingCount:6}".format(ratingCount=self.numberOfRatingsPerVersion[version])
 
-    def saveUnitsGraph(self, basePath, installs, updates, entryDates):
-        barWidth = 0.35
-        barIndices = np.arange(len(entryDates))
-    
-        maxY = max(max(installs), max(updates)) + 1
-    
-        figure, unitsGraph = plt.subplots()
-        installsRects = unitsGraph.bar(barIndices, installs, barWidth, color='g')
-        updatesRects = unitsGraph.bar(barIndices+barWidth, updates, barWidth, color='b')
-        plt.ylim(ymax=maxY, ymin=0)
-    
-        unitsGraph.set_ylabel("Units")
-        unitsGraph.set_title("Sales Data for {name}".format(name=self.Name))
-        unitsGraph.set_xticks(barIndices+barWidth)
-        unitsGraph.set_xticklabels(entryDates, rotation=-90)
-
-        unitsGraph.legend((installsRects[0], updatesRects[0]), ('Installs', 'Updates'), bbox_to_anchor=(1.05, 1), loc=2, borderaxespad=0.)
-    
-        def autolabel(rects):
-            for rect in rects:
-                height = rect.get_height()
-                if height > 0:
-                    unitsGraph.text(rect.get_x()+rect.get_width()/2., 1.05*height, '%d'%int(height), ha='center', va='bottom')
-
-        autolabel(installsRects)
-        autolabel(updatesRects)
-    
-        fileName = os.path.join(basePath, self.SKU + "_AllInstallsAndUpdates.png")
-        plt.savefig(fileName,bbox_inches='tight',dpi=100)
+    def getGraphJobs(self):
+        # the charts cover the days up to but not including today
+        startDate = datetime.date.today() - datetime.timedelta(self.graphWindow)
         
-        plt.close('all')
+        entryDates = [startDate + datetime.timedelta(dayOffset) for dayOffset in range(0, self.graphWindow)]
         
-        self.Graphs.update({"AllInstallsAndUpdates":fileName})
-
-    def saveProceedsGraph(self, basePath, proceeds, currencyCode, entryDates):
-        barWidth = 0.7
-        barIndices = np.arange(len(entryDates))
-
-        # build the proceeds for this currency code        
-        workingProceeds = []
-        for dailyProceeds in proceeds:
-            if currencyCode in dailyProceeds:
-                workingProceeds.append(dailyProceeds[currencyCode])
-            else:
-                workingProceeds.append(0)
-    
-        maxY = math.ceil(max(workingProceeds)) + 1
-    
-        figure, unitsGraph = plt.subplots()
-        proceedsRects = unitsGraph.bar(barIndices, workingProceeds, barWidth, color='g')
-        plt.ylim(ymax=maxY, ymin=0)
-    
-        unitsGraph.set_ylabel("Amount Earned {code}".format(code=currencyCode))
-        unitsGraph.set_title("Proceeds for {name} in {code}".format(name=self.Name, code=currencyCode))
-        unitsGraph.set_xticks(barIndices+barWidth)
-        unitsGraph.set_xticklabels(entryDates, rotation=-90)
-    
-        def autolabel(rects):
-            for rect in rects:
-                height = rect.get_height()
-                if height > 0:
-                    unitsGraph.text(rect.get_x()+rect.get_width()/2., 1.05*height, '%1.2f'%float(height), ha='center', va='bottom', rotation=-90)
-
-        autolabel(proceedsRects)
-    
-        fileName = os.path.join(basePath, self.SKU + "_Proceeds_{code}.png".format(code=currencyCode))
-        plt.savefig(fileName,bbox_inches='tight',dpi=100)
+        installs = self.allInstallsByDate.getDailyTotals(startDate, self.graphWindow).tolist()
+        updates = self.updatesByDate.getDailyTotals(startDate, self.graphWindow).tolist()
         
-        plt.close('all')
+        # each chart is described by its name in Graphs and [graph type, file name, arguments] for the GraphRenderer
+        graphJobs = []
         
-        self.Graphs.update({"Proceeds_{code}".format(code=currencyCode):fileName})
-    
-    def generateAndSaveCountryInstallsChart(self, fileName, title, countries, installs):
-        for countryIdx in range(0, len(countries)):
-            countries[countryIdx] += " ({installs})".format(installs=installs[countryIdx])
+        fileName = os.path.join(self.basePath, self.SKU + "_AllInstallsAndUpdates.png")
+        graphJobs.append(["AllInstallsAndUpdates", [GraphTypes.Units, fileName, [self.Name, installs, updates, entryDates]]])
         
-        plt.figure(1, figsize=(6,6))
-    
-        pieWedges = plt.pie(installs, labels=countries, shadow=False)
-        
-        # make the edges white (From http://nxn.se/post/46440196846/making-nicer-looking-pie-charts-with-matplotlib)
-        for wedge in pieWedges[0]:
-            wedge.set_edgecolor('white')
-            
-        plt.title(title)
-    
-        plt.savefig(fileName, bbox_inches='tight', dpi=100)
-        
-        plt.close('all')
-
-    def saveCountryDistributionGraphs(self, basePath):
         reportList = dict();
         reportList.update({"PaidInstalls" : ["Sales",          self.paidInstallsByCountry, self.newPaidInstallsByCountry]})
         reportList.update({"FreeInstalls" : ["Free Installs",  self.freeInstallsByCountry, self.newFreeInstallsByCountry]})
@@ -558,50 +378,22 @@ class SKUData:
         for reportName in reportList:
             [reportTitle, installsByCountry, newInstallsByCountry] = reportList[reportName]
             
-            countries = installsByCountry.keys()
-            installs = installsByCountry.values()
-            
-            fileName = os.path.join(basePath, self.SKU + "_{reportName}ByCountry.png".format(reportName=reportName))
-            self.generateAndSaveCountryInstallsChart(fileName, "{reportTitle} by Country".format(reportTitle=reportTitle), countries, installs)
-            self.Graphs.update({"{reportName}ByCountry".format(reportName=reportName):fileName})
+            fileName = os.path.join(self.basePath, self.SKU + "_{reportName}ByCountry.png".format(reportName=reportName))
+            graphJobs.append(["{reportName}ByCountry".format(reportName=reportName),
+                              [GraphTypes.CountryInstalls, fileName, ["{reportTitle} by Country".format(reportTitle=reportTitle), installsByCountry.keys(), installsByCountry.values()]]])
     
             if self.hasNewData and len(newInstallsByCountry) > 0:
-                countries = newInstallsByCountry.keys()
-                installs = newInstallsByCountry.values()
-                
-                fileName = os.path.join(basePath, self.SKU + "_New{reportName}ByCountry.png".format(reportName=reportName))
-                self.generateAndSaveCountryInstallsChart(fileName, "New {reportTitle} by Country".format(reportTitle=reportTitle), countries, installs)
-                self.Graphs.update({"New{reportName}ByCountry".format(reportName=reportName):fileName})
-
-    def generateGraphs(self, basePath):
-        startDate = datetime.date.today()
-    
-        entryDates = []
-    
-        reportDates = self.allInstallsByDate.keys()
-        reportDates.sort()
-    
-        installs = []
-        updates = []
-        proceeds = []
-    
-        # build up the data for the last 30 days
-        for dayOffset in range(30, 0, -1):
-            searchDate = startDate - datetime.timedelta(dayOffset)
-        
-            entryDates.append(searchDate)
-        
-            if searchDate in reportDates:
-                installs.append(self.allInstallsByDate[searchDate])
-                updates.append(self.updatesByDate[searchDate])
-                proceeds.append(self.proceedsByDate[searchDate])
-            else:
-                installs.append(0)
-                updates.append(0)
-                proceeds.append(dict())
-    
-        self.saveUnitsGraph(basePath, installs, updates, entryDates)
-        self.saveCountryDistributionGraphs(basePath)
+                fileName = os.path.join(self.basePath, self.SKU + "_New{reportName}ByCountry.png".format(reportName=reportName))
+                graphJobs.append(["New{reportName}ByCountry".format(reportName=reportName),
+                                  [GraphTypes.CountryInstalls, fileName, ["New {reportTitle} by Country".format(reportTitle=reportTitle), newInstallsByCountry.keys(), newInstallsByCountry.values()]]])
         
         for currencyCode in self.proceedsTotal.keys():
-            self.saveProceedsGraph(basePath, proceeds, currencyCode, entryDates)
+            # build the proceeds for this currency code
+            workingProceeds = [0] * self.graphWindow
+            if currencyCode in self.proceedsByDate:
+                workingProceeds = self.proceedsByDate[currencyCode].getDailyTotals(startDate, self.graphWindow).tolist()
+            
+            fileName = os.path.join(self.basePath, self.SKU + "_Proceeds_{code}.png".format(code=currencyCode))
+            graphJobs.append(["Proceeds_{code}".format(code=currencyCode), [GraphTypes.Proceeds, fileName, [self.Name, workingProceeds, currencyCode, entryDates]]])
+        
+        return graphJobs
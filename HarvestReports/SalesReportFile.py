@@ -33,6 +33,14 @@
 # THE SOFTWARE.
 
 import datetime
+import itertools
+
+import numpy as np
+
+from ReportArchive import readReportLines
+
+# stands in for fields that were not present on a report line
+AbsentField = object()
 
 class SalesReportFile:
     fields = [
@@ -62,65 +70,274 @@ class SalesReportFile:
               ["Supported Platforms"]               #23
              ]
 
-    def __init__(self, reportFile, isNewFile, fieldRemapper):
-        self.data = []
+    # fields stored as typed arrays, every other field is stored as category codes
+    IntegerFields = ["Units"]
+    FloatFields = ["Developer Proceeds (per item)", "Customer Price"]
+    DateFields = ["Begin Date", "End Date"]
+    
+    # header names that differ from the field names used internally
+    HeaderAliases = {"Developer Proceeds" : "Developer Proceeds (per item)"}
+
+    def __init__(self, reportFile, isNewFile, fieldRemapper, parsedColumns=None):
         self.isNewFile = isNewFile
         self.fileName = reportFile
         
-        # stream in the downloaded report file
-        reportFileHandle = open(reportFile, 'r')
-        reportFileContents = reportFileHandle.readlines()
-        reportFileHandle.close()
+        self.numLines = 0
+        self.fieldNames = []
+        
+        # field name -> array of values (numbers and date ordinals) or of indices into the categories
+        self.columns = dict()
+        self.categories = dict()
+        
+        # field name -> {line index : value} for cells in a typed column that are not of that type (eg. blank)
+        self.irregularValues = dict()
+        
+        # the lines have already been parsed (eg. loaded from the report cache)
+        if parsedColumns != None:
+            [self.numLines, self.fieldNames, self.columns, self.categories, self.irregularValues] = parsedColumns
+        else:
+            self.parseReportFile(reportFile, fieldRemapper)
+        
+        # row by row access for existing callers
+        self.data = SalesReportLines(self)
+    
+    def getParsedColumns(self):
+        return [self.numLines, self.fieldNames, self.columns, self.categories, self.irregularValues]
+    
+    def parseReportFile(self, reportFile, fieldRemapper):
+        # stream in the downloaded report file (or its copy in a report archive)
+        reportFileContents = readReportLines(reportFile)
+        
+        if len(reportFileContents) == 0:
+            reportFileContents = [""]
+        
+        # work out how to handle each column from the header, then split every line into its cells
+        columnPlan = self.compileColumnPlan(reportFileContents[0].strip().split('\t'), fieldRemapper)
+        lineElements = [reportFileLine.strip().split('\t') for reportFileLine in reportFileContents[1:]]
+        
+        self.numLines = len(lineElements)
+        self.fieldNames = []
+        
+        # when every line is complete the columns can be read straight off the transposed lines
+        numColumns = max([columnIndex for [fieldName, columnIndex, convertValue, isDerived] in columnPlan if columnIndex != None] + [-1]) + 1
+        lineColumns = None
+        if all(len(elements) >= numColumns for elements in lineElements):
+            lineColumns = zip(*lineElements)
+        
+        for [fieldName, columnIndex, convertValue, isDerived] in columnPlan:
+            # fields with no column are padded out. sometimes the reports drop off entries for old data
+            if columnIndex == None:
+                rawValues = [None] * self.numLines
+            elif lineColumns != None:
+                rawValues = map(str.strip, lineColumns[columnIndex]) if self.numLines > 0 else []
+            else:
+                rawValues = [elements[columnIndex].strip() if columnIndex < len(elements) else None for elements in lineElements]
+            
+            # each distinct value is only converted once
+            convertedValues = dict()
+            for rawValue in set(rawValues):
+                if rawValue == None or len(rawValue) == 0:
+                    # derived fields are left off lines that have no value to derive them from
+                    convertedValues.update({rawValue : AbsentField if isDerived else rawValue})
+                else:
+                    convertedValues.update({rawValue : convertValue(rawValue)})
+            
+            self.fieldNames.append(fieldName)
+            
+            if fieldName in self.IntegerFields or fieldName in self.DateFields:
+                self.storeTypedColumn(fieldName, rawValues, convertedValues, int, np.int32, 0)
+            elif fieldName in self.FloatFields:
+                self.storeTypedColumn(fieldName, rawValues, convertedValues, float, np.float64, np.nan)
+            else:
+                self.storeCategoryColumn(fieldName, rawValues, convertedValues)
+    
+    def compileColumnPlan(self, headerNames, fieldRemapper):
+        fieldNames = [field[0] for field in self.fields]
+        
+        # locate each known field by its header, columns that are not known are never read
+        columnIndices = dict()
+        for columnIndex in range(0, len(headerNames)):
+            headerName = headerNames[columnIndex].strip()
+            fieldName = self.HeaderAliases.get(headerName, headerName)
+            
+            if fieldName in fieldNames and fieldName not in columnIndices:
+                columnIndices.update({fieldName : columnIndex})
+        
+        # without a recognisable header fall back to the standard column order
+        if len(columnIndices) == 0:
+            columnIndices = dict(zip(fieldNames, range(0, len(fieldNames))))
+        
+        def remapWith(mapping):
+            return lambda fieldValue: mapping[fieldValue]
+        
+        def unchanged(fieldValue):
+            return fieldValue
+        
+        def toOrdinal(fieldValue):
+            return datetime.datetime.strptime(fieldValue, "%m/%d/%Y").toordinal()
+        
+        # some fields require additional processing to remap to actual values or coerce types
+        converters = {"Developer Proceeds (per item)" : float,
+                      "Customer Price"                : float,
+                      "Units"                         : int,
+                      "Begin Date"                    : toOrdinal,
+                      "End Date"                      : toOrdinal}
+        
+        if len(fieldRemapper.ProductTypeFromCode) > 0:
+            converters.update({"Product Type Identifier" : remapWith(fieldRemapper.ProductTypeFromCode)})
+            converters.update({"Country Code" : remapWith(fieldRemapper.CountryFromCode)})
+        if len(fieldRemapper.CountryFromCode) > 0:
+            converters.update({"Provider Country" : remapWith(fieldRemapper.CountryFromCode)})
+            converters.update({"Currency of Proceeds" : remapWith(fieldRemapper.CurrencyFromCode)})
+        if len(fieldRemapper.CurrencyFromCode) > 0:
+            converters.update({"Customer Currency" : remapWith(fieldRemapper.CurrencyFromCode)})
+        if len(fieldRemapper.PromoTypeFromCode) > 0:
+            converters.update({"Promo Code" : remapWith(fieldRemapper.PromoTypeFromCode)})
+        
+        columnPlan = []
+        for fieldName in fieldNames:
+            columnPlan.append([fieldName, columnIndices.get(fieldName), converters.get(fieldName, unchanged), False])
         
-        # parse the report data
-        firstLine = True
-        for reportFileLine in reportFileContents:
-            if firstLine:
-                firstLine = False
+        # the currency code is kept alongside the remapped currency of proceeds
+        if "Currency of Proceeds" in columnIndices and len(fieldRemapper.CountryFromCode) > 0:
+            columnPlan.append(["Currency Code of Proceeds", columnIndices["Currency of Proceeds"], unchanged, True])
+        
+        return columnPlan
+    
+    def storeTypedColumn(self, fieldName, rawValues, convertedValues, valueType, arrayType, fillValue):
+        # values that are not of the column type (eg. blank) are filled in the array and stored separately
+        columnValues = dict()
+        irregularRawValues = dict()
+        for [rawValue, fieldValue] in convertedValues.items():
+            if type(fieldValue) == valueType:
+                columnValues.update({rawValue : fieldValue})
+            else:
+                columnValues.update({rawValue : fillValue})
+                irregularRawValues.update({rawValue : fieldValue})
+        
+        self.columns.update({fieldName : np.array([columnValues[rawValue] for rawValue in rawValues], dtype=arrayType)})
+        
+        if len(irregularRawValues) > 0:
+            irregularValues = dict()
+            for lineIndex in range(0, len(rawValues)):
+                if rawValues[lineIndex] in irregularRawValues:
+                    irregularValues.update({lineIndex : irregularRawValues[rawValues[lineIndex]]})
+            
+            self.irregularValues.update({fieldName : irregularValues})
+    
+    def storeCategoryColumn(self, fieldName, rawValues, convertedValues):
+        categories = []
+        categoryCodes = dict()
+        rawValueCodes = dict()
+        
+        # absent fields are given the code -1
+        for rawValue in sorted(convertedValues.keys()):
+            fieldValue = convertedValues[rawValue]
+            
+            if fieldValue is AbsentField:
+                rawValueCodes.update({rawValue : -1})
                 continue
-                
-            cleanedLineElements = reportFileLine.strip().split('\t')
-         
-            # extract and process the fields as required
-            extractedLine = dict()
-            for fieldIndex in range(0, len(cleanedLineElements)):
-                fieldName = self.fields[fieldIndex][0]
-                fieldValue = cleanedLineElements[fieldIndex].strip()
-                
-                # some fields require additional processing to remap to actual values or coerce types
-                if len(fieldValue) > 0:
-                    if fieldName == "Product Type Identifier" and len(fieldRemapper.ProductTypeFromCode) > 0:
-                        fieldValue = fieldRemapper.ProductTypeFromCode[fieldValue]
-                    if fieldName == "Provider Country" and len(fieldRemapper.CountryFromCode) > 0:
-                        fieldValue = fieldRemapper.CountryFromCode[fieldValue]
-                    if fieldName == "Customer Currency" and len(fieldRemapper.CurrencyFromCode) > 0:
-                        fieldValue = fieldRemapper.CurrencyFromCode[fieldValue]
-                    if fieldName == "Country Code" and len(fieldRemapper.ProductTypeFromCode) > 0:
-                        fieldValue = fieldRemapper.CountryFromCode[fieldValue]
-                    if fieldName == "Currency of Proceeds" and len(fieldRemapper.CountryFromCode) > 0:
-                        extractedLine.update({"Currency Code of Proceeds": fieldValue})
-                        fieldValue = fieldRemapper.CurrencyFromCode[fieldValue]
-                    if fieldName == "Promo Code" and len(fieldRemapper.PromoTypeFromCode) > 0:
-                        fieldValue = fieldRemapper.PromoTypeFromCode[fieldValue]
-                        
-                    if fieldName == "Developer Proceeds (per item)":
-                        fieldValue = float(fieldValue)
-                    if fieldName == "Customer Price":
-                        fieldValue = float(fieldValue)
-                    if fieldName == "Units":
-                        fieldValue = int(fieldValue)
-                    if fieldName == "Begin Date":
-                        fieldValue = (datetime.datetime.strptime(fieldValue, "%m/%d/%Y")).date()
-                    if fieldName == "End Date":
-                        fieldValue = (datetime.datetime.strptime(fieldValue, "%m/%d/%Y")).date()
-                
-                extractedLine.update({fieldName : fieldValue})
+            
+            if fieldValue not in categoryCodes:
+                categoryCodes.update({fieldValue : len(categories)})
+                categories.append(fieldValue)
+            
+            rawValueCodes.update({rawValue : categoryCodes[fieldValue]})
+        
+        # use the smallest code type that can index every category
+        if len(categories) < np.iinfo(np.int8).max:
+            codeType = np.int8
+        elif len(categories) < np.iinfo(np.int16).max:
+            codeType = np.int16
+        else:
+            codeType = np.int32
+        
+        self.columns.update({fieldName : np.array([rawValueCodes[rawValue] for rawValue in rawValues], dtype=codeType)})
+        self.categories.update({fieldName : categories})
+    
+    def getColumnValues(self, fieldName):
+        column = self.columns[fieldName]
+        
+        if fieldName in self.categories:
+            # the extra entry means a code of -1 picks up the absent marker
+            categories = self.categories[fieldName] + [AbsentField]
+            return [categories[code] for code in column.tolist()]
+        
+        if fieldName in self.DateFields:
+            dates = dict()
+            for ordinal in np.unique(column).tolist():
+                if ordinal > 0:
+                    dates.update({ordinal : datetime.date.fromordinal(ordinal)})
+            
+            fieldValues = [dates.get(ordinal) for ordinal in column.tolist()]
+        else:
+            fieldValues = column.tolist()
+        
+        for [lineIndex, fieldValue] in self.irregularValues.get(fieldName, dict()).items():
+            fieldValues[lineIndex] = fieldValue
+        
+        return fieldValues
+    
+    def getValue(self, fieldName, lineIndex):
+        irregularValues = self.irregularValues.get(fieldName)
+        if irregularValues != None and lineIndex in irregularValues:
+            return irregularValues[lineIndex]
+        
+        fieldValue = self.columns[fieldName][lineIndex].item()
+        
+        if fieldName in self.categories:
+            if fieldValue < 0:
+                return AbsentField
+            return self.categories[fieldName][fieldValue]
+        
+        if fieldName in self.DateFields:
+            if fieldValue > 0:
+                return datetime.date.fromordinal(fieldValue)
+            return None
+        
+        return fieldValue
+    
+    def getAbsentFieldNames(self):
+        return [fieldName for fieldName in self.categories if (self.columns[fieldName] < 0).any()]
 
-            # pad out missing fields. sometimes the reports drop off entries for old data
-            for fieldIndex in range(0, len(self.fields)):
-                fieldName = self.fields[fieldIndex][0]
-                
-                if not fieldName in extractedLine:
-                    extractedLine.update({fieldName : None})
-                
-            self.data.append(extractedLine)
+class SalesReportLines:
+    def __init__(self, salesReportFile):
+        self.salesReportFile = salesReportFile
+    
+    def __len__(self):
+        return self.salesReportFile.numLines
+    
+    def __iter__(self):
+        return iter(self.getLines())
+    
+    def __getitem__(self, lineIndex):
+        if isinstance(lineIndex, slice):
+            return [self[sliceIndex] for sliceIndex in range(*lineIndex.indices(len(self)))]
+        
+        if lineIndex < 0:
+            lineIndex += len(self)
+        if lineIndex < 0 or lineIndex >= len(self):
+            raise IndexError("Report line index out of range")
+        
+        reportLine = dict()
+        for fieldName in self.salesReportFile.fieldNames:
+            fieldValue = self.salesReportFile.getValue(fieldName, lineIndex)
+            
+            if fieldValue is not AbsentField:
+                reportLine.update({fieldName : fieldValue})
+        
+        return reportLine
+    
+    def getLines(self):
+        fieldNames = self.salesReportFile.fieldNames
+        columnValues = [self.salesReportFile.getColumnValues(fieldName) for fieldName in fieldNames]
+        
+        reportLines = [dict(itertools.izip(fieldNames, lineValues)) for lineValues in itertools.izip(*columnValues)]
+        
+        # remove the fields that were not present on the original lines
+        for fieldName in self.salesReportFile.getAbsentFieldNames():
+            for reportLine in reportLines:
+                if reportLine[fieldName] is AbsentField:
+                    del reportLine[fieldName]
+        
+        return reportLines
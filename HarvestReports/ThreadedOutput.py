@@ -0,0 +1,66 @@
+#!/usr/bin/python
+
+# Harvest Reports v0.1.5
+# Copyright (c) 2014-2015 Iain McManus. All rights reserved.
+#
+# Harvest Reports is a wrapper around Apple's AutoIngestion Java Class.
+# Harvest Reports can download all of the recent daily data and will produce
+# a summary of the sales, updates and a breakdown of region where sales have occurred.
+#
+# Information is also generated per version, including a calculation of the number of users
+# on the latest version.
+#
+# Harvest Reports can be run on a regular schedule and be configured to send an email
+# with the daily summary when the daily report is out. If no sales/updates have occurred
+# it can indicate that as well.
+
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in
+# all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN
+# THE SOFTWARE.
+
+import StringIO
+import threading
+
+class ThreadedOutput:
+    # stands in for sys.stdout so that each capturing thread writes to its own buffer instead of interleaving with the others
+    def __init__(self, output):
+        self.output = output
+        self.buffers = dict()
+        self.outputLock = threading.Lock()
+    
+    def capture(self):
+        self.buffers[threading.current_thread().ident] = StringIO.StringIO()
+    
+    def release(self):
+        return self.buffers.pop(threading.current_thread().ident).getvalue()
+    
+    def write(self, text):
+        # unicode is encoded as it is written so the buffers only ever hold byte strings
+        if isinstance(text, unicode):
+            text = text.encode(getattr(self.output, "encoding", None) or "utf-8", "replace")
+        
+        buffer = self.buffers.get(threading.current_thread().ident)
+        
+        if buffer != None:
+            buffer.write(text)
+        else:
+            with self.outputLock:
+                self.output.write(text)
+    
+    def flush(self):
+        with self.outputLock:
+            self.output.flush()
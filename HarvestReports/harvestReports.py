@@ -34,64 +34,144 @@
 
 import csv
 import datetime
-import feedparser
 import getopt
 import gzip
-import math
 import os
-import smtplib
+import shutil
 import socket
-import subprocess
 import sys
+import threading
 import time
+import traceback
 
-from unidecode import unidecode
+from multiprocessing.pool import ThreadPool
 
-from email.mime.text import MIMEText
-from email.mime.multipart import MIMEMultipart
-from email.mime.image import MIMEImage
-
-from SalesReportFile import SalesReportFile
+from AutoingestionClient import AutoingestionClient
+from FeedCache import FeedCache
+from GraphRenderer import renderGraphs
+from ReportArchive import ReportArchive
+from ReportCache import ReportCache
+from ReportCube import ReportCube
+from ReportCoverage import getPeriodDateString, getPeriodDescription, getReportFileName, getReportPeriod, getRequestedPeriods, PeriodNames, selectReportCoverage
+from ReviewFeedParser import parseReviewFeed
+from ReviewLog import ReviewLog
 from SKUData import SKUData
+from ThreadedOutput import ThreadedOutput
 
+from Common import DownloadResults
+from Common import FeedResults
 from Common import FieldRemapper
+from Common import GraphConfig
 from Common import RatingsSummaryFields
+from Common import ReportPeriods
 from Common import ReportTypes
-from Common import RSSFields
+
+# the number of report files loaded at once when filling the report database
+DatabaseIngestBatchSize = 64
+
+# the charts shown for every SKU in the summary email
+EmailGraphNames = ["AllInstallsAndUpdates", "AllInstallsByCountry"]
+
+# the daemon polls at the shorter interval, doubling it for each poll that finds nothing up to the longer one
+DefaultPollMinutes = 15
+DefaultMaxPollMinutes = 120
+DefaultHealthFile = "harvestReports.health"
+
+CustomerReviewsFeedURL = "https://itunes.apple.com/{countryCode}/rss/customerreviews/id={appId}/sortBy=mostRecent/xml"
+CustomerReviewsPageURL = "https://itunes.apple.com/{countryCode}/rss/customerreviews/page={page}/id={appId}/sortBy=mostRecent/xml"
+
+# the customer reviews feeds are split into pages of the most recent reviews first, no more than this many pages are ever served
+MaxCustomerReviewsPages = 10
                 
-def processDailiesIn(basePath, downloadedFiles, reportType, fieldRemapper):
-    salesReportObjects = []
+def processDailiesIn(basePath, downloadedFiles, reportType, fieldRemapper, numParseWorkers=1, graphConfig=None, reportDatabase=None, reportCube=None):
+    reportCache = ReportCache(fieldRemapper)
+    
+    # a cube that is kept in memory between runs is brought up to date rather than loaded again
+    if reportCube == None:
+        reportCube = ReportCube(basePath, fieldRemapper)
     
-    # build the list of all of the files
+    # build the list of all of the files, starting with those in the archives
+    reportArchive = ReportArchive(basePath)
+    reportFiles = reportArchive.getReportSignatures()
+    
+    # loose files take the place of any archived copy (eg. if a day has been downloaded again)
+    looseFileNames = set()
     for filename in os.listdir(basePath):
         if filename.endswith('.txt'):
-            # check if it's a new file
-            isNewFile = False
-            if downloadedFiles != None:
-                for downloadedFile in downloadedFiles:
-                    if filename in downloadedFile:
-                        isNewFile = True
-                        break
-            
-            parsedFile = SalesReportFile(os.path.join(basePath, filename), isNewFile, fieldRemapper)
-                
-            salesReportObjects.append(parsedFile)
-            
-    skuRelatedReportLines = dict()
+            reportFileStat = os.stat(os.path.join(basePath, filename))
+            reportFiles.update({filename : [reportFileStat.st_size, reportFileStat.st_mtime]})
+            looseFileNames.add(filename)
     
-    # identify all of the SKU names
-    for salesReportObject in salesReportObjects:
-        for reportEntry in salesReportObject.data:
-            skuName = reportEntry["SKU"]
+    # coarser reports take the place of the finer reports for the same days so that nothing is counted twice
+    reportFiles = dict([[filename, reportFiles[filename]] for filename in selectReportCoverage(reportFiles.keys())[0]])
+    
+    def getReportPath(filename):
+        if filename in looseFileNames:
+            return os.path.join(basePath, filename)
+        
+        return reportArchive.getArchivedPath(filename)
+    
+    # reports that have changed since they were added to the cube are taken back out of it
+    rewrittenFileNames = []
+    if downloadedFiles != None:
+        rewrittenFileNames = [os.path.basename(downloadedFile) for downloadedFile in downloadedFiles]
+    
+    reportCube.removeStaleFiles(reportFiles, rewrittenFileNames)
+    
+    filesToLoad = []
+    for filename in reportFiles:
+        # reports already in the cube do not need to be loaded again
+        if reportCube.isApplied(filename):
+            continue
+        
+        # check if it's a new file, weekly, monthly and yearly reports only ever fill in the history
+        isNewFile = False
+        reportPeriod = getReportPeriod(filename)
+        if downloadedFiles != None and (reportPeriod == None or reportPeriod[0] == ReportPeriods.Daily):
+            for downloadedFile in downloadedFiles:
+                if filename in downloadedFile:
+                    isNewFile = True
+                    break
+        
+        filesToLoad.append([getReportPath(filename), isNewFile])
+    
+    # only new or changed files need to be parsed, everything else comes from the cache
+    salesReportObjects = reportCache.loadReportFiles(filesToLoad, numParseWorkers)
+    
+    # bring the report database in line with the report files, using the files already loaded where possible
+    if reportDatabase != None:
+        loadedReportFiles = dict([[os.path.basename(salesReportObject.fileName), salesReportObject] for salesReportObject in salesReportObjects])
+        filesToIngest = sorted(reportDatabase.getFilesToIngest(reportFiles))
+        
+        # anything else is loaded a batch at a time to keep the memory use down on the first run
+        for batchStart in range(0, len(filesToIngest), DatabaseIngestBatchSize):
+            batchFileNames = filesToIngest[batchStart:batchStart + DatabaseIngestBatchSize]
             
-            skuRelatedReportLines.setdefault(skuName, []).append([salesReportObject.isNewFile, reportEntry])
-
+            filesToLoadForDatabase = [[getReportPath(filename), False] for filename in batchFileNames if filename not in loadedReportFiles]
+            batchReportFiles = dict([[os.path.basename(salesReportObject.fileName), salesReportObject] for salesReportObject in reportCache.loadReportFiles(filesToLoadForDatabase, numParseWorkers)])
+            
+            for filename in batchFileNames:
+                reportDatabase.ingestReportFile(filename, reportFiles[filename], loadedReportFiles.get(filename, batchReportFiles.get(filename)))
+        
+        reportDatabase.removeMissingFiles(reportFiles)
+        reportDatabase.updateMonthlyTotals()
+            
+    # fold the new and changed reports into the cube
+    newFileNames = []
+    for salesReportObject in salesReportObjects:
+        filename = os.path.basename(salesReportObject.fileName)
+        reportCube.addReportFile(filename, reportFiles[filename], salesReportObject)
+        
+        if salesReportObject.isNewFile:
+            newFileNames.append(filename)
+    
+    reportCube.save()
+    
     skuData = dict()
-                    
-    # build up the per sku data
-    skuNames = skuRelatedReportLines.keys()
-    for skuName in skuNames:
-        skuSummary = SKUData(basePath, skuRelatedReportLines[skuName], fieldRemapper)
+    
+    # build up the per sku data from the cells of the cube
+    for [skuName, skuCells] in reportCube.getSKUCells(newFileNames).items():
+        skuSummary = SKUData(basePath, skuCells, fieldRemapper, graphConfig)
         
         skuData.update({skuName : skuSummary})
     
@@ -102,146 +182,158 @@ def processDailiesIn(basePath, downloadedFiles, reportType, fieldRemapper):
     
     return skuData
     
-def downloadDailies(propertiesFile, vendorId, numDaysBack, overwriteExistingData, basePath, verbose):
+def retrieveReport(autoingestionClient, propertiesFile, vendorId, reportPeriod, requestedDateString, downloadedFilePath):
     downloadedFiles = []
     
-    addedPlaceHolderFileForEventlessDay = False
+    autoingestionOutput = autoingestionClient.requestSummary(propertiesFile, vendorId, PeriodNames[reportPeriod], requestedDateString)
     
-    for dayOffset in range(0, numDaysBack):
-        requestedDate = datetime.date.today() - datetime.timedelta(dayOffset)
-        requestedDateString = "{year:04}{month:02}{day:02}".format(year=requestedDate.year, month=requestedDate.month, day=requestedDate.day)
-        
-        downloadedFileName = "S_D_{vendorId}_{dateString}.txt".format(vendorId=vendorId, dateString=requestedDateString)
-        downloadedFilePath = os.path.join(basePath, downloadedFileName)
-        
-        if overwriteExistingData or not os.path.exists(downloadedFilePath):
-            autoingestionOutput = subprocess.check_output(["java", "-cp", ".", "Autoingestion", propertiesFile, vendorId, "sales", "daily", "summary", requestedDateString])
-            
-            downloadedSuccessfully = False
-            noReportsAvailable = False
-            invalidDate = False
-            
-            if "File Downloaded Successfully" in autoingestionOutput:
-                downloadedSuccessfully = True
-            elif "There are no reports available to download for this selection." in autoingestionOutput:
-                noReportsAvailable = True
-                
-                placeholderHandle = open(downloadedFilePath, 'wt')
-                placeholderHandle.close()
+    if "File Downloaded Successfully" in autoingestionOutput:
+        outputLines = autoingestionOutput.split("\n")
+        for outputLine in outputLines:
+            if vendorId in outputLine:
+                fileName = outputLine.strip()
                 
-                addedPlaceHolderFileForEventlessDay = True
-            elif "Daily reports are available only for" in autoingestionOutput:
-                invalidDate = True
+                if ".gz" in outputLine:
+                    sourceFileHandle = gzip.GzipFile(fileName)
                     
-            if downloadedSuccessfully:
-                if verbose:
-                    print "Downloaded report for {day:02}/{month:02}/{year:04}".format(day=requestedDate.day, month=requestedDate.month, year=requestedDate.year)
-                
-                outputLines = autoingestionOutput.split("\n")
-                for outputLine in outputLines:
-                    if vendorId in outputLine:
-                        fileName = outputLine.strip()
-                        
-                        if ".gz" in outputLine:
-                            sourceFileHandle = gzip.GzipFile(fileName)
-                            
-                            destinationFileHandle = open(downloadedFilePath, 'wb')
-                            destinationFileHandle.write(sourceFileHandle.read())
-                            destinationFileHandle.close()
-                            
-                            sourceFileHandle.close()
-                            
-                            os.remove(fileName)
-                        else:
-                            shutil.move(fileName, downloadedFilePath)
-                            
-                        downloadedFiles.append(downloadedFilePath)
-            else:
-                if verbose:
-                    print "Failed to download report for {day:02}/{month:02}/{year:04}".format(day=requestedDate.day, month=requestedDate.month, year=requestedDate.year)
+                    destinationFileHandle = open(downloadedFilePath, 'wb')
+                    destinationFileHandle.write(sourceFileHandle.read())
+                    destinationFileHandle.close()
+                    
+                    sourceFileHandle.close()
+                    
+                    os.remove(fileName)
+                else:
+                    shutil.move(fileName, downloadedFilePath)
+                    
+                downloadedFiles.append(downloadedFilePath)
                 
-                    if noReportsAvailable:
-                        print "    No installs have occurred for that date"
-                    elif invalidDate:
-                        print "    No data exists for that date. Either the day is too far back (Apple only keeps a limited number of dailies) or the report for that day does not yet exist"
-                    else:
-                       print "    The download failed for an unknown reason"
-        else:
-            if verbose:
-                print "Skipped existing data for {day:02}/{month:02}/{year:04}".format(day=requestedDate.day, month=requestedDate.month, year=requestedDate.year)
+        return [DownloadResults.Downloaded, downloadedFiles]
+    elif "There are no reports available to download for this selection." in autoingestionOutput:
+        # a finished week, month or year may simply not have been published yet so only days get a placeholder
+        if reportPeriod == ReportPeriods.Daily:
+            placeholderHandle = open(downloadedFilePath, 'wt')
+            placeholderHandle.close()
+        
+        return [DownloadResults.NoReportsAvailable, downloadedFiles]
+    elif "reports are available only for" in autoingestionOutput:
+        return [DownloadResults.InvalidDate, downloadedFiles]
     
-    return [addedPlaceHolderFileForEventlessDay, downloadedFiles]
+    return [DownloadResults.Failed, downloadedFiles]
 
-def loadFeedFile(filePath):
-    feedEntries = dict()
-    
-    if not os.path.exists(filePath):
-        return feedEntries
-    
-    with open(filePath, mode="rb") as savedFeed:
-        reader = csv.reader(savedFeed, delimiter='\t')
-        for row in reader:
-            entry = {RSSFields.Version:    row[RSSFields.Version], 
-                     RSSFields.Title:      row[RSSFields.Title], 
-                     RSSFields.Rating:     row[RSSFields.Rating],
-                     RSSFields.Summary:    row[RSSFields.Summary],
-                     RSSFields.UniqueId:   row[RSSFields.UniqueId]}
-            feedEntries.update({row[RSSFields.UniqueId] : entry})
+def getMissingDays(vendorId, basePath, requestedDays):
+    # the requested days that have no report yet, either of their own or as part of a weekly, monthly or yearly report
+    reportArchive = ReportArchive(basePath)
+    reportSignatures = reportArchive.getReportSignatures()
     
-    return feedEntries
+    coarseDays = selectReportCoverage(os.listdir(basePath) + reportSignatures.keys())[1]
     
-def writeFeedFile(filePath, feedEntries):
-    feedFile = open(filePath, "wb")
-    feedWriter = csv.writer(feedFile, delimiter="\t", quotechar="\"", quoting=csv.QUOTE_ALL)
+    missingDays = []
+    for requestedDay in requestedDays:
+        reportFileName = getReportFileName(vendorId, ReportPeriods.Daily, requestedDay)
+        
+        if requestedDay.toordinal() in coarseDays or reportFileName in reportSignatures or os.path.exists(os.path.join(basePath, reportFileName)):
+            continue
+        
+        missingDays.append(requestedDay)
     
-    for entry in feedEntries.values():
-        feedWriter.writerow([entry[RSSFields.Version], 
-                             entry[RSSFields.Title],
-                             entry[RSSFields.Rating],
-                             entry[RSSFields.Summary],
-                             entry[RSSFields.UniqueId]])
-                             
-    feedFile.close()
+    return missingDays
 
-def identifyNewFeedEntries(previousFeedEntries, feedEntries):
-    previousUniqueIds = previousFeedEntries.keys()
-    currentUniqueIds = feedEntries.keys()
+def downloadReports(propertiesFile, vendorId, periodsBack, overwriteExistingData, basePath, verbose, numWorkers=1, autoingestionClient=None, workerPool=None, requestedDays=None):
+    downloadedFiles = []
+    
+    addedPlaceHolderFileForEventlessDay = False
     
-    return [feedEntries[uniqueId] for uniqueId in currentUniqueIds if uniqueId not in previousUniqueIds]
+    if autoingestionClient == None:
+        autoingestionClient = AutoingestionClient()
     
-def analyseFeedEntries(feedEntries, newFeedEntries):
-    entrySummary = dict()
+    # a worker pool shared between vendors is left open for the other vendors
+    ownsWorkerPool = workerPool == None
+    if ownsWorkerPool:
+        workerPool = ThreadPool(max(1, numWorkers))
     
-    lifetimeAverageRating = 0
-    perVersionAverageRatings = dict()
-    perVersionRatingsCount = dict()
+    reportArchive = ReportArchive(basePath)
     
-    # build up the average rating information for all time and per version
-    for feedEntry in feedEntries.values():
-        appVersion = feedEntry[RSSFields.Version]
-        appRating = int(feedEntry[RSSFields.Rating])
-        
-        lifetimeAverageRating += appRating
+    def processReportRequest(reportRequest):
+        [reportPeriod, requestedDate, downloadedFilePath, downloadResult] = reportRequest
         
-        perVersionAverageRatings[appVersion] = perVersionAverageRatings.setdefault(appVersion, 0) + appRating
-        perVersionRatingsCount[appVersion] = perVersionRatingsCount.setdefault(appVersion, 0) + 1
+        if downloadResult != DownloadResults.Downloaded:
+            return [downloadResult, []]
         
-    # calculate the average rating if possible
-    if len(feedEntries) > 0:
-        lifetimeAverageRating = float(lifetimeAverageRating) / len(feedEntries)
+        return retrieveReport(autoingestionClient, propertiesFile, vendorId, reportPeriod, getPeriodDateString(reportPeriod, requestedDate), downloadedFilePath)
+    
+    # run several requests at once, the results come back in the order requested so the output stays in date order
+    try:
+        # the years, months and weeks are fetched first as any days they cover do not need to be fetched at all
+        reportPeriods = [ReportPeriods.Yearly, ReportPeriods.Monthly, ReportPeriods.Weekly, ReportPeriods.Daily]
         
-    # calculate the per version averages
-    for appVersion in perVersionAverageRatings.keys():
-        perVersionAverageRatings[appVersion] = float(perVersionAverageRatings[appVersion]) / perVersionRatingsCount[appVersion]
+        # a request for particular days (eg. a daemon poll) only fetches those days, the coarser reports are left to the full harvest
+        if requestedDays != None:
+            reportPeriods = [ReportPeriods.Daily]
         
-    # add the basic summary info
-    entrySummary.update({RatingsSummaryFields.LifetimeAverageRating     : lifetimeAverageRating})
-    entrySummary.update({RatingsSummaryFields.LifetimeRatingSamples     : len(feedEntries)})
-    entrySummary.update({RatingsSummaryFields.AverageRatingPerVersion   : perVersionAverageRatings})
-    entrySummary.update({RatingsSummaryFields.NumberOfRatingsPerVersion : perVersionRatingsCount})
-    entrySummary.update({RatingsSummaryFields.NumberOfNewRatings        : len(newFeedEntries)})
+        for reportPeriod in reportPeriods:
+            coarseDays = selectReportCoverage(os.listdir(basePath) + reportArchive.getReportSignatures().keys())[1]
+            periodNoun = ["date", "week", "month", "year"][reportPeriod]
+            
+            # work out the report for each period, requests for reports already present will be skipped
+            requestedDates = getRequestedPeriods(reportPeriod, datetime.date.today(), periodsBack.get(reportPeriod, 0))
+            
+            # particular days can be asked for in place of the days back
+            if requestedDays != None:
+                requestedDates = requestedDays
+            
+            reportRequests = []
+            for requestedDate in requestedDates:
+                downloadedFileName = getReportFileName(vendorId, reportPeriod, requestedDate)
+                downloadedFilePath = os.path.join(basePath, downloadedFileName)
+                
+                downloadResult = DownloadResults.Downloaded
+                if reportPeriod == ReportPeriods.Daily and requestedDate.toordinal() in coarseDays:
+                    downloadResult = DownloadResults.Covered
+                elif not overwriteExistingData and (os.path.exists(downloadedFilePath) or reportArchive.isArchived(downloadedFileName)):
+                    downloadResult = DownloadResults.Skipped
+                
+                reportRequests.append([reportPeriod, requestedDate, downloadedFilePath, downloadResult])
+            
+            reportResults = workerPool.imap(processReportRequest, reportRequests)
+            
+            for reportRequest in reportRequests:
+                periodDescription = getPeriodDescription(reportPeriod, reportRequest[1])
+                [downloadResult, reportFiles] = reportResults.next()
+                
+                downloadedFiles.extend(reportFiles)
+                
+                if downloadResult == DownloadResults.NoReportsAvailable and reportPeriod == ReportPeriods.Daily:
+                    addedPlaceHolderFileForEventlessDay = True
+                
+                if not verbose:
+                    continue
+                    
+                if downloadResult == DownloadResults.Downloaded:
+                    print "Downloaded report for {period}".format(period=periodDescription)
+                elif downloadResult == DownloadResults.Skipped:
+                    print "Skipped existing data for {period}".format(period=periodDescription)
+                elif downloadResult == DownloadResults.Covered:
+                    print "Skipped {period} as it is covered by a weekly, monthly or yearly report".format(period=periodDescription)
+                else:
+                    print "Failed to download report for {period}".format(period=periodDescription)
+                    
+                    if downloadResult == DownloadResults.NoReportsAvailable:
+                        print "    No installs have occurred for that {period}".format(period=periodNoun)
+                    elif downloadResult == DownloadResults.InvalidDate:
+                        print "    No data exists for that {period}. Either it is too far back (Apple only keeps a limited number of reports) or the report for it does not yet exist".format(period=periodNoun)
+                    else:
+                       print "    The download failed for an unknown reason"
+    finally:
+        if ownsWorkerPool:
+            workerPool.close()
+            workerPool.join()
     
-    return entrySummary
+    return [addedPlaceHolderFileForEventlessDay, downloadedFiles]
+
+def identifyNewFeedEntries(previousUniqueIds, feedEntries):
+    # the stored ids are held in a set so each review is a single hashed lookup
+    return [feedEntries[uniqueId] for uniqueId in feedEntries.keys() if uniqueId not in previousUniqueIds]
     
 def generateRatingsAndReviewsSummaryForApp(ratingsAndReviewsForApp):
     cumulativeAverage = 0.0
@@ -288,59 +380,175 @@ def generateRatingsAndReviewsSummaryForApp(ratingsAndReviewsForApp):
     ratingsAndReviewsForApp.update({RatingsSummaryFields.NumberOfRatingsPerVersion : cumulativeVersionAverageSamples})
     ratingsAndReviewsForApp.update({RatingsSummaryFields.NumberOfNewRatings        : cumulativeNumberOfNewRatings})
 
-def downloadRSSFeed(basePath, appIds, countryCodes):
+def fetchFeedEntries(feedURL, firstPageURL, etag, modified, knownUniqueIds):
+    # the feed modules are only loaded when the feeds are requested
+    import httplib
+    import urllib2
+    
+    # the stored validators let the server reply with not modified if there are no new reviews
+    feedRequest = urllib2.Request(feedURL)
+    if etag != None:
+        feedRequest.add_header("If-None-Match", etag)
+    if modified != None:
+        feedRequest.add_header("If-Modified-Since", modified)
+    
+    try:
+        feedResponse = urllib2.urlopen(feedRequest)
+        
+        try:
+            # the entries are read as the feed arrives and the stored reviews are skipped
+            [feedEntries, numEntries, lastPage] = parseReviewFeed(feedResponse, firstPageURL, knownUniqueIds)
+        finally:
+            feedResponse.close()
+    except urllib2.HTTPError, exc:
+        if exc.code == 304:
+            return [FeedResults.NotModified, None, etag, modified, None]
+        
+        return [FeedResults.Failed, None, None, None, None]
+    except (urllib2.URLError, httplib.HTTPException, socket.error, SyntaxError, ValueError):
+        return [FeedResults.Failed, None, None, None, None]
+    
+    # the download has failed for some reason
+    if numEntries == 0:
+        return [FeedResults.Failed, None, None, None, None]
+    
+    return [FeedResults.Downloaded, feedEntries, feedResponse.info().getheader("ETag"), feedResponse.info().getheader("Last-Modified"), lastPage]
+
+def fetchFeedPages(workerPool, pageRequests, feedValidators, knownUniqueIds, requestTimeout):
+    fetchedPages = dict()
+    requestStartTimes = dict()
+    
+    def fetchPage(pageRequest):
+        requestStartTimes.update({pageRequest : time.time()})
+        
+        [appId, countryCode, page] = pageRequest
+        
+        firstPageURL = CustomerReviewsFeedURL.format(countryCode=countryCode, appId=appId)
+        
+        # only the first page is requested conditionally, the later pages are only fetched when it has changed
+        if page == 1:
+            [etag, modified] = feedValidators[(appId, countryCode)]
+            
+            return fetchFeedEntries(firstPageURL, firstPageURL, etag, modified, knownUniqueIds[(appId, countryCode)])
+        
+        return fetchFeedEntries(CustomerReviewsPageURL.format(countryCode=countryCode, appId=appId, page=page), firstPageURL, None, None, knownUniqueIds[(appId, countryCode)])
+    
+    pendingPages = [[pageRequest, workerPool.apply_async(fetchPage, (pageRequest,))] for pageRequest in pageRequests]
+    
+    for [pageRequest, pendingPage] in pendingPages:
+        # wait until the page arrives or it has been in progress for longer than allowed
+        while not pendingPage.ready():
+            requestStartTime = requestStartTimes.get(pageRequest)
+            if requestStartTime != None and (time.time() - requestStartTime) > requestTimeout:
+                break
+            
+            pendingPage.wait(0.1)
+        
+        # late or failed downloads are treated the same as an empty page
+        fetchedPage = [FeedResults.Failed, None, None, None, None]
+        if pendingPage.ready() and pendingPage.successful():
+            fetchedPage = pendingPage.get()
+        
+        fetchedPages.update({pageRequest : fetchedPage})
+    
+    return fetchedPages
+
+def fetchAllFeedEntries(feedRequests, feedValidators, knownUniqueIds, numWorkers, requestTimeout):
+    fetchedFeeds = dict()
+    lastPages = dict()
+    
+    socket.setdefaulttimeout(requestTimeout)
+    
+    workerPool = ThreadPool(max(1, numWorkers))
+    
+    try:
+        # the first pages of every feed are fetched together, then the next page of each feed that is still giving new reviews
+        pageRequests = [(appId, countryCode, 1) for (appId, countryCode) in feedRequests]
+        
+        while len(pageRequests) > 0:
+            fetchedPages = fetchFeedPages(workerPool, pageRequests, feedValidators, knownUniqueIds, requestTimeout)
+            
+            nextPageRequests = []
+            for pageRequest in pageRequests:
+                [appId, countryCode, page] = pageRequest
+                [feedResult, feedEntries, etag, modified, lastPage] = fetchedPages[pageRequest]
+                feedRequest = (appId, countryCode)
+                
+                if page == 1:
+                    fetchedFeeds.update({feedRequest : [feedResult, feedEntries, etag, modified]})
+                    lastPages.update({feedRequest : min(lastPage or MaxCustomerReviewsPages, MaxCustomerReviewsPages)})
+                elif feedEntries != None:
+                    fetchedFeeds[feedRequest][1].update(feedEntries)
+                
+                # a page that only holds reviews that are already stored means every later page is already stored too
+                if feedEntries == None or page >= lastPages[feedRequest] or len(feedEntries) == 0:
+                    continue
+                
+                nextPageRequests.append((appId, countryCode, page + 1))
+            
+            pageRequests = nextPageRequests
+    finally:
+        # abandon any requests still running past their deadline
+        workerPool.terminate()
+    
+    return fetchedFeeds
+
+def downloadRSSFeed(basePath, appIds, countryCodes, numWorkers=8, requestTimeout=120):
     ratingsAndReviewsFeed = dict()
     newRatingsAndReviews = False
     
-    socket.setdefaulttimeout(120)
+    feedCache = FeedCache(basePath)
+    reviewLog = ReviewLog(basePath)
     
-    # for each app Id and country generate the feed URL and attempt to download the data
+    # build up the requests, conditional requests can only be used if the stored entries are still present
+    feedRequests = []
+    feedValidators = dict()
+    knownUniqueIds = dict()
     for appId in appIds:
-        ratingsAndReviewsForApp = dict()
-        
         for countryCode in countryCodes:
-            feedURL = "https://itunes.apple.com/{countryCode}/rss/customerreviews/id={appId}/sortBy=mostRecent/xml".format(countryCode=countryCode, appId=appId)
-            
-            feed = feedparser.parse(feedURL)
+            feedURL = CustomerReviewsFeedURL.format(countryCode=countryCode, appId=appId)
             
-            # build up the list of feed entries
-            feedEntries = dict()
-            for entry in feed.entries:
-                if "im_version" in entry:
-                    feedEntry = {RSSFields.Version:    unidecode(entry["im_version"]), 
-                                 RSSFields.Title:      unidecode(entry["title"]), 
-                                 RSSFields.Rating:     int(unidecode(entry["im_rating"])),
-                                 RSSFields.Summary:    unidecode(entry["summary"]),
-                                 RSSFields.UniqueId:   unidecode(entry["id"])}
-                    feedEntries.update({unidecode(entry["id"]) : feedEntry})
-                                  
-            downloadedFeedSummary = os.path.join(basePath, "RatingsAndReviews_{appId}_{countryCode}.csv".format(appId=appId, countryCode=countryCode))
+            if not reviewLog.exists(appId, countryCode):
+                feedCache.remove(feedURL)
             
-            # load the previous set of feed entries
-            previousFeedEntries = loadFeedFile(downloadedFeedSummary)
-            
-            # the download has failed for some reason
-            if len(feed.entries) == 0:
-                feedEntries = previousFeedEntries
+            feedRequests.append((appId, countryCode))
+            feedValidators.update({(appId, countryCode) : feedCache.getValidators(feedURL)})
+            knownUniqueIds.update({(appId, countryCode) : reviewLog.getUniqueIds(appId, countryCode)})
+    
+    # download the feeds, several at once
+    fetchedFeeds = fetchAllFeedEntries(feedRequests, feedValidators, knownUniqueIds, numWorkers, requestTimeout)
+    
+    for appId in appIds:
+        ratingsAndReviewsForApp = dict()
+        
+        for countryCode in countryCodes:
+            feedURL = CustomerReviewsFeedURL.format(countryCode=countryCode, appId=appId)
+            [feedResult, feedEntries, etag, modified] = fetchedFeeds[(appId, countryCode)]
             
-            # identify new feed entries
-            newFeedEntries = identifyNewFeedEntries(previousFeedEntries, feedEntries)
+            # identify new feed entries, nothing is new if the feed is unchanged or the download has failed
+            newFeedEntries = []
+            if feedEntries != None:
+                newFeedEntries = identifyNewFeedEntries(reviewLog.getUniqueIds(appId, countryCode), feedEntries)
 
             if len(newFeedEntries) > 0:
                 newRatingsAndReviews = True
             
-            # save out the list of new entries. no need to merge as the feedEntries is the full set
-            writeFeedFile(downloadedFeedSummary, feedEntries)
+            # only the new entries are added to the log, the statistics are updated as they are added
+            reviewLog.append(appId, countryCode, newFeedEntries)
             
-            # analyse the feed data
-            feedAnalysis = analyseFeedEntries(feedEntries, newFeedEntries)
+            # remember the validators so the next request can be conditional
+            if feedResult == FeedResults.Downloaded:
+                feedCache.update(feedURL, etag, modified)
             
             # add in the per country data
-            ratingsAndReviewsForApp.update({countryCode : feedAnalysis})
+            ratingsAndReviewsForApp.update({countryCode : reviewLog.getAnalysis(appId, countryCode, len(newFeedEntries))})
         
         # add in the per app data
         ratingsAndReviewsFeed.update({appId : ratingsAndReviewsForApp})
     
+    feedCache.save()
+    reviewLog.save()
+    
     # generate the summary data
     for ratingsAndReviewsForApp in ratingsAndReviewsFeed.values():
         generateRatingsAndReviewsSummaryForApp(ratingsAndReviewsForApp)
@@ -368,7 +576,17 @@ def generateHTMLReport(basePath, perSKUData):
     
     reportFile.close()
 
-def emailReportForNewData(downloadedFiles, perSKUData):
+def loadEmailConfig():
+    with open('emailConfig.csv', mode='r') as configFile:
+        reader = csv.reader(configFile)
+        return {rows[0]:rows[1] for rows in reader}
+
+def buildEmailForNewData(emailConfig, downloadedFiles, perSKUData, vendorId=None):
+    # the email modules are only loaded when an email is sent
+    from email.mime.text import MIMEText
+    from email.mime.multipart import MIMEMultipart
+    from email.mime.image import MIMEImage
+    
     summary_PlainText = ""
     summary_HTML = """\
 <html>
@@ -390,30 +608,30 @@ def emailReportForNewData(downloadedFiles, perSKUData):
                 summary_PlainText += skuSummary.getEmailSummary_PlainText()
                 summary_HTML += skuSummary.getEmailSummary_HTML()
                 
-                if len(skuSummary.newAllInstallsByCountry) > 0:
+                if len(skuSummary.newAllInstallsByCountry) > 0 and "NewAllInstallsByCountry" in skuSummary.Graphs:
                     attachments.update({skuSummary.SKU + "NewAllInstallsByCountry" : skuSummary.Graphs["NewAllInstallsByCountry"]})
                     summary_HTML += '<br><img src="cid:{SKU}NewAllInstallsByCountry"><br>'.format(SKU=skuSummary.SKU)
     
     for skuSummary in perSKUData.values():
         summary_HTML += skuSummary.getReport_HTML()
             
-        summary_HTML += '<br><img src="cid:{SKU}AllInstallsAndUpdates"><br>'.format(SKU=skuSummary.SKU)
-        attachments.update({skuSummary.SKU + "AllInstallsAndUpdates" : skuSummary.Graphs["AllInstallsAndUpdates"]})
-        summary_HTML += '<br><img src="cid:{SKU}AllInstallsByCountry"><br>'.format(SKU=skuSummary.SKU)
-        attachments.update({skuSummary.SKU + "AllInstallsByCountry" : skuSummary.Graphs["AllInstallsByCountry"]})
+        # charts that have been turned off are left out of the email
+        for graphName in EmailGraphNames:
+            if graphName in skuSummary.Graphs:
+                summary_HTML += '<br><img src="cid:{SKU}{graphName}"><br>'.format(SKU=skuSummary.SKU, graphName=graphName)
+                attachments.update({skuSummary.SKU + graphName : skuSummary.Graphs[graphName]})
     
     summary_HTML += """\
   </body>
 </html>
 """
-    emailConfig = dict()
-    
-    with open('emailConfig.csv', mode='r') as configFile:
-        reader = csv.reader(configFile)
-        emailConfig = {rows[0]:rows[1] for rows in reader}
+    # when several vendors are emailed together the subject says which vendor each email is for
+    emailSubject = emailConfig["Subject"]
+    if vendorId != None:
+        emailSubject = "{subject} ({vendorId})".format(subject=emailSubject, vendorId=vendorId)
     
     emailMessage = MIMEMultipart("related")
-    emailMessage["Subject"] = emailConfig["Subject"]
+    emailMessage["Subject"] = emailSubject
     emailMessage["From"] = emailConfig["From"]
     emailMessage["To"] = emailConfig["To"]
     
@@ -434,49 +652,230 @@ def emailReportForNewData(downloadedFiles, perSKUData):
         attachmentImage.add_header("Content-Disposition", "inline", filename=attachmentName+".png")
         emailMessage.attach(attachmentImage)
     
+    return emailMessage
+
+def sendEmailsForNewData(emailConfig, emailsForNewData):
+    import smtplib
+    
+    # every email goes out over the one connection
+    numEmailsSent = 0
+    
     try:
         s = smtplib.SMTP(emailConfig["Server"], int(emailConfig["Port"]), timeout=30)
         s.ehlo()
         if emailConfig["EnableTLS"] == "1":
             s.starttls()  
         s.login(emailConfig["Username"], emailConfig["Password"])  
-        s.sendmail(emailMessage["From"], [emailMessage["To"]], emailMessage.as_string())
+        
+        for [emailMessage, downloadedFiles] in emailsForNewData:
+            s.sendmail(emailMessage["From"], [emailMessage["To"]], emailMessage.as_string())
+            numEmailsSent += 1
     except (smtplib.SMTPServerDisconnected):
         print "Connection unexpectedly closed: [Errno 54] Connection reset by peer"
         
         # we delete the downloaded files on failure to send email so that it will retry
-        for downloadedFile in downloadedFiles:
-            os.remove(downloadedFile)
+        for [emailMessage, downloadedFiles] in emailsForNewData[numEmailsSent:]:
+            for downloadedFile in downloadedFiles:
+                os.remove(downloadedFile)
         
-        sys.exit(-1)
+        return False
     else:
         s.quit()
     
+    return True
+
+def writeHealthFile(healthFilePath, healthFields):
+    workingPath = healthFilePath + ".tmp"
+    
+    with open(workingPath, mode='wb') as healthFile:
+        csv.writer(healthFile).writerows(healthFields)
+    
+    # swap the new file in so a health check never reads a partially written one
+    os.rename(workingPath, healthFilePath)
+
+def loadVendorConfig(vendorsFile):
+    vendors = []
+    
+    with open(vendorsFile, mode='r') as configFile:
+        for row in csv.reader(configFile):
+            row = [field.strip() for field in row]
+            
+            # blank lines and comments are skipped
+            if len(row) < 2 or row[0].startswith("#"):
+                continue
+            
+            # the output directory defaults to the vendor id
+            if len(row) < 3 or len(row[2]) == 0:
+                vendors.append([row[0], row[1], row[0]])
+            else:
+                vendors.append([row[0], row[1], row[2]])
+    
+    return vendors
+
+def parseQueryDate(dateString):
+    return datetime.datetime.strptime(dateString, "%Y-%m-%d").date()
+
+def printQueryTable(tableRows):
+    columnWidths = [max([len(tableRow[columnIndex]) for tableRow in tableRows]) for columnIndex in range(0, len(tableRows[0]))]
+    
+    # the header is left aligned and the values are right aligned
+    for rowIndex in range(0, len(tableRows)):
+        if rowIndex == 0:
+            print "  ".join([cell.ljust(columnWidth) for [cell, columnWidth] in zip(tableRows[rowIndex], columnWidths)])
+            print "  ".join(["-" * columnWidth for columnWidth in columnWidths])
+        else:
+            print "  ".join([cell.rjust(columnWidth) for [cell, columnWidth] in zip(tableRows[rowIndex], columnWidths)])
+
+def queryReports(argv):
+    # sqlite is only loaded for the report database
+    from ReportDatabase import ReportDatabase
+    
+    vendorId = ""
+    filters = dict()
+    startDate = None
+    endDate = None
+    groupNames = []
+    outputCSV = False
+    
+    queryFilterNames = [queryName for [queryName, fieldName] in ReportDatabase.QueryFilters]
+    queryGroupNames = [queryName for [queryName, groupExpression] in ReportDatabase.QueryGroups]
+    
+    try:
+        opts, args = getopt.getopt(argv, "hv:", ["help", "vendorId=", "from=", "to=", "groupBy=", "csv"] + [queryName + "=" for queryName in queryFilterNames])
+    except getopt.GetoptError, exc:
+        print exc.msg
+        
+        queryUsage()
+        sys.exit(2)
+    
+    try:
+        for opt, arg in opts:
+            if opt in ("-h", "--help"):
+                queryUsage()
+                sys.exit()
+            elif opt in ("-v", "--vendorId"):
+                vendorId = arg
+            elif opt in ("--from",):
+                startDate = parseQueryDate(arg)
+            elif opt in ("--to",):
+                endDate = parseQueryDate(arg)
+            elif opt in ("--groupBy",):
+                groupNames = arg.strip().split(',')
+            elif opt in ("--csv",):
+                outputCSV = True
+            elif opt[2:] in queryFilterNames:
+                filters.update({opt[2:] : arg.strip().split(',')})
+    except ValueError, exc:
+        print "Dates must be given as YYYY-MM-DD ({error})".format(error=exc)
+        sys.exit(2)
+    
+    unknownGroupNames = [groupName for groupName in groupNames if groupName not in queryGroupNames]
+    if len(vendorId) == 0 or len(unknownGroupNames) > 0:
+        if len(unknownGroupNames) > 0:
+            print "Unknown grouping: {groupNames}".format(groupNames=", ".join(unknownGroupNames))
+        
+        queryUsage()
+        sys.exit(2)
+    
+    basePath = "{vendorId}".format(vendorId=vendorId)
+    
+    if not os.path.exists(os.path.join(basePath, ReportDatabase.FileName)):
+        print "No report database found for vendor {vendorId}. Run harvestReports with --database to build it first".format(vendorId=vendorId)
+        sys.exit(2)
+    
+    fieldRemapper = FieldRemapper()
+    
+    # the database holds the remapped values so codes given on the command line are remapped the same way
+    for [queryName, mapping] in [["country", fieldRemapper.CountryFromCode], ["productType", fieldRemapper.ProductTypeFromCode], ["promoCode", fieldRemapper.PromoTypeFromCode]]:
+        if queryName in filters:
+            filters[queryName] = [mapping.get(filterValue, filterValue) for filterValue in filters[queryName]]
+    
+    reportDatabase = ReportDatabase(basePath, fieldRemapper)
+    summaryRows = reportDatabase.querySummary(filters, startDate, endDate, groupNames)
+    reportDatabase.close()
+    
+    if len(summaryRows) == 0:
+        print "No report lines match the query"
+        return
+    
+    # the proceeds get a column for each currency that appears in the results
+    currencyCodes = sorted(set([currencyCode for summaryRow in summaryRows for currencyCode in summaryRow[2].keys()]))
+    
+    tableRows = [groupNames + [totalName for [totalName, totalExpression] in ReportDatabase.QueryTotals] + ["Proceeds ({currency})".format(currency=currencyCode) for currencyCode in currencyCodes]]
+    for [groupValues, groupTotals, proceedsByCurrency] in summaryRows:
+        tableRow = ["" if groupValue == None else unicode(groupValue).encode("utf-8") for groupValue in groupValues]
+        tableRow += [str(groupTotal) for groupTotal in groupTotals]
+        tableRow += ["{proceeds:.2f}".format(proceeds=proceedsByCurrency.get(currencyCode, 0)) for currencyCode in currencyCodes]
+        tableRows.append(tableRow)
+    
+    if outputCSV:
+        csv.writer(sys.stdout).writerows(tableRows)
+    else:
+        printQueryTable(tableRows)
+
+def queryUsage():
+    print "Usage:"
+    print "      harvestReports query -v <Vendor Id> [--from <YYYY-MM-DD>] [--to <YYYY-MM-DD>] [--sku SKU1,SKU2] [--country Code1,Code2] [--version Version1,Version2] [--productType Type1,Type2] [--promoCode Code1,Code2] [--groupBy Field1,Field2] [--csv]"
+    print ""
+    print "          Vendor Id        Your vendor Id (the report database must have been built with --database)"
+    print "          --from/--to      Only counts the report lines that begin within these dates (inclusive)"
+    print "          --sku etc        Only counts the report lines that match one of the listed values"
+    print "          --groupBy        Totals the report lines by sku, title, date, month, year, country, version, productType or promoCode"
+    print "          --csv            Writes the results as CSV instead of a table"
+
 def usage():
     print "Usage:"
-    print "      harvestReports -p <Properties File> -v <Vendor Id> [-d <Days Back>] [-rd|-rv] [-e] [-s] [-f AppId1,AppId2] [-c CountryCode1,CountryCode2]"
+    print "      harvestReports -p <Properties File> -v <Vendor Id> | --vendors <Vendors File> [-d <Days Back>] [-j <Workers>] [-rd|-rv] [-e] [-s] [-g] [-f AppId1,AppId2] [-c CountryCode1,CountryCode2] [--feedWorkers <Feed Workers>] [--feedTimeout <Seconds>] [--parseWorkers <Parse Workers>] [--graphWorkers <Graph Workers>] [--compact] [--database] [--weeks <Weeks Back>] [--months <Months Back>] [--years <Years Back>] [--window <Window Days>] [--daemon [--pollMinutes <Minutes>] [--maxPollMinutes <Minutes>] [--health <Health File>]]"
     print ""
-    print "          Properties File  Path to the .properties file with the username/password for iTunes Connect"
-    print "          Vendor Id        Your vendor Id"
+    print "          Properties File  Path to the .properties file with the username/password for iTunes Connect (or a list with one for each vendor id)"
+    print "          Vendor Id        Your vendor Id (or a list of vendor ids, the reports for each go into a folder named after it)"
+    print "          Vendors File     CSV file with a line of vendor id,properties file[,output folder] for each vendor"
     print "          Days Back        Number of days worth of data back (from now) to retrieve"
+    print "          Workers          Number of reports to download at once (defaults to 1)"
     print "          -o               Overwrites any existing reports"
     print "          -rd              Shows detailed summary report"
     print "          -rv              Shows verbose output"
     print "          -e               Sends an email if there is new data"
     print "          -s               Saves HTML report"
+    print "          -g               Saves the charts for every SKU (chart types can be turned off in graphConfig.csv)"
     print "          -f               Downloads the ratings and reviews RSS feed for the specified app ids"
     print "          -c               List of country codes to download the rating and review data for"
+    print "          Feed Workers     Number of ratings and reviews feeds to download at once (defaults to 8)"
+    print "          Seconds          Time allowed for each ratings and reviews feed before it is treated as failed (defaults to 120)"
+    print "          Parse Workers    Number of processes used to parse new report files (defaults to 1)"
+    print "          Graph Workers    Number of processes used to draw the charts (defaults to 1)"
+    print "          --compact        Moves the daily reports for finished months into one archive per month"
+    print "          --database       Stores every report line in an SQLite database (Reports.sqlite in the vendor folder)"
+    print "          Weeks Back       Number of finished weeks worth of weekly reports to retrieve (defaults to 0)"
+    print "          Months Back      Number of finished months worth of monthly reports to retrieve (defaults to 0)"
+    print "          Years Back       Number of finished years worth of yearly reports to retrieve (defaults to 0)"
+    print "          Window Days      Number of days up to today shown on the units and proceeds charts (at least 1, defaults to 30)"
+    print "          --daemon         Keeps running, polling for the next missing daily report and only reporting when one arrives"
+    print "          Minutes          Minutes between polls, backing off to the maximum while nothing arrives (defaults to 15 and 120)"
+    print "          Health File      File the daemon writes its status and poll times to after each poll (defaults to harvestReports.health)"
+    print ""
+    print "      harvestReports query -h      Shows the options for querying the report database"
 
 def main(argv):
+    # the query command only reads the report database and writes nothing but the results
+    if len(argv) > 0 and argv[0] == "query":
+        queryReports(argv[1:])
+        return
+    
     print "Harvest Reports v0.1.5"
     print "Written by Iain McManus"
     print ""
     print "Copyright (c) 2014-2015 Iain McManus. All rights reserved"
     print ""
     
-    propertiesFile = ""
-    vendorId = ""
+    propertiesFiles = []
+    vendorIds = []
+    vendorsFile = ""
     daysBack = 1
+    weeksBack = 0
+    monthsBack = 0
+    yearsBack = 0
+    numDownloadWorkers = 1
     overwriteExistingData = False
     verbose = False
     reportType = ReportTypes.BasicSummary
@@ -485,11 +884,23 @@ def main(argv):
     downloadRatingsAndReviewsFeed = False
     appIds = []
     countryCodes = []
+    numFeedWorkers = 8
+    feedTimeout = 120
+    numParseWorkers = 1
+    numGraphWorkers = 1
+    exportGraphs = False
+    compactReports = False
+    useReportDatabase = False
+    graphWindow = GraphConfig.DefaultWindowDays
+    runAsDaemon = False
+    pollMinutes = DefaultPollMinutes
+    maxPollMinutes = DefaultMaxPollMinutes
+    healthFilePath = DefaultHealthFile
     
     essentialArgumentsFoundCount = 0
     
     try:
-        opts, args = getopt.getopt(argv, "hp:v:d:r:oesf:-c:", ["help", "properties=", "vendorId=", "daysBack=", "report=", "overwrite", "email", "saveHMTL", "feed:", "countries:"])
+        opts, args = getopt.getopt(argv, "hp:v:d:j:r:oesgf:-c:", ["help", "properties=", "vendorId=", "vendors=", "daysBack=", "workers=", "report=", "overwrite", "email", "saveHMTL", "graphs", "feed:", "countries:", "feedWorkers=", "feedTimeout=", "parseWorkers=", "graphWorkers=", "compact", "database", "weeks=", "months=", "years=", "window=", "daemon", "pollMinutes=", "maxPollMinutes=", "health="])
     except getopt.GetoptError, exc:
         print exc.msg
         
@@ -501,13 +912,18 @@ def main(argv):
             usage()
             sys.exit()
         elif opt in ("-p"):
-            propertiesFile = arg
+            propertiesFiles = arg.strip().split(',')
             essentialArgumentsFoundCount += 1
         elif opt in ("-v"):
-            vendorId = arg
+            vendorIds = arg.strip().split(',')
             essentialArgumentsFoundCount += 1
+        elif opt in ("--vendors",):
+            vendorsFile = arg
+            essentialArgumentsFoundCount += 2
         elif opt in ("-d"):
             daysBack = int(arg)
+        elif opt in ("-j", "--workers"):
+            numDownloadWorkers = int(arg)
         elif opt in ("-r"):
             if arg in ("d"):
                 reportType = ReportTypes.DetailedSummary
@@ -524,61 +940,333 @@ def main(argv):
             appIds = arg.strip().split(',')
         elif opt in ("-c:"):
             countryCodes = arg.strip().split(',')
+        elif opt in ("--feedWorkers",):
+            numFeedWorkers = int(arg)
+        elif opt in ("--feedTimeout",):
+            feedTimeout = float(arg)
+        elif opt in ("--parseWorkers",):
+            numParseWorkers = int(arg)
+        elif opt in ("--graphWorkers",):
+            numGraphWorkers = int(arg)
+        elif opt in ("-g", "--graphs"):
+            exportGraphs = True
+        elif opt in ("--compact",):
+            compactReports = True
+        elif opt in ("--database",):
+            useReportDatabase = True
+        elif opt in ("--weeks",):
+            weeksBack = int(arg)
+        elif opt in ("--months",):
+            monthsBack = int(arg)
+        elif opt in ("--years",):
+            yearsBack = int(arg)
+        elif opt in ("--window",):
+            graphWindow = int(arg)
+            
+            # the graphs need at least one day to plot
+            if graphWindow < 1:
+                print "The window must be at least one day"
+                
+                usage()
+                sys.exit(2)
+        elif opt in ("--daemon",):
+            runAsDaemon = True
+        elif opt in ("--pollMinutes",):
+            pollMinutes = float(arg)
+        elif opt in ("--maxPollMinutes",):
+            maxPollMinutes = float(arg)
+        elif opt in ("--health",):
+            healthFilePath = arg
             
     if essentialArgumentsFoundCount < 2:
         usage()
         sys.exit(2)
-
-    basePath = "{vendorId}".format(vendorId=vendorId)
-
-    if not os.path.exists(basePath):
-        os.makedirs(basePath)
     
+    # each vendor is [vendor id, properties file, output directory]
+    if vendorsFile != "":
+        vendors = loadVendorConfig(vendorsFile)
+    elif len(propertiesFiles) == 1 or len(propertiesFiles) == len(vendorIds):
+        # a single properties file is used for all of the vendors
+        if len(propertiesFiles) == 1:
+            propertiesFiles = propertiesFiles * len(vendorIds)
+        
+        vendors = [[vendorId, propertiesFile, vendorId] for [vendorId, propertiesFile] in zip(vendorIds, propertiesFiles)]
+    else:
+        print "Either one properties file or one for each vendor id must be provided"
+        
+        usage()
+        sys.exit(2)
+    
+    if len(vendors) == 0:
+        usage()
+        sys.exit(2)
+    
+    # everything that does not belong to a single vendor is set up once and shared between them
     fieldRemapper = FieldRemapper()
-
-    # download the report data
-    [addedPlaceHolderFileForEventlessDay, downloadedFiles] = downloadDailies(propertiesFile, vendorId, daysBack, overwriteExistingData, basePath, verbose)
+    graphConfig = GraphConfig(graphWindow)
+    autoingestionClient = AutoingestionClient()
+    downloadWorkerPool = ThreadPool(max(1, numDownloadWorkers))
+    
+    # the report parsing forks worker processes so only one vendor parses at a time
+    processingLock = threading.Lock()
     
-    # parse all the report data and build the per SKU analyses
-    perSKUData = processDailiesIn(basePath, downloadedFiles, reportType, fieldRemapper)
+    periodsBack = {ReportPeriods.Daily : daysBack, ReportPeriods.Weekly : weeksBack, ReportPeriods.Monthly : monthsBack, ReportPeriods.Yearly : yearsBack}
     
-    # summary email can only send if there was new data or a new placeholder was added
-    hasDataForSummaryEmail = (addedPlaceHolderFileForEventlessDay or (len(downloadedFiles) > 0))
+    # the cubes are kept between the runs of the daemon so that only the new reports need to be added
+    reportCubes = dict()
     
-    # download the RSS feed if enabled and we downloaded new data for the day
-    ratingsAndReviewsFeed = None
-    if downloadRatingsAndReviewsFeed and hasDataForSummaryEmail:
-        [newRatingsAndReviews, ratingsAndReviewsFeed] = downloadRSSFeed(basePath, appIds, countryCodes)
+    def harvestVendor(vendorId, propertiesFile, basePath, requestedDays):
+        if not os.path.exists(basePath):
+            os.makedirs(basePath)
         
-        # merge the ratings data in
-        for skuData in perSKUData.values():
-            # no ratings data present
-            if skuData.AppId not in ratingsAndReviewsFeed:
+        # download the report data
+        [addedPlaceHolderFileForEventlessDay, downloadedFiles] = downloadReports(propertiesFile, vendorId, periodsBack, overwriteExistingData, basePath, verbose, numDownloadWorkers, autoingestionClient, downloadWorkerPool, requestedDays)
+        
+        # summary email can only send if there was new data or a new placeholder was added
+        hasDataForSummaryEmail = (addedPlaceHolderFileForEventlessDay or (len(downloadedFiles) > 0))
+        
+        # a poll that brought nothing new leaves everything as it was
+        if requestedDays != None and not hasDataForSummaryEmail:
+            return [hasDataForSummaryEmail, downloadedFiles, None]
+        
+        if vendorId not in reportCubes:
+            reportCubes[vendorId] = ReportCube(basePath, fieldRemapper)
+        
+        with processingLock:
+            # fold the dailies for finished months into the monthly archives
+            if compactReports:
+                [numArchivedFiles, numArchives] = ReportArchive(basePath).compact(datetime.date.today())
+                
+                print "Compacted {numFiles} daily reports into {numArchives} monthly archives".format(numFiles=numArchivedFiles, numArchives=numArchives)
+            
+            # parse all the report data and build the per SKU analyses
+            reportDatabase = None
+            if useReportDatabase:
+                # sqlite is only loaded for the report database
+                from ReportDatabase import ReportDatabase
+                
+                reportDatabase = ReportDatabase(basePath, fieldRemapper)
+            
+            perSKUData = processDailiesIn(basePath, downloadedFiles, reportType, fieldRemapper, numParseWorkers, graphConfig, reportDatabase, reportCubes[vendorId])
+            
+            if reportDatabase != None:
+                reportDatabase.close()
+        
+        # download the RSS feed if enabled and we downloaded new data for the day
+        ratingsAndReviewsFeed = None
+        if downloadRatingsAndReviewsFeed and hasDataForSummaryEmail:
+            [newRatingsAndReviews, ratingsAndReviewsFeed] = downloadRSSFeed(basePath, appIds, countryCodes, numFeedWorkers, feedTimeout)
+            
+            # merge the ratings data in
+            for skuData in perSKUData.values():
+                # no ratings data present
+                if skuData.AppId not in ratingsAndReviewsFeed:
+                    continue
+                
+                reviewDataForSKU = ratingsAndReviewsFeed[skuData.AppId]
+            
+                skuData.lifetimeAverageRating = reviewDataForSKU[RatingsSummaryFields.LifetimeAverageRating]
+                skuData.lifetimeRatingSamples = reviewDataForSKU[RatingsSummaryFields.LifetimeRatingSamples]
+                skuData.numberOfNewRatings = reviewDataForSKU[RatingsSummaryFields.NumberOfNewRatings]
+            
+                perVersionAverage = reviewDataForSKU[RatingsSummaryFields.AverageRatingPerVersion]
+                perVersionAverageSamples = reviewDataForSKU[RatingsSummaryFields.NumberOfRatingsPerVersion]
+            
+                for version in perVersionAverage.keys():
+                    skuData.averageRatingPerVersion[version] = perVersionAverage[version]
+                    skuData.numberOfRatingsPerVersion[version] = perVersionAverageSamples[version]
+        
+        # print out the report
+        for skuSummary in perSKUData.values():
+            skuSummary.printSummary(reportType)
+            
+        if saveHTMLReport:
+            generateHTMLReport(basePath, perSKUData)
+        
+        return [hasDataForSummaryEmail, downloadedFiles, perSKUData]
+    
+    vendorPool = ThreadPool(len(vendors))
+    
+    def harvestVendors(vendorRequests):
+        # with several vendors each one's output is held back and printed as a block so that they do not interleave
+        threadedOutput = None
+        if len(vendorRequests) > 1:
+            threadedOutput = ThreadedOutput(sys.stdout)
+            sys.stdout = threadedOutput
+        
+        def runVendor(vendorRequest):
+            [[vendorId, propertiesFile, basePath], requestedDays] = vendorRequest
+            
+            if threadedOutput != None:
+                threadedOutput.capture()
+            
+            # a vendor that fails is reported and left out without stopping the others
+            try:
+                vendorResults = harvestVendor(vendorId, propertiesFile, basePath, requestedDays)
+            except Exception:
+                print "Failed to harvest the reports for vendor {vendorId}".format(vendorId=vendorId)
+                traceback.print_exc(file=sys.stdout)
+                
+                # the cube may have been left part way through an update
+                reportCubes.pop(vendorId, None)
+                
+                vendorResults = None
+            
+            if threadedOutput != None:
+                return [vendorResults, threadedOutput.release()]
+            
+            return [vendorResults, ""]
+        
+        perVendorResults = []
+        
+        try:
+            for [vendorRequest, [vendorResults, vendorOutput]] in zip(vendorRequests, vendorPool.imap(runVendor, vendorRequests)):
+                vendorId = vendorRequest[0][0]
+                
+                if threadedOutput != None:
+                    print "Vendor {vendorId}".format(vendorId=vendorId)
+                    print ""
+                    sys.stdout.write(vendorOutput)
+                    print ""
+                
+                perVendorResults.append([vendorId, vendorResults])
+        finally:
+            if threadedOutput != None:
+                sys.stdout = threadedOutput.output
+        
+        # the charts for all of the vendors are drawn together so they can be spread across the workers
+        allSKUData = dict()
+        emailSKUData = dict()
+        vendorsForSummaryEmail = []
+        failedVendorIds = []
+        for [vendorId, vendorResults] in perVendorResults:
+            if vendorResults == None:
+                failedVendorIds.append(vendorId)
                 continue
             
-            reviewDataForSKU = ratingsAndReviewsFeed[skuData.AppId]
+            [hasDataForSummaryEmail, downloadedFiles, perSKUData] = vendorResults
+            
+            if perSKUData == None:
+                continue
+            
+            for [skuName, skuSummary] in perSKUData.items():
+                allSKUData[(vendorId, skuName)] = skuSummary
+                
+                if hasDataForSummaryEmail:
+                    emailSKUData[(vendorId, skuName)] = skuSummary
+            
+            if hasDataForSummaryEmail:
+                vendorsForSummaryEmail.append([vendorId, downloadedFiles, perSKUData])
         
-            skuData.lifetimeAverageRating = reviewDataForSKU[RatingsSummaryFields.LifetimeAverageRating]
-            skuData.lifetimeRatingSamples = reviewDataForSKU[RatingsSummaryFields.LifetimeRatingSamples]
-            skuData.numberOfNewRatings = reviewDataForSKU[RatingsSummaryFields.NumberOfNewRatings]
+        # charts are otherwise only drawn when the email asks for them
+        if exportGraphs:
+            renderGraphs(allSKUData, numGraphWorkers)
         
-            perVersionAverage = reviewDataForSKU[RatingsSummaryFields.AverageRatingPerVersion]
-            perVersionAverageSamples = reviewDataForSKU[RatingsSummaryFields.NumberOfRatingsPerVersion]
+        # sales report email will only send if we have a new report downloaded (or a placeholder added due to an eventless day)
+        emailSent = True
+        if sendEmail and len(vendorsForSummaryEmail) > 0:
+            renderGraphs(emailSKUData, numGraphWorkers, ["NewAllInstallsByCountry"] + EmailGraphNames)
+            
+            emailConfig = loadEmailConfig()
+            
+            emailsForNewData = []
+            for [vendorId, downloadedFiles, perSKUData] in vendorsForSummaryEmail:
+                emailVendorId = vendorId if len(vendors) > 1 else None
+                emailsForNewData.append([buildEmailForNewData(emailConfig, downloadedFiles, perSKUData, emailVendorId), downloadedFiles])
+            
+            emailSent = sendEmailsForNewData(emailConfig, emailsForNewData)
         
-            for version in perVersionAverage.keys():
-                skuData.averageRatingPerVersion[version] = perVersionAverage[version]
-                skuData.numberOfRatingsPerVersion[version] = perVersionAverageSamples[version]
+        return [failedVendorIds, len(vendorsForSummaryEmail), emailSent]
     
-    # print out the report
-    for skuSummary in perSKUData.values():
-        skuSummary.printSummary(reportType)
+    try:
+        if not runAsDaemon:
+            [failedVendorIds, numVendorsWithNewData, emailSent] = harvestVendors([[vendor, None] for vendor in vendors])
+            
+            if not emailSent:
+                sys.exit(-1)
+            
+            if len(failedVendorIds) > 0:
+                sys.exit(1)
+            
+            return
         
-    if saveHTMLReport:
-        generateHTMLReport(basePath, perSKUData)
-
-    # sales report email will only send if we have a new report downloaded (or a placeholder added due to an eventless day)
-    if hasDataForSummaryEmail and sendEmail:
-        emailReportForNewData(downloadedFiles, perSKUData)
+        # the daemon starts each day with a full harvest and then polls for the next missing day of each vendor until it lands
+        startedTime = datetime.datetime.now()
+        lastHarvestDate = None
+        lastNewDataTime = None
+        pollSeconds = pollMinutes * 60
+        
+        while True:
+            today = datetime.date.today()
+            
+            isFullHarvest = today != lastHarvestDate
+            if isFullHarvest:
+                vendorRequests = [[vendor, None] for vendor in vendors]
+                
+                lastHarvestDate = today
+            else:
+                # a day's report is published after the day is over, so the poll covers the days back before today
+                pollDays = getRequestedPeriods(ReportPeriods.Daily, today - datetime.timedelta(days=1), max(1, daysBack))
+                
+                # the reports are published in date order so only the oldest missing day is asked for
+                vendorRequests = []
+                for vendor in vendors:
+                    missingDays = getMissingDays(vendor[0], vendor[2], pollDays)
+                    
+                    if len(missingDays) > 0:
+                        vendorRequests.append([vendor, missingDays[-1:]])
+            
+            pollTime = datetime.datetime.now()
+            healthStatus = "OK"
+            failedVendorIds = []
+            numVendorsWithNewData = 0
+            
+            # the daemon keeps running whatever goes wrong in a poll, the health file shows that it happened
+            try:
+                if len(vendorRequests) > 0:
+                    [failedVendorIds, numVendorsWithNewData, emailSent] = harvestVendors(vendorRequests)
+                    
+                    if len(failedVendorIds) > 0:
+                        healthStatus = "VendorFailed"
+                    elif not emailSent:
+                        healthStatus = "EmailFailed"
+            except Exception:
+                traceback.print_exc(file=sys.stdout)
+                
+                healthStatus = "Error"
+            
+            if numVendorsWithNewData > 0:
+                lastNewDataTime = pollTime
+            
+            # polls that find nothing back off until the next report lands or the next day starts
+            if isFullHarvest or numVendorsWithNewData > 0:
+                pollSeconds = pollMinutes * 60
+            else:
+                pollSeconds = min(pollSeconds * 2, maxPollMinutes * 60)
+            
+            nextPollTime = datetime.datetime.now() + datetime.timedelta(seconds=pollSeconds)
+            
+            writeHealthFile(healthFilePath, [["Status", healthStatus],
+                                             ["PID", os.getpid()],
+                                             ["Started", startedTime.isoformat()],
+                                             ["LastPoll", pollTime.isoformat()],
+                                             ["LastNewData", lastNewDataTime.isoformat() if lastNewDataTime != None else ""],
+                                             ["NextPoll", nextPollTime.isoformat()],
+                                             ["FailedVendors", ",".join(failedVendorIds)]])
+            
+            sys.stdout.flush()
+            time.sleep(pollSeconds)
+    except KeyboardInterrupt:
+        if not runAsDaemon:
+            raise
+        
+        writeHealthFile(healthFilePath, [["Status", "Stopped"], ["PID", os.getpid()]])
+    finally:
+        vendorPool.close()
+        vendorPool.join()
+        
+        downloadWorkerPool.close()
+        downloadWorkerPool.join()
 
 if __name__ == '__main__':
     main(sys.argv[1:])
@@ -0,0 +1,156 @@
+#!/usr/bin/python
+
+# Harvest Reports v0.1.5
+# Copyright (c) 2014-2015 Iain McManus. All rights reserved.
+#
+# Harvest Reports is a wrapper around Apple's AutoIngestion Java Class.
+# Harvest Reports can download all of the recent daily data and will produce
+# a summary of the sales, updates and a breakdown of region where sales have occurred.
+#
+# Information is also generated per version, including a calculation of the number of users
+# on the latest version.
+#
+# Harvest Reports can be run on a regular schedule and be configured to send an email
+# with the daily summary when the daily report is out. If no sales/updates have occurred
+# it can indicate that as well.
+
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in
+# all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN
+# THE SOFTWARE.
+import datetime
+import getopt
+import hashlib
+import os
+import random
+import shutil
+import sys
+import tempfile
+import time
+
+HarvestReportsPath = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "HarvestReports")
+
+DefaultNumLines = 100000
+DefaultNumRepeats = 3
+DefaultSeed = 8
+
+ReportHeader = ["Provider", "Provider Country", "SKU", "Developer", "Title", "Version", "Product Type Identifier", "Units", "Developer Proceeds", "Begin Date", "End Date",
+                "Customer Currency", "Country Code", "Currency of Proceeds", "Apple Identifier", "Customer Price", "Promo Code", "Parent Identifier", "Subscription",
+                "Period", "Category", "CMB", "Device", "Supported Platforms"]
+
+def generateReport(reportPath, numLines, seed):
+    # a daily report in Apple's column order with a spread of products, countries, versions, refunds and promo codes
+    randomGenerator = random.Random(seed)
+    
+    products = [["SKU_A", "App A", "111"], ["SKU_B", "App B", "222"], ["SKU_C", "Game C", "333"]]
+    countries = [["US", "USD", 0.99, 0.70], ["GB", "GBP", 0.79, 0.55], ["AU", "AUD", 1.49, 0.99], ["DE", "EUR", 0.89, 0.60], ["JP", "JPY", 120, 84]]
+    versions = ["1.0", "1.1", "1.2", "2.0"]
+    productTypes = ["1", "1", "7", "7", "IA1", "1F"]
+    reportDate = datetime.date(2015, 1, 31).strftime("%m/%d/%Y")
+    
+    reportLines = ["\t".join(ReportHeader)]
+    for lineIndex in range(0, numLines):
+        [sku, title, appleIdentifier] = randomGenerator.choice(products)
+        [countryCode, currency, customerPrice, proceeds] = randomGenerator.choice(countries)
+        version = randomGenerator.choice(versions)
+        productType = randomGenerator.choice(productTypes)
+        
+        isPaid = randomGenerator.random() < 0.5 and productType != "7"
+        units = randomGenerator.randint(1, 9)
+        if isPaid and randomGenerator.random() < 0.05:
+            units = -1
+        promoCode = randomGenerator.choice(["", "", "", "CR-RW"])
+        
+        if not isPaid:
+            [customerPrice, proceeds] = [0, 0]
+        
+        reportLines.append("\t".join(["APPLE", "US", sku, "Developer", title, version, productType, str(units), "{0:.2f}".format(proceeds), reportDate, reportDate,
+                                      currency, countryCode, currency, appleIdentifier, "{0:.2f}".format(customerPrice), promoCode, "", "", "", "Games", "", "iPhone", "ios"]))
+    
+    with open(reportPath, 'wt') as reportFile:
+        reportFile.write("\n".join(reportLines) + "\n")
+
+def timeReportParsing(sourcePath, reportPath, numRepeats):
+    # the field mappings are read from the working directory
+    sys.path.insert(0, sourcePath)
+    os.chdir(sourcePath)
+    
+    from Common import FieldRemapper
+    from SalesReportFile import SalesReportFile
+    
+    fieldRemapper = FieldRemapper()
+    
+    bestSeconds = None
+    for repeat in range(0, numRepeats):
+        startTime = time.time()
+        salesReportFile = SalesReportFile(reportPath, False, fieldRemapper)
+        elapsedSeconds = time.time() - startTime
+        
+        if bestSeconds == None or elapsedSeconds < bestSeconds:
+            bestSeconds = elapsedSeconds
+    
+    # the digest of the parsed lines shows whether two versions of the parser agree
+    reportLines = [sorted(reportLine.items()) for reportLine in salesReportFile.data]
+    
+    return [bestSeconds, len(reportLines), hashlib.md5(repr(reportLines)).hexdigest()]
+
+def usage():
+    print "Usage:"
+    print "      benchReportParsing [-l <Lines>] [-n <Repeats>] [-s <Source Folder>]"
+    print ""
+    print "          Lines            Number of lines in the generated daily report (defaults to {numLines})".format(numLines=DefaultNumLines)
+    print "          Repeats          Number of times the report is parsed, the best time is shown (defaults to {numRepeats})".format(numRepeats=DefaultNumRepeats)
+    print "          Source Folder    HarvestReports folder to take SalesReportFile from, eg. from an older checkout (defaults to this one)"
+
+def main(argv):
+    numLines = DefaultNumLines
+    numRepeats = DefaultNumRepeats
+    sourcePath = HarvestReportsPath
+    
+    try:
+        opts, args = getopt.getopt(argv, "hl:n:s:", ["help", "lines=", "repeats=", "source="])
+    except getopt.GetoptError, exc:
+        print exc.msg
+        
+        usage()
+        sys.exit(2)
+    
+    for opt, arg in opts:
+        if opt in ("-h", "--help"):
+            usage()
+            sys.exit()
+        elif opt in ("-l", "--lines"):
+            numLines = int(arg)
+        elif opt in ("-n", "--repeats"):
+            numRepeats = int(arg)
+        elif opt in ("-s", "--source"):
+            sourcePath = os.path.abspath(arg)
+    
+    workingPath = tempfile.mkdtemp()
+    
+    try:
+        reportPath = os.path.join(workingPath, "S_D_12345_20150131.txt")
+        generateReport(reportPath, numLines, DefaultSeed)
+        
+        [bestSeconds, numParsedLines, parsedLinesDigest] = timeReportParsing(sourcePath, reportPath, numRepeats)
+    finally:
+        shutil.rmtree(workingPath)
+    
+    print "Parsed {numLines} lines in {seconds:.3f}s (best of {numRepeats})".format(numLines=numParsedLines, seconds=bestSeconds, numRepeats=numRepeats)
+    print "Parsed lines digest {digest}".format(digest=parsedLinesDigest)
+
+if __name__ == '__main__':
+    main(sys.argv[1:])
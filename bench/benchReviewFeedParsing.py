@@ -0,0 +1,251 @@
+#!/usr/bin/python
+
+# Harvest Reports v0.1.5
+# Copyright (c) 2014-2015 Iain McManus. All rights reserved.
+#
+# Harvest Reports is a wrapper around Apple's AutoIngestion Java Class.
+# Harvest Reports can download all of the recent daily data and will produce
+# a summary of the sales, updates and a breakdown of region where sales have occurred.
+#
+# Information is also generated per version, including a calculation of the number of users
+# on the latest version.
+#
+# Harvest Reports can be run on a regular schedule and be configured to send an email
+# with the daily summary when the daily report is out. If no sales/updates have occurred
+# it can indicate that as well.
+
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in
+# all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN
+# THE SOFTWARE.
+import getopt
+import hashlib
+import json
+import os
+import random
+import resource
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+
+HarvestReportsPath = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "HarvestReports")
+sys.path.insert(0, HarvestReportsPath)
+
+from Common import RSSFields
+
+DefaultFeedSizes = [50, 500, 5000]
+DefaultKnownFraction = 0.9
+DefaultSeed = 23
+
+FeedURL = "https://itunes.apple.com/us/rss/customerreviews/id=1/sortBy=mostRecent/xml"
+ReviewWords = [u"great", u"app", u"caf\xe9", u"na\xefve", u"\xfcber", u"crash", u"update", u"love", u"&", u"<b>", u"\u65e5\u672c"]
+
+def escapeText(text):
+    return text.replace(u"&", u"&amp;").replace(u"<", u"&lt;").replace(u">", u"&gt;")
+
+def generateFeed(feedPath, numReviews, seed):
+    # a customer reviews page with entities, markup in the text and non-ASCII text, much larger than Apple ever serves
+    randomGenerator = random.Random(seed)
+    
+    # written as it is generated, the measuring processes start from this process's peak memory
+    with open(feedPath, 'wb') as feedFile:
+        feedLines = [u'<?xml version="1.0" encoding="utf-8"?>',
+                     u'<feed xmlns:im="http://itunes.apple.com/rss" xmlns="http://www.w3.org/2005/Atom" xml:lang="en">',
+                     u'<id>{feedURL}</id><title>iTunes Store: Customer Reviews</title>'.format(feedURL=FeedURL),
+                     u'<link rel="last" href="https://itunes.apple.com/us/rss/customerreviews/page=10/id=1/sortby=mostrecent/xml?urlDesc=/customerreviews/id=1/sortBy=mostRecent/xml"/>',
+                     u'<entry><updated>2015-01-31</updated><id>https://itunes.apple.com/us/app/app/id1</id><title>App - Developer</title><im:name>App</im:name></entry>']
+        feedFile.write(u"\n".join(feedLines).encode("utf-8"))
+        
+        for reviewIndex in range(0, numReviews):
+            reviewTitle = u" ".join([randomGenerator.choice(ReviewWords) for wordIndex in range(0, 5)])
+            reviewText = u" ".join([randomGenerator.choice(ReviewWords) for wordIndex in range(0, 80)])
+            
+            feedEntry = (u'<entry><updated>2015-01-30T10:00:00-07:00</updated><id>{reviewId}</id><title>{title}</title><content type="text">{text}</content>'
+                         u'<im:contentType term="Application" label="Application"/><im:voteSum>0</im:voteSum><im:voteCount>0</im:voteCount>'
+                         u'<im:rating>{rating}</im:rating><im:version>1.{version}</im:version><author><name>user{reviewIndex}</name></author>'
+                         u'<content type="html">{html}</content></entry>').format(reviewId=5000000000 + reviewIndex, title=escapeText(reviewTitle), text=escapeText(reviewText),
+                                                                                 rating=1 + reviewIndex % 5, version=reviewIndex % 4, reviewIndex=reviewIndex,
+                                                                                 html=escapeText(escapeText(u"<table><tr><td>" + reviewText + u"</td></tr></table>")))
+            feedFile.write((u"\n" + feedEntry).encode("utf-8"))
+        
+        feedFile.write(u"\n</feed>".encode("utf-8"))
+
+def transliterateEntry(feedEntry):
+    from unidecode import unidecode
+    
+    return dict([[fieldIndex, unidecode(fieldValue) if isinstance(fieldValue, basestring) else fieldValue] for [fieldIndex, fieldValue] in feedEntry.items()])
+
+def parseWithFeedparser(feedPath, knownUniqueIds):
+    # the reviews as they were read before, feedparser then every field of every review transliterated
+    import feedparser
+    from unidecode import unidecode
+    
+    with open(feedPath, 'rb') as feedFile:
+        parsedFeed = feedparser.parse(feedFile, response_headers={"content-location" : FeedURL})
+    
+    feedEntries = dict()
+    for entry in parsedFeed.entries:
+        if "im_version" in entry:
+            feedEntry = {RSSFields.Version:  unidecode(entry["im_version"]),
+                         RSSFields.Title:    unidecode(entry["title"]),
+                         RSSFields.Rating:   int(unidecode(entry["im_rating"])),
+                         RSSFields.Summary:  unidecode(entry["summary"]),
+                         RSSFields.UniqueId: unidecode(entry["id"])}
+            feedEntries.update({feedEntry[RSSFields.UniqueId] : feedEntry})
+    
+    return feedEntries
+
+def parseWithReviewFeedParser(feedPath, knownUniqueIds):
+    # the reviews as they are read now, with only the new reviews transliterated as the log writes them
+    from ReviewFeedParser import parseReviewFeed
+    
+    with open(feedPath, 'rb') as feedFile:
+        [feedEntries, numEntries, lastPage] = parseReviewFeed(feedFile, FeedURL, knownUniqueIds)
+    
+    return dict([[uniqueId, transliterateEntry(feedEntry)] for [uniqueId, feedEntry] in feedEntries.items()])
+
+FeedParsers = {"feedparser" : parseWithFeedparser, "ReviewFeedParser" : parseWithReviewFeedParser}
+
+def getKnownUniqueIds(feedPath, knownFraction):
+    # the oldest reviews are the ones already in the log, the feed is streamed so the peak memory is left to the parser
+    import xml.etree.cElementTree as ElementTree
+    import urlparse
+    
+    uniqueIds = []
+    for [event, element] in ElementTree.iterparse(feedPath):
+        if element.tag == "{http://www.w3.org/2005/Atom}entry":
+            if element.find("{http://itunes.apple.com/rss}version") != None:
+                uniqueIds.append(urlparse.urljoin(FeedURL, element.findtext("{http://www.w3.org/2005/Atom}id")))
+            
+            element.clear()
+    
+    return set(uniqueIds[len(uniqueIds) - int(len(uniqueIds) * knownFraction):])
+
+def getEntriesDigest(feedEntries):
+    # the transliterated text is compared as plain strings whichever parser returned it
+    return hashlib.md5(repr(sorted([[str(uniqueId), sorted([[fieldIndex, str(fieldValue) if isinstance(fieldValue, basestring) else fieldValue] for [fieldIndex, fieldValue] in feedEntry.items()])]
+                                    for [uniqueId, feedEntry] in feedEntries.items()]))).hexdigest()
+
+def measureParser(parserName, feedPath, knownFraction):
+    # runs in its own process so the peak memory belongs to the one parser
+    knownUniqueIds = getKnownUniqueIds(feedPath, knownFraction) if knownFraction > 0 else set()
+    
+    # the modules are loaded up front so that only the parsing is measured
+    if parserName == "feedparser":
+        import feedparser
+    else:
+        import ReviewFeedParser
+    import unidecode
+    
+    baseMemory = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    
+    startTime = time.time()
+    feedEntries = FeedParsers[parserName](feedPath, knownUniqueIds)
+    elapsedSeconds = time.time() - startTime
+    
+    peakMemory = (resource.getrusage(resource.RUSAGE_SELF).ru_maxrss - baseMemory) / 1024.0
+    
+    print json.dumps([elapsedSeconds, peakMemory, len(feedEntries), getEntriesDigest(feedEntries)])
+
+def runMeasurement(parserName, feedPath, knownFraction):
+    measurementOutput = subprocess.check_output([sys.executable, os.path.abspath(__file__), "--measure", parserName, feedPath, str(knownFraction)])
+    
+    return json.loads(measurementOutput.strip().split("\n")[-1])
+
+def benchmarkFeed(feedPath, knownFraction, compareWithFeedparser):
+    print "{feedName} ({size:.1f}MB)".format(feedName=os.path.basename(feedPath), size=os.path.getsize(feedPath) / (1024.0 * 1024.0))
+    
+    measurements = []
+    if compareWithFeedparser:
+        measurements.append(["feedparser", 0, runMeasurement("feedparser", feedPath, 0)])
+    measurements.append(["ReviewFeedParser", 0, runMeasurement("ReviewFeedParser", feedPath, 0)])
+    if knownFraction > 0:
+        measurements.append(["ReviewFeedParser", knownFraction, runMeasurement("ReviewFeedParser", feedPath, knownFraction)])
+    
+    for [parserName, measuredFraction, [elapsedSeconds, peakMemory, numEntries, entriesDigest]] in measurements:
+        print "    {parser:<18} {known:>3.0f}% known  {seconds:8.3f}s  peak +{memory:.1f}MB  {entries} new reviews".format(parser=parserName, known=measuredFraction * 100, seconds=elapsedSeconds,
+                                                                                                                 memory=peakMemory, entries=numEntries)
+    
+    # with nothing known both parsers must give back exactly the same reviews
+    if compareWithFeedparser:
+        entriesMatch = measurements[0][2][3] == measurements[1][2][3]
+        print "    Reviews match feedparser: {match}".format(match="yes" if entriesMatch else "NO")
+        
+        return entriesMatch
+    
+    return True
+
+def usage():
+    print "Usage:"
+    print "      benchReviewFeedParsing [-e <Reviews1,Reviews2>] [-f <Feed File>] [-k <Known Fraction>] [--noFeedparser]"
+    print ""
+    print "          Reviews          Sizes of the feeds to generate (defaults to {feedSizes})".format(feedSizes=",".join([str(feedSize) for feedSize in DefaultFeedSizes]))
+    print "          Feed File        A saved customer reviews feed to time as well as (or with -e 0 instead of) the generated ones"
+    print "          Known Fraction   Fraction of the reviews already in the log for the extra ReviewFeedParser run (defaults to {knownFraction})".format(knownFraction=DefaultKnownFraction)
+    print "          --noFeedparser   Only times ReviewFeedParser, for when feedparser is not installed"
+
+def main(argv):
+    if len(argv) == 4 and argv[0] == "--measure":
+        measureParser(argv[1], argv[2], float(argv[3]))
+        return
+    
+    feedSizes = DefaultFeedSizes
+    feedFiles = []
+    knownFraction = DefaultKnownFraction
+    compareWithFeedparser = True
+    
+    try:
+        opts, args = getopt.getopt(argv, "he:f:k:", ["help", "reviews=", "feed=", "known=", "noFeedparser"])
+    except getopt.GetoptError, exc:
+        print exc.msg
+        
+        usage()
+        sys.exit(2)
+    
+    for opt, arg in opts:
+        if opt in ("-h", "--help"):
+            usage()
+            sys.exit()
+        elif opt in ("-e", "--reviews"):
+            feedSizes = [int(feedSize) for feedSize in arg.split(",") if int(feedSize) > 0]
+        elif opt in ("-f", "--feed"):
+            feedFiles.append(os.path.abspath(arg))
+        elif opt in ("-k", "--known"):
+            knownFraction = float(arg)
+        elif opt in ("--noFeedparser",):
+            compareWithFeedparser = False
+    
+    workingPath = tempfile.mkdtemp()
+    
+    try:
+        for feedSize in feedSizes:
+            feedPath = os.path.join(workingPath, "reviews_{feedSize}.xml".format(feedSize=feedSize))
+            generateFeed(feedPath, feedSize, DefaultSeed)
+            feedFiles.append(feedPath)
+        
+        allEntriesMatch = True
+        for feedPath in feedFiles:
+            allEntriesMatch = benchmarkFeed(feedPath, knownFraction, compareWithFeedparser) and allEntriesMatch
+    finally:
+        shutil.rmtree(workingPath)
+    
+    if not allEntriesMatch:
+        sys.exit(1)
+
+if __name__ == '__main__':
+    main(sys.argv[1:])
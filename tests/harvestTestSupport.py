@@ -0,0 +1,67 @@
+#!/usr/bin/python
+
+# Harvest Reports v0.1.5
+# Copyright (c) 2014-2015 Iain McManus. All rights reserved.
+#
+# Harvest Reports is a wrapper around Apple's AutoIngestion Java Class.
+# Harvest Reports can download all of the recent daily data and will produce
+# a summary of the sales, updates and a breakdown of region where sales have occurred.
+#
+# Information is also generated per version, including a calculation of the number of users
+# on the latest version.
+#
+# Harvest Reports can be run on a regular schedule and be configured to send an email
+# with the daily summary when the daily report is out. If no sales/updates have occurred
+# it can indicate that as well.
+
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in
+# all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN
+# THE SOFTWARE.
+
+import os
+import shutil
+import sys
+import tempfile
+import unittest
+
+TestsPath = os.path.dirname(os.path.abspath(__file__))
+FixturesPath = os.path.join(TestsPath, "fixtures")
+HarvestReportsPath = os.path.join(os.path.dirname(TestsPath), "HarvestReports")
+
+# the tests import the modules straight from the source folder and never open a window for the charts
+sys.path.insert(0, HarvestReportsPath)
+os.environ.setdefault("MPLBACKEND", "Agg")
+
+class HarvestTestCase(unittest.TestCase):
+    # the field mappings are read from the working directory, so the tests run from the source folder and write to a scratch folder
+    def setUp(self):
+        self.originalPath = os.getcwd()
+        os.chdir(HarvestReportsPath)
+        
+        self.workingPath = tempfile.mkdtemp()
+    
+    def tearDown(self):
+        os.chdir(self.originalPath)
+        
+        shutil.rmtree(self.workingPath)
+    
+    def copyFixtures(self, fixtureName):
+        fixturePath = os.path.join(self.workingPath, fixtureName)
+        
+        shutil.copytree(os.path.join(FixturesPath, fixtureName), fixturePath)
+        
+        return fixturePath
@@ -0,0 +1,105 @@
+#!/usr/bin/python
+
+# Harvest Reports v0.1.5
+# Copyright (c) 2014-2015 Iain McManus. All rights reserved.
+#
+# Harvest Reports is a wrapper around Apple's AutoIngestion Java Class.
+# Harvest Reports can download all of the recent daily data and will produce
+# a summary of the sales, updates and a breakdown of region where sales have occurred.
+#
+# Information is also generated per version, including a calculation of the number of users
+# on the latest version.
+#
+# Harvest Reports can be run on a regular schedule and be configured to send an email
+# with the daily summary when the daily report is out. If no sales/updates have occurred
+# it can indicate that as well.
+
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in
+# all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN
+# THE SOFTWARE.
+
+import datetime
+import random
+import unittest
+
+import numpy as np
+
+from harvestTestSupport import HarvestTestCase
+
+class DailySeriesTests(HarvestTestCase):
+    def setUp(self):
+        HarvestTestCase.setUp(self)
+        
+        from DailySeries import DailySeries
+        
+        # a little over a year of units and proceeds, starting part way through a month
+        self.firstDate = datetime.date(2023, 11, 20)
+        
+        randomGenerator = random.Random(20)
+        self.dailyUnits = [randomGenerator.randint(-2, 40) for dayOffset in range(0, 420)]
+        self.dailyProceeds = [round(randomGenerator.uniform(-5.0, 80.0), 2) for dayOffset in range(0, 420)]
+        
+        self.unitsSeries = DailySeries(self.firstDate, np.array(self.dailyUnits, dtype=np.int64))
+        self.proceedsSeries = DailySeries(self.firstDate, np.array(self.dailyProceeds, dtype=np.float64))
+        self.emptySeries = DailySeries(None, np.zeros(0, dtype=np.int64))
+        
+        # the dates checked run from well before the series to well after it
+        self.checkDates = [self.firstDate + datetime.timedelta(dayOffset) for dayOffset in range(-40, len(self.dailyUnits) + 40, 3)]
+    
+    def getNaiveTotal(self, dailyTotals, startDate, endDate):
+        return sum([dailyTotals[dayOffset] for dayOffset in range(0, len(dailyTotals)) if startDate <= self.firstDate + datetime.timedelta(dayOffset) <= endDate])
+    
+    def assertTotals(self, getSeriesTotal, getRange):
+        for checkDate in self.checkDates:
+            [startDate, endDate] = getRange(checkDate)
+            
+            self.assertEqual(getSeriesTotal(self.unitsSeries, checkDate), self.getNaiveTotal(self.dailyUnits, startDate, endDate))
+            self.assertAlmostEqual(getSeriesTotal(self.proceedsSeries, checkDate), self.getNaiveTotal(self.dailyProceeds, startDate, endDate))
+            self.assertEqual(getSeriesTotal(self.emptySeries, checkDate), 0)
+    
+    def testDates(self):
+        self.assertEqual(self.unitsSeries.getDates(), [self.firstDate + datetime.timedelta(dayOffset) for dayOffset in range(0, len(self.dailyUnits))])
+        self.assertEqual(self.emptySeries.getDates(), [])
+    
+    def testTotal(self):
+        for startDate in self.checkDates[::7]:
+            for endDate in self.checkDates:
+                self.assertEqual(self.unitsSeries.getTotal(startDate, endDate), self.getNaiveTotal(self.dailyUnits, startDate, endDate))
+                self.assertAlmostEqual(self.proceedsSeries.getTotal(startDate, endDate), self.getNaiveTotal(self.dailyProceeds, startDate, endDate))
+    
+    def testWindowTotal(self):
+        for numDays in [1, 7, 30, 90]:
+            self.assertTotals(lambda dailySeries, checkDate: dailySeries.getWindowTotal(checkDate, numDays),
+                              lambda checkDate: [checkDate - datetime.timedelta(numDays - 1), checkDate])
+    
+    def testMonthToDate(self):
+        self.assertTotals(lambda dailySeries, checkDate: dailySeries.getMonthToDate(checkDate),
+                          lambda checkDate: [checkDate.replace(day=1), checkDate])
+    
+    def testYearToDate(self):
+        self.assertTotals(lambda dailySeries, checkDate: dailySeries.getYearToDate(checkDate),
+                          lambda checkDate: [checkDate.replace(month=1, day=1), checkDate])
+    
+    def testDailyTotals(self):
+        for startDate in self.checkDates[::5]:
+            dailyTotals = self.unitsSeries.getDailyTotals(startDate, 30).tolist()
+            
+            self.assertEqual(dailyTotals, [self.getNaiveTotal(self.dailyUnits, startDate + datetime.timedelta(dayOffset), startDate + datetime.timedelta(dayOffset)) for dayOffset in range(0, 30)])
+            self.assertEqual(self.emptySeries.getDailyTotals(startDate, 30).tolist(), [0] * 30)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,185 @@
+#!/usr/bin/python
+
+# Harvest Reports v0.1.5
+# Copyright (c) 2014-2015 Iain McManus. All rights reserved.
+#
+# Harvest Reports is a wrapper around Apple's AutoIngestion Java Class.
+# Harvest Reports can download all of the recent daily data and will produce
+# a summary of the sales, updates and a breakdown of region where sales have occurred.
+#
+# Information is also generated per version, including a calculation of the number of users
+# on the latest version.
+#
+# Harvest Reports can be run on a regular schedule and be configured to send an email
+# with the daily summary when the daily report is out. If no sales/updates have occurred
+# it can indicate that as well.
+
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in
+# all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN
+# THE SOFTWARE.
+import datetime
+import os
+import StringIO
+import sys
+import time
+import unittest
+
+from harvestTestSupport import FixturesPath, HarvestTestCase
+
+class DownloadReportsTests(HarvestTestCase):
+    VendorId = "12345"
+    
+    def setUp(self):
+        HarvestTestCase.setUp(self)
+        
+        import harvestReports
+        from AutoingestionClient import AutoingestionClient
+        
+        self.harvestReports = harvestReports
+        
+        # the fake Autoingestion is found ahead of any real java and serves the report fixtures
+        self.originalEnvironment = dict(os.environ)
+        os.environ["PATH"] = os.path.join(FixturesPath, "fakeAutoingestion") + os.pathsep + os.environ.get("PATH", "")
+        os.environ["FAKE_REMOTE"] = os.path.join(FixturesPath, "reports")
+        os.environ["FAKE_LOG"] = os.path.join(self.workingPath, "requests.log")
+        os.environ["FAKE_OLDEST"] = "20240101"
+        
+        self.originalMinSecondsBetweenRequests = AutoingestionClient.MinSecondsBetweenRequests
+        AutoingestionClient.MinSecondsBetweenRequests = 0.0
+        
+        # Autoingestion writes the downloaded report to the working directory
+        self.basePath = os.path.join(self.workingPath, "reports")
+        os.mkdir(self.basePath)
+        os.mkdir(os.path.join(self.workingPath, "autoingestion"))
+        os.chdir(os.path.join(self.workingPath, "autoingestion"))
+    
+    def tearDown(self):
+        from AutoingestionClient import AutoingestionClient
+        
+        AutoingestionClient.MinSecondsBetweenRequests = self.originalMinSecondsBetweenRequests
+        
+        os.environ.clear()
+        os.environ.update(self.originalEnvironment)
+        
+        HarvestTestCase.tearDown(self)
+    
+    def downloadDays(self, requestedDays, numWorkers=1, verbose=False, periodsBack=None):
+        originalOutput = sys.stdout
+        sys.stdout = StringIO.StringIO()
+        
+        try:
+            downloadResults = self.harvestReports.downloadReports("fake.properties", self.VendorId, periodsBack or dict(), False, self.basePath, verbose, numWorkers, requestedDays=requestedDays)
+            output = sys.stdout.getvalue()
+        finally:
+            sys.stdout = originalOutput
+        
+        return downloadResults + [output.splitlines()]
+    
+    def getRequestTimes(self):
+        with open(os.environ["FAKE_LOG"]) as requestLog:
+            return sorted([float(logLine.split()[0]) for logLine in requestLog])
+    
+    def getRequestedDateTypes(self):
+        with open(os.environ["FAKE_LOG"]) as requestLog:
+            return sorted(set([logLine.split()[2] for logLine in requestLog]))
+    
+    def getReportPath(self, requestedDay):
+        return os.path.join(self.basePath, "S_D_{vendorId}_{day:%Y%m%d}.txt".format(vendorId=self.VendorId, day=requestedDay))
+    
+    def testDownloadsReportsAndPlaceholders(self):
+        # most recent first, as the days back are requested
+        requestedDays = [datetime.date(2024, 2, 5), datetime.date(2024, 2, 4), datetime.date(2024, 2, 2), datetime.date(2024, 2, 1), datetime.date(2024, 1, 31), datetime.date(2024, 1, 30), datetime.date(2023, 12, 31)]
+        
+        # a day already on disk is not requested again
+        open(self.getReportPath(datetime.date(2024, 2, 1)), 'wt').close()
+        
+        [addedPlaceHolderFileForEventlessDay, downloadedFiles, output] = self.downloadDays(requestedDays, 4, True)
+        
+        self.assertTrue(addedPlaceHolderFileForEventlessDay)
+        self.assertEqual(sorted(downloadedFiles), sorted([self.getReportPath(requestedDay) for requestedDay in requestedDays[2:3] + requestedDays[4:6]]))
+        
+        for downloadedFile in downloadedFiles:
+            with open(downloadedFile, 'rb') as downloadedHandle, open(os.path.join(FixturesPath, "reports", os.path.basename(downloadedFile)), 'rb') as fixtureHandle:
+                self.assertEqual(downloadedHandle.read(), fixtureHandle.read())
+        
+        # the eventless days are left as empty placeholders and nothing is written for a day that is too old
+        for requestedDay in requestedDays[0:2]:
+            self.assertEqual(os.path.getsize(self.getReportPath(requestedDay)), 0)
+        self.assertFalse(os.path.exists(self.getReportPath(requestedDays[6])))
+        
+        # the compressed downloads are cleaned up
+        self.assertEqual(os.listdir(os.getcwd()), [])
+        
+        self.assertEqual(output, ["Failed to download report for 05/02/2024",
+                                  "    No installs have occurred for that date",
+                                  "Failed to download report for 04/02/2024",
+                                  "    No installs have occurred for that date",
+                                  "Downloaded report for 02/02/2024",
+                                  "Skipped existing data for 01/02/2024",
+                                  "Downloaded report for 31/01/2024",
+                                  "Downloaded report for 30/01/2024",
+                                  "Failed to download report for 31/12/2023",
+                                  "    No data exists for that date. Either it is too far back (Apple only keeps a limited number of reports) or the report for it does not yet exist"])
+    
+    def testRequestedDaysOnlyFetchDailyReports(self):
+        from Common import ReportPeriods
+        
+        periodsBack = {ReportPeriods.Daily : 2, ReportPeriods.Weekly : 1, ReportPeriods.Monthly : 1, ReportPeriods.Yearly : 1}
+        
+        # a poll for particular days leaves the weeks, months and years to the full harvest
+        self.downloadDays([datetime.date(2024, 2, 1)], periodsBack=periodsBack)
+        self.assertEqual(self.getRequestedDateTypes(), ["daily"])
+        
+        self.downloadDays(None, periodsBack=periodsBack)
+        self.assertEqual(self.getRequestedDateTypes(), ["daily", "monthly", "weekly", "yearly"])
+    
+    def testWorkersRequestConcurrently(self):
+        requestedDays = [datetime.date(2024, 1, 30) + datetime.timedelta(days=dayOffset) for dayOffset in range(0, 6)]
+        os.environ["FAKE_SLEEP"] = "0.3"
+        
+        startTime = time.time()
+        serialResults = self.downloadDays(requestedDays)
+        serialSeconds = time.time() - startTime
+        
+        for fileName in os.listdir(self.basePath):
+            os.remove(os.path.join(self.basePath, fileName))
+        
+        startTime = time.time()
+        concurrentResults = self.downloadDays(requestedDays, len(requestedDays))
+        concurrentSeconds = time.time() - startTime
+        
+        self.assertEqual(concurrentResults, serialResults)
+        self.assertGreaterEqual(serialSeconds, 0.3 * len(requestedDays))
+        self.assertLess(concurrentSeconds, serialSeconds / 2)
+    
+    def testRequestsAreSpacedOut(self):
+        from AutoingestionClient import AutoingestionClient
+        
+        AutoingestionClient.MinSecondsBetweenRequests = 0.2
+        requestedDays = [datetime.date(2024, 1, 30) + datetime.timedelta(days=dayOffset) for dayOffset in range(0, 5)]
+        
+        self.downloadDays(requestedDays, len(requestedDays))
+        
+        # every worker is free to go at once but the requests still start one gap apart, give or take the process start up
+        requestTimes = self.getRequestTimes()
+        self.assertEqual(len(requestTimes), len(requestedDays))
+        self.assertGreaterEqual(requestTimes[-1] - requestTimes[0], 0.2 * (len(requestTimes) - 1) - 0.05)
+        for requestIndex in range(1, len(requestTimes)):
+            self.assertGreaterEqual(requestTimes[requestIndex] - requestTimes[requestIndex - 1], 0.1)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,100 @@
+#!/usr/bin/python
+
+# Harvest Reports v0.1.5
+# Copyright (c) 2014-2015 Iain McManus. All rights reserved.
+#
+# Harvest Reports is a wrapper around Apple's AutoIngestion Java Class.
+# Harvest Reports can download all of the recent daily data and will produce
+# a summary of the sales, updates and a breakdown of region where sales have occurred.
+#
+# Information is also generated per version, including a calculation of the number of users
+# on the latest version.
+#
+# Harvest Reports can be run on a regular schedule and be configured to send an email
+# with the daily summary when the daily report is out. If no sales/updates have occurred
+# it can indicate that as well.
+
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in
+# all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN
+# THE SOFTWARE.
+
+import datetime
+import unittest
+
+from harvestTestSupport import HarvestTestCase
+
+class ReportDatabaseTests(HarvestTestCase):
+    def setUp(self):
+        HarvestTestCase.setUp(self)
+        
+        import harvestReports
+        from Common import FieldRemapper, ReportTypes
+        from ReportDatabase import ReportDatabase
+        
+        basePath = self.copyFixtures("reports")
+        
+        # the summaries are built alongside the database, just as a run with --database does
+        fieldRemapper = FieldRemapper()
+        self.reportDatabase = ReportDatabase(basePath, fieldRemapper)
+        self.perSKUData = harvestReports.processDailiesIn(basePath, None, ReportTypes.BasicSummary, fieldRemapper, 1, None, self.reportDatabase)
+    
+    def tearDown(self):
+        self.reportDatabase.close()
+        
+        HarvestTestCase.tearDown(self)
+    
+    def getSummaryTotals(self, skuSummary):
+        return [[skuSummary.allInstallsTotal, skuSummary.paidInstallsTotal, skuSummary.freeInstallsTotal, sum(skuSummary.updatesByVersion.values()),
+                 skuSummary.refundsTotal, skuSummary.promoCodesTotal], dict([[currency, proceeds] for [currency, proceeds] in skuSummary.proceedsTotal.items() if proceeds != 0])]
+    
+    def assertReconciles(self, summaryRows):
+        self.assertEqual(sorted([groupValues[0] for [groupValues, totals, proceeds] in summaryRows]), sorted(self.perSKUData.keys()))
+        
+        for [groupValues, totals, proceeds] in summaryRows:
+            [summaryTotals, summaryProceeds] = self.getSummaryTotals(self.perSKUData[groupValues[0]])
+            
+            self.assertEqual(totals, summaryTotals)
+            self.assertEqual(sorted(proceeds.keys()), sorted(summaryProceeds.keys()))
+            for currency in proceeds:
+                self.assertAlmostEqual(proceeds[currency], summaryProceeds[currency])
+    
+    def testTotalsReconcileWithSummary(self):
+        self.assertReconciles(self.reportDatabase.querySummary(dict(), None, None, ["sku"]))
+    
+    def testMonthlyAndDailyTotalsReconcileWithSummary(self):
+        # whole months come from the monthly totals and the days either side from the daily totals
+        self.assertReconciles(self.reportDatabase.querySummary(dict(), datetime.date(2024, 1, 15), datetime.date(2024, 2, 29), ["sku"]))
+        self.assertReconciles(self.reportDatabase.querySummary(dict(), datetime.date(2023, 12, 1), datetime.date(2024, 3, 31), ["sku"]))
+    
+    def testMonthsAddUpToTheSummary(self):
+        monthlyRows = self.reportDatabase.querySummary(dict(), None, None, ["sku", "month"])
+        
+        for [skuName, skuSummary] in self.perSKUData.items():
+            [summaryTotals, summaryProceeds] = self.getSummaryTotals(skuSummary)
+            
+            skuRows = [[totals, proceeds] for [groupValues, totals, proceeds] in monthlyRows if groupValues[0] == skuName]
+            self.assertEqual([sum(columnTotals) for columnTotals in zip(*[totals for [totals, proceeds] in skuRows])], summaryTotals)
+            
+            # refunds never take a month's proceeds below zero
+            for [totals, proceeds] in skuRows:
+                self.assertTrue(all(monthProceeds > 0 for monthProceeds in proceeds.values()))
+            
+            for currency in summaryProceeds:
+                self.assertAlmostEqual(sum([proceeds.get(currency, 0) for [totals, proceeds] in skuRows]), summaryProceeds[currency])
+
+if __name__ == '__main__':
+    unittest.main()
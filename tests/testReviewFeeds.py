@@ -0,0 +1,236 @@
+#!/usr/bin/python
+
+# Harvest Reports v0.1.5
+# Copyright (c) 2014-2015 Iain McManus. All rights reserved.
+#
+# Harvest Reports is a wrapper around Apple's AutoIngestion Java Class.
+# Harvest Reports can download all of the recent daily data and will produce
+# a summary of the sales, updates and a breakdown of region where sales have occurred.
+#
+# Information is also generated per version, including a calculation of the number of users
+# on the latest version.
+#
+# Harvest Reports can be run on a regular schedule and be configured to send an email
+# with the daily summary when the daily report is out. If no sales/updates have occurred
+# it can indicate that as well.
+
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in
+# all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN
+# THE SOFTWARE.
+import BaseHTTPServer
+import hashlib
+import re
+import socket
+import SocketServer
+import threading
+import time
+import unittest
+
+from harvestTestSupport import HarvestTestCase
+
+FeedPathPattern = re.compile(r"^/(\w+)/rss/customerreviews/(?:page=(\d+)/)?id=(\w+)/")
+
+def buildReviewFeed(appId, countryCode, reviews, lastPage):
+    # the same layout as the App Store customer reviews feed, the first entry describes the app
+    feedLines = ['<?xml version="1.0" encoding="utf-8"?>',
+                 '<feed xmlns:im="http://itunes.apple.com/rss" xmlns="http://www.w3.org/2005/Atom" xml:lang="en">',
+                 '<id>https://itunes.apple.com/{countryCode}/rss/customerreviews/id={appId}/sortBy=mostRecent/xml</id>'.format(countryCode=countryCode, appId=appId),
+                 '<title>iTunes Store: Customer Reviews</title>',
+                 '<link rel="last" href="https://itunes.apple.com/{countryCode}/rss/customerreviews/page={page}/id={appId}/sortby=mostrecent/xml"/>'.format(countryCode=countryCode, page=lastPage, appId=appId),
+                 '<entry><id>{appId}</id><title>App - Developer</title><im:name>App</im:name></entry>'.format(appId=appId)]
+    
+    for [reviewId, version, rating] in reviews:
+        feedLines.append('<entry><id>{reviewId}</id><title>Review {reviewId}</title><content type="text">Caf\xc3\xa9 review {reviewId}</content>'
+                         '<content type="html">&lt;b&gt;Review&lt;/b&gt;</content><im:rating>{rating}</im:rating><im:version>{version}</im:version>'
+                         '<author><name>Reviewer</name></author></entry>'.format(reviewId=reviewId, rating=rating, version=version))
+    
+    feedLines.append('</feed>')
+    
+    return "\n".join(feedLines)
+
+class ReviewFeedHandler(BaseHTTPServer.BaseHTTPRequestHandler):
+    def do_GET(self):
+        feedPathMatch = FeedPathPattern.match(self.path)
+        [countryCode, page, appId] = [feedPathMatch.group(1), int(feedPathMatch.group(2) or 1), feedPathMatch.group(3)]
+        
+        self.server.requests.append([countryCode, appId, page, self.headers.get("If-None-Match")])
+        
+        time.sleep(self.server.delays.get(countryCode, 0))
+        
+        feedBody = self.server.feedPages.get((appId, countryCode, page))
+        if feedBody == None:
+            self.send_response(404)
+            self.end_headers()
+            return
+        
+        etag = '"{digest}"'.format(digest=hashlib.md5(feedBody).hexdigest())
+        if self.headers.get("If-None-Match") == etag:
+            self.send_response(304)
+            self.end_headers()
+            return
+        
+        self.send_response(200)
+        self.send_header("Content-Type", "application/atom+xml")
+        self.send_header("ETag", etag)
+        self.end_headers()
+        self.wfile.write(feedBody)
+    
+    def handle(self):
+        # a client that has given up on a slow storefront leaves a closed socket behind
+        try:
+            BaseHTTPServer.BaseHTTPRequestHandler.handle(self)
+        except socket.error:
+            pass
+    
+    def log_message(self, format, *args):
+        pass
+
+class ReviewFeedServer(SocketServer.ThreadingMixIn, BaseHTTPServer.HTTPServer):
+    daemon_threads = True
+
+class ReviewFeedTests(HarvestTestCase):
+    AppIds = ["111", "222"]
+    CountryCodes = ["us", "gb", "jp"]
+    
+    def setUp(self):
+        HarvestTestCase.setUp(self)
+        
+        import harvestReports
+        
+        self.harvestReports = harvestReports
+        
+        self.feedServer = ReviewFeedServer(("127.0.0.1", 0), ReviewFeedHandler)
+        self.feedServer.requests = []
+        self.feedServer.delays = dict()
+        self.feedServer.feedPages = dict()
+        self.feedServerThread = threading.Thread(target=self.feedServer.serve_forever)
+        self.feedServerThread.daemon = True
+        self.feedServerThread.start()
+        
+        serverURL = "http://127.0.0.1:{port}".format(port=self.feedServer.server_address[1])
+        self.originalFeedURLs = [harvestReports.CustomerReviewsFeedURL, harvestReports.CustomerReviewsPageURL]
+        harvestReports.CustomerReviewsFeedURL = serverURL + "/{countryCode}/rss/customerreviews/id={appId}/sortBy=mostRecent/xml"
+        harvestReports.CustomerReviewsPageURL = serverURL + "/{countryCode}/rss/customerreviews/page={page}/id={appId}/sortBy=mostRecent/xml"
+        
+        # every storefront has its own reviews, the us store for the first app has a second page
+        self.reviews = dict()
+        for [appIndex, appId] in enumerate(self.AppIds):
+            for [countryIndex, countryCode] in enumerate(self.CountryCodes):
+                self.reviews[(appId, countryCode)] = [["{appId}{countryCode}{reviewIndex}".format(appId=appId, countryCode=countryCode, reviewIndex=reviewIndex),
+                                                       "1.{version}".format(version=reviewIndex % 2), 1 + (appIndex + countryIndex + reviewIndex) % 5] for reviewIndex in range(0, 4 + countryIndex)]
+                self.publishFeed(appId, countryCode)
+    
+    def tearDown(self):
+        [self.harvestReports.CustomerReviewsFeedURL, self.harvestReports.CustomerReviewsPageURL] = self.originalFeedURLs
+        
+        self.feedServer.shutdown()
+        self.feedServer.server_close()
+        socket.setdefaulttimeout(None)
+        
+        HarvestTestCase.tearDown(self)
+    
+    def publishFeed(self, appId, countryCode):
+        reviews = self.reviews[(appId, countryCode)]
+        
+        if (appId, countryCode) == ("111", "us"):
+            self.feedServer.feedPages[(appId, countryCode, 1)] = buildReviewFeed(appId, countryCode, reviews[:2], 2)
+            self.feedServer.feedPages[(appId, countryCode, 2)] = buildReviewFeed(appId, countryCode, reviews[2:], 2)
+        else:
+            self.feedServer.feedPages[(appId, countryCode, 1)] = buildReviewFeed(appId, countryCode, reviews, 1)
+    
+    def downloadFeeds(self, basePath, numWorkers=6, requestTimeout=5):
+        return self.harvestReports.downloadRSSFeed(basePath, self.AppIds, self.CountryCodes, numWorkers, requestTimeout)
+    
+    def assertFeedSummary(self, ratingsAndReviewsFeed, countryCodes, newCountryCodes):
+        from Common import RatingsSummaryFields
+        
+        for appId in self.AppIds:
+            ratingsAndReviewsForApp = ratingsAndReviewsFeed[appId]
+            ratings = [rating for countryCode in countryCodes for [reviewId, version, rating] in self.reviews[(appId, countryCode)]]
+            
+            # the per app figures are the per storefront figures combined
+            self.assertEqual(ratingsAndReviewsForApp[RatingsSummaryFields.LifetimeRatingSamples], len(ratings))
+            self.assertAlmostEqual(ratingsAndReviewsForApp[RatingsSummaryFields.LifetimeAverageRating], float(sum(ratings)) / len(ratings))
+            self.assertEqual(ratingsAndReviewsForApp[RatingsSummaryFields.NumberOfNewRatings], sum([len(self.reviews[(appId, countryCode)]) for countryCode in newCountryCodes]))
+            
+            for version in ["1.0", "1.1"]:
+                versionRatings = [rating for countryCode in countryCodes for [reviewId, reviewVersion, rating] in self.reviews[(appId, countryCode)] if reviewVersion == version]
+                
+                self.assertEqual(ratingsAndReviewsForApp[RatingsSummaryFields.NumberOfRatingsPerVersion][version], len(versionRatings))
+                self.assertAlmostEqual(ratingsAndReviewsForApp[RatingsSummaryFields.AverageRatingPerVersion][version], float(sum(versionRatings)) / len(versionRatings))
+    
+    def testStorefrontsAreFetchedConcurrently(self):
+        for countryCode in self.CountryCodes:
+            self.feedServer.delays[countryCode] = 0.3
+        
+        startTime = time.time()
+        [newRatingsAndReviews, ratingsAndReviewsFeed] = self.downloadFeeds(self.workingPath)
+        concurrentSeconds = time.time() - startTime
+        
+        self.assertTrue(newRatingsAndReviews)
+        self.assertFeedSummary(ratingsAndReviewsFeed, self.CountryCodes, self.CountryCodes)
+        
+        # six first pages and the second us page, one after the other that would take at least 2.1 seconds
+        self.assertEqual(len(self.feedServer.requests), 7)
+        self.assertLess(concurrentSeconds, 1.2)
+    
+    def testSlowStorefrontIsTreatedAsFailed(self):
+        self.feedServer.delays["jp"] = 3
+        
+        startTime = time.time()
+        [newRatingsAndReviews, ratingsAndReviewsFeed] = self.downloadFeeds(self.workingPath, requestTimeout=0.5)
+        elapsedSeconds = time.time() - startTime
+        
+        # the other storefronts are still read while the late one is given up on
+        self.assertLess(elapsedSeconds, 2)
+        self.assertTrue(newRatingsAndReviews)
+        self.assertFeedSummary(ratingsAndReviewsFeed, ["us", "gb"], ["us", "gb"])
+        
+        # a failed storefront keeps no validators so it is fetched in full next time
+        del self.feedServer.delays["jp"]
+        [newRatingsAndReviews, ratingsAndReviewsFeed] = self.downloadFeeds(self.workingPath)
+        
+        self.assertTrue(newRatingsAndReviews)
+        self.assertFeedSummary(ratingsAndReviewsFeed, self.CountryCodes, ["jp"])
+    
+    def testUnchangedFeedsAreNotModified(self):
+        self.downloadFeeds(self.workingPath)
+        del self.feedServer.requests[:]
+        
+        [newRatingsAndReviews, ratingsAndReviewsFeed] = self.downloadFeeds(self.workingPath)
+        
+        # only the first pages are asked for and each one is conditional
+        self.assertFalse(newRatingsAndReviews)
+        self.assertEqual(sorted([[countryCode, appId, page] for [countryCode, appId, page, etag] in self.feedServer.requests]), sorted([[countryCode, appId, 1] for appId in self.AppIds for countryCode in self.CountryCodes]))
+        self.assertTrue(all([etag != None for [countryCode, appId, page, etag] in self.feedServer.requests]))
+        self.assertFeedSummary(ratingsAndReviewsFeed, self.CountryCodes, [])
+        
+        # a new review changes the feed so only that storefront has new ratings
+        self.reviews[("222", "gb")].insert(0, ["222gbnew", "1.1", 5])
+        self.publishFeed("222", "gb")
+        
+        [newRatingsAndReviews, ratingsAndReviewsFeed] = self.downloadFeeds(self.workingPath)
+        
+        from Common import RatingsSummaryFields
+        
+        self.assertTrue(newRatingsAndReviews)
+        self.assertEqual(ratingsAndReviewsFeed["222"][RatingsSummaryFields.NumberOfNewRatings], 1)
+        self.assertEqual(ratingsAndReviewsFeed["111"][RatingsSummaryFields.NumberOfNewRatings], 0)
+        self.assertEqual(ratingsAndReviewsFeed["222"][RatingsSummaryFields.LifetimeRatingSamples], sum([len(self.reviews[("222", countryCode)]) for countryCode in self.CountryCodes]))
+
+if __name__ == '__main__':
+    unittest.main()
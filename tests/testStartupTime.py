@@ -0,0 +1,75 @@
+#!/usr/bin/python
+
+# Harvest Reports v0.1.5
+# Copyright (c) 2014-2015 Iain McManus. All rights reserved.
+#
+# Harvest Reports is a wrapper around Apple's AutoIngestion Java Class.
+# Harvest Reports can download all of the recent daily data and will produce
+# a summary of the sales, updates and a breakdown of region where sales have occurred.
+#
+# Information is also generated per version, including a calculation of the number of users
+# on the latest version.
+#
+# Harvest Reports can be run on a regular schedule and be configured to send an email
+# with the daily summary when the daily report is out. If no sales/updates have occurred
+# it can indicate that as well.
+
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in
+# all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN
+# THE SOFTWARE.
+
+import json
+import subprocess
+import sys
+import unittest
+
+from harvestTestSupport import HarvestTestCase
+
+# importing harvestReports took 0.26s with every module loaded up front and 0.075s once they were deferred
+StartupBudgetSeconds = 0.2
+
+# the modules that only the charts, feeds, email and report database need
+DeferredModules = ["matplotlib", "matplotlib.pyplot", "feedparser", "smtplib", "email", "unidecode", "sqlite3"]
+
+ImportScript = """
+import json
+import sys
+import time
+
+startTime = time.time()
+import harvestReports
+importSeconds = time.time() - startTime
+
+print json.dumps([importSeconds, [moduleName for moduleName in json.loads(sys.argv[1]) if moduleName in sys.modules]])
+"""
+
+class StartupTests(HarvestTestCase):
+    def importHarvestReports(self):
+        # each import is timed in a fresh interpreter so nothing has been loaded already
+        return json.loads(subprocess.check_output([sys.executable, "-c", ImportScript, json.dumps(DeferredModules)]))
+    
+    def testImportIsWithinBudget(self):
+        # the quickest of a few imports is taken so that a busy machine does not fail the test
+        importSeconds = min([self.importHarvestReports()[0] for attempt in range(0, 3)])
+        
+        self.assertLess(importSeconds, StartupBudgetSeconds)
+    
+    def testDeferredModulesAreNotLoaded(self):
+        self.assertEqual(self.importHarvestReports()[1], [])
+
+if __name__ == '__main__':
+    unittest.main()